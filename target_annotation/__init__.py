@@ -2,16 +2,45 @@
 Collection of modules for analyzing, annotating, and expanding upon results from REFS.
 """
 
-from .target_annotation import TargetAnnotation
-from .open_targets import (
-    request_ot_target_annotation,
-    request_ot_associated_targets,
-    request_ot_target_disease_evidences,
-    request_open_targets,
-)
-from .pharos import request_pharos_target_annotation
-from .ontology_source import request_ebi_ontology_sources
-from .extract_table import ExtractTable
+import importlib
+
+# Public names and the submodules defining them. Submodules are imported on first
+# attribute access (PEP 562), so pandas, requests and typeguard are only loaded
+# once the corresponding function or class is used.
+_LAZY_ATTRIBUTES = {
+    "TargetAnnotation": ".target_annotation",
+    "request_ot_target_annotation": ".open_targets",
+    "request_ot_associated_targets": ".open_targets",
+    "request_ot_target_disease_evidences": ".open_targets",
+    "iter_ot_target_disease_evidences": ".open_targets",
+    "request_ot_target_disease_evidences_by_datasource": ".open_targets",
+    "request_ot_target_disease_evidences_batch": ".open_targets",
+    "request_open_targets": ".open_targets",
+    "map_symbols_to_ensembl": ".open_targets",
+    "request_pharos_target_annotation": ".pharos",
+    "request_ebi_ontology_sources": ".ontology_source",
+    "iter_ebi_ontologies": ".ontology_source",
+    "map_uniprot_to_ensembl": ".uniprot",
+    "ExtractTable": ".extract_table",
+    "set_fast_mode": ".utils.typecheck",
+    "is_fast_mode": ".utils.typecheck",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
 
 # # check if there are newer versions
 # if os.path.exists("/projects/Gemini/conda_channel/channeldata.json"):
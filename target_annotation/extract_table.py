@@ -1,14 +1,180 @@
 """ExtractTables module
+
+The summary table is built in a single pass over the annotation db. The raw
+OpenTargets, disease evidence and Pharos records of each target are walked once and
+every summary field is appended to its own column buffer, instead of flattening the
+db into one wide table and applying a function per summary column.
 """
+
 import json
+import math
 import os
 import pandas as pd
-from typeguard import typechecked
-import copy
 import warnings
 from collections import Counter
-
-@typechecked
+from .utils.typecheck import internal_typechecked
+
+# raw values copied into the summary table as they are, by column. They keep missing
+# values, unlike the fields below.
+RAW_FIELDS = (
+    ("ot_symbol", "OpenTargets", ("approvedSymbol",)),
+    ("pharos_symbol", "Pharos", ("sym",)),
+    ("name", "Pharos", ("name",)),
+    ("pharos_description", "Pharos", ("description",)),
+    ("ot_description", "OpenTargets", ("functionDescriptions",)),
+    ("biotype", "OpenTargets", ("biotype",)),
+    ("IDG Development Level", "Pharos", ("tdl",)),
+    ("is_essential", "OpenTargets", ("isEssential",)),
+)
+
+# summary fields by column, built from the value at the key path of a source record.
+# A field is only built for targets where that value is present.
+SUMMARY_FIELDS = (
+    (
+        "pathways",
+        "Pharos",
+        ("pathways",),
+        lambda x: {xx["type"]: xx["name"] for xx in x},
+    ),
+    ("dto", "Pharos", ("dto",), lambda x: ["DTO: " + xx["name"] for xx in x]),
+    (
+        "panther",
+        "Pharos",
+        ("pantherClasses",),
+        lambda x: ["Panther: " + xx["name"] for xx in x],
+    ),
+    (
+        "GO terms",
+        "OpenTargets",
+        ("geneOntology",),
+        lambda x: {xx["term"]["id"]: xx["term"]["name"] for xx in x},
+    ),
+    (
+        "tractability",
+        "OpenTargets",
+        ("tractability",),
+        lambda x: [xx["modality"] + ": " + xx["label"] for xx in x if xx["value"]],
+    ),
+    (
+        "related_publications",
+        "OpenTargets_disease_evidence",
+        ("evidences", "rows"),
+        lambda x: [
+            "https://pubmed.ncbi.nlm.nih.gov/" + xx["literature"][0] for xx in x
+        ],
+    ),
+    (
+        "tissue specificity",
+        "Pharos",
+        ("tissueSpecificity",),
+        lambda x: {xx["name"]: xx["value"] for xx in x},
+    ),
+    (
+        "expressions",
+        "OpenTargets",
+        ("expressions",),
+        lambda x: {xx["tissue"]["label"]: xx["rna"]["value"] for xx in x},
+    ),
+    ("has_chem_probe", "OpenTargets", ("chemicalProbes",), lambda x: len(x) > 0),
+    ("has_known_drug", "OpenTargets", ("knownDrugs", "rows"), lambda x: len(x) > 0),
+    (
+        "gwas",
+        "Pharos",
+        ("gwas",),
+        lambda x: {xx["snps"][0]["value"]: xx["trait"] for xx in x},
+    ),
+    (
+        "gwas_analytics",
+        "Pharos",
+        ("gwasAnalytics", "associations"),
+        lambda x: {xx["trait"]: xx["meanRankScore"] for xx in x},
+    ),
+    (
+        "gnomAD_LOEUF",
+        "OpenTargets",
+        ("geneticConstraint",),
+        lambda x: _single_or_list(
+            [xx["oeUpper"] for xx in x if xx["constraintType"] == "lof"]
+        ),
+    ),
+    (
+        "Pharos associated diseases",
+        "Pharos",
+        ("diseases",),
+        lambda x: [{xx["name"]: xx["datasource_count"] for xx in x}],
+    ),
+    (
+        "OT associated diseases",
+        "OpenTargets",
+        ("associatedDiseases", "rows"),
+        lambda x: {xx["disease"]["name"]: xx["score"] for xx in x},
+    ),
+    (
+        "safety_liabilities",
+        "OpenTargets",
+        ("safetyLiabilities",),
+        lambda x: [xx["event"] for xx in x],
+    ),
+)
+
+# column and description of each summary column, in table order
+BASIC_KEYS = (
+    ("symbol", "preferred symbol"),
+    ("name", "name (Pharos)"),
+    ("description", "description (Pharos first, OT if no Pharos)"),
+    ("biotype", "biotype (OT)"),
+)
+
+SUMMARY_KEYS = (
+    ("pharos_link", "link to Pharos Facets for target."),
+    ("pathways", "Pathways from Pharos."),
+    ("classes", "Panther and DTO classes from Pharos."),
+    ("GO terms", "GO terms collected from OT."),
+    ("tractability", "tractability from OT."),
+    (
+        "IDG Development Level",
+        "Descriptions of the IDG illumination levels,"
+        " highlighting the milestones attained in research"
+        " for this target. From Pharos.",
+    ),
+    ("is_essential", "is essential from DepMap"),
+    (
+        "related_publications",
+        "PubMed links for publications relating target to disease",
+    ),
+    ("tissue specificity", "tissue specificity from Pharos."),
+    ("top_rna_expression", "top expression from Expression Atlas in OT."),
+    ("has_chem_probe", "whether chemical probe exists in ChEMBL."),
+    ("has_known_drug", "whether known drug exists for target."),
+    ("gwas", "GWAS catalog results: www.ebi.ac.uk/gwas"),
+    (
+        "gwas_analytics",
+        "GWAS trait and meanRankScore."
+        " Target Illumination GWAS Analytics (TIGA) scores and ranks"
+        " those traits according to a subset of study parameters."
+        " https://unmtid-shinyapps.net/shiny/tiga/",
+    ),
+    (
+        "gnomAD_LOEUF",
+        "LOEUF genetic constraint: https://gnomad.broadinstitute.org/help/constraint",
+    ),
+    (
+        "Pharos associated diseases",
+        "associated disease and their datasource count from Pharos",
+    ),
+    ("OT associated diseases", "associated disease and their score from OT"),
+    (
+        "disease_association_score",
+        "score of association between disease of interest and target from OT.",
+    ),
+    ("safety_liabilities", "safety liabilities from OT."),
+)
+
+# marks a key path that is missing, or ends in a nested record
+_MISSING = object()
+
+
+@internal_typechecked
 class ExtractTable:
     """Generate target summary table from sim results and target annotations"""
 
@@ -41,378 +207,80 @@ class ExtractTable:
         if not os.path.exists(self.output_path):
             os.makedirs(self.output_path)
 
-    def __create_ref_df(self):
-        temp = pd.DataFrame.from_dict(self.annotate_db, orient="index")
-        self.annotate_ref_df = pd.DataFrame(index=temp.index)
-        self.annotate_ref_df = self.annotate_ref_df.join(
-            pd.json_normalize(temp["OpenTargets"])
-            .set_index(temp.index)
-            .add_prefix("OT_")
-        )
-        self.annotate_ref_df = self.annotate_ref_df.join(
-            pd.json_normalize(temp["OpenTargets_disease_evidence"])
-            .set_index(temp.index)
-            .add_prefix("OT_disease_"),
-        )
-        self.annotate_ref_df = self.annotate_ref_df.join(
-            pd.json_normalize(temp["Pharos"])
-            .set_index(temp.index)
-            .add_prefix("Pharos_")
-        )
-
-    def __get_basic_df(self):
-        basic_cols = [
-            "OT_approvedSymbol",
-            "Pharos_sym",
-            "Pharos_name",
-            "Pharos_description",
-            "OT_functionDescriptions",
-            "OT_biotype",
-        ]
-        self.basic_df = copy.deepcopy(self.annotate_ref_df[basic_cols])
-        self.basic_df.rename(
-            columns={
-                "OT_approvedSymbol": "ot_symbol",
-                "Pharos_sym": "pharos_symbol",
-                "Pharos_name": "name",
-                "Pharos_description": "pharos_description",
-                "OT_functionDescriptions": "ot_description",
-                "OT_biotype": "biotype",
-            },
-            inplace=True,
-        )
-        self.basic_df["symbol"] = self.basic_df["ot_symbol"].combine_first(
-            self.basic_df["pharos_symbol"]
-        )
-        self.basic_df["description"] = self.basic_df[
-            "pharos_description"
-        ].combine_first(
-            self.basic_df["ot_description"].apply(
-                lambda x: x[0] if isinstance(x, list) and len(x) > 0 else x
-            )
-        )
-        self.basic_df.drop(
-            columns=[
-                "pharos_symbol",
-                "ot_symbol",
-                "pharos_description",
-                "ot_description",
-            ],
-            inplace=True,
-        )
-        temp = self.basic_df.pop("symbol")
-        self.basic_df.insert(1, "symbol", temp)
-        temp = self.basic_df.pop("description")
-        self.basic_df.insert(3, "description", temp)
-
-        self.basic_df_key = pd.DataFrame(
-            {
-                "column": [
-                    "symbol",
-                    "name",
-                    "description",
-                    "biotype",
-                ],
-                "key": [
-                    "preferred symbol",
-                    "name (Pharos)",
-                    "description (Pharos first, OT if no Pharos)",
-                    "biotype (OT)",
-                ],
-            }
-        )
-
-    def __get_pathways(self):
-        self.path_df = (
-            self.annotate_ref_df["Pharos_pathways"]
-            .dropna()
-            .apply(lambda x: {xx["type"]: xx["name"] for xx in x})
-        ).rename("pathways")
-        self.path_df_key = pd.DataFrame(
-            {"column": "pathways", "key": "Pathways from Pharos."},
-            index=[0],
-        )
-
-    def __get_classes(self):
-        self.class_df = self.annotate_ref_df["Pharos_dto"].dropna().apply(
-            lambda x: ["DTO: " + xx["name"] for xx in x]
-        ) + self.annotate_ref_df["Pharos_pantherClasses"].dropna().apply(
-            lambda x: ["Panther: " + xx["name"] for xx in x]
-        )
-        self.class_df = self.class_df.rename("classes")
-        self.class_df_key = pd.DataFrame(
-            {"column": "classes", "key": "Panther and DTO classes from Pharos."},
-            index=[0],
-        )
-
-    def __get_go_terms(self):
-        self.go_df = (
-            self.annotate_ref_df["OT_geneOntology"]
-            .dropna()
-            .apply(lambda x: {xx["term"]["id"]: xx["term"]["name"] for xx in x})
-        ).rename("GO terms")
-        self.go_df_key = pd.DataFrame(
-            {"column": "GO terms", "key": "GO terms collected from OT."},
-            index=[0],
-        )
-
-    def __get_tract_df(self):
-        self.tract_df = (
-            self.annotate_ref_df["OT_tractability"]
-            .dropna()
-            .apply(
-                lambda lam: [
-                    x["modality"] + ": " + x["label"]
-                    for x in [x for x in lam if x["value"]]
-                ]
-            )
-        ).rename("tractability")
-        self.tract_df_key = pd.DataFrame(
-            {"column": "tractability", "key": "tractability from OT."}, index=[0]
-        )
-
-    def __get_tdl(self):
-        self.tdl_df = copy.deepcopy(self.annotate_ref_df["Pharos_tdl"]).rename(
-            "IDG Development Level"
-        )
-        self.tdl_df_key = pd.DataFrame(
-            {
-                "column": "IDG Development Level",
-                "key": (
-                    "Descriptions of the IDG illumination levels,"
-                    " highlighting the milestones attained in research"
-                    " for this target. From Pharos."
-                ),
-            },
-            index=[0],
-        )
-
-    def __get_dep_map_essentiality(self):
-        self.essential_df = copy.deepcopy(
-            self.annotate_ref_df["OT_isEssential"]
-        ).rename("is_essential")
-        self.essential_df_key = pd.DataFrame(
-            {"column": "is_essential", "key": "is essential from DepMap"}, index=[0]
-        )
-
-    def __get_tissue_specificity(self):
-        self.tissue_spec_df = (
-            self.annotate_ref_df["Pharos_tissueSpecificity"]
-            .dropna()
-            .apply(lambda x: {xx["name"]: xx["value"] for xx in x})
-            .rename("tissue specificity")
-        )
-        self.tissue_spec_df_key = pd.DataFrame(
-            {
-                "column": "tissue specificity",
-                "key": "tissue specificity from Pharos.",
-            },
-            index=[0],
-        )
-
-    def __get_expression(self):
-        self.top_expression_df = (
-            self.annotate_ref_df["OT_expressions"]
-            .dropna()
-            .apply(lambda x: {i["tissue"]["label"]: i["rna"]["value"] for i in x})
-            .apply(Counter)
-            .apply(lambda x: x.most_common()[: self.top_expression_count])
-            .rename("top_rna_expression")
-        )
-        self.top_expression_df_key = pd.DataFrame(
-            {
-                "column": "top_rna_expression",
-                "key": "top expression from Expression Atlas in OT.",
-            },
-            index=[0],
-        )
-
-    def __get_chem_probes(self):
-        self.chem_probes_df = (
-            self.annotate_ref_df["OT_chemicalProbes"]
-            .dropna()
-            .apply(lambda x: len(x) > 0)
-        ).rename("has_chem_probe")
-        self.chem_probes_df_key = pd.DataFrame(
-            {
-                "column": "has_chem_probe",
-                "key": "whether chemical probe exists in ChEMBL.",
-            },
-            index=[0],
-        )
-
-    def __get_known_drugs(self):
-        self.known_drugs_df = (
-            self.annotate_ref_df["OT_knownDrugs.rows"]
-            .dropna()
-            .apply(lambda x: len(x) > 0)
-        ).rename("has_known_drug")
-        self.known_drugs_df_key = pd.DataFrame(
-            {
-                "column": "has_known_drug",
-                "key": "whether known drug exists for target.",
-            },
-            index=[0],
-        )
-
-    def __get_gwas(self):
-        self.gwas_df = (
-            self.annotate_ref_df["Pharos_gwas"]
-            .dropna()
-            .apply(lambda x: {xx["snps"][0]["value"]: xx["trait"] for xx in x})
-        ).rename("gwas")
-        self.gwas_df_key = pd.DataFrame(
-            {
-                "column": "gwas",
-                "key": "GWAS catalog results: www.ebi.ac.uk/gwas",
-            },
-            index=[0],
-        )
-
-    def __get_gwas_analytics(self):
-        self.gwas_analytics_df = (
-            self.annotate_ref_df["Pharos_gwasAnalytics.associations"]
-            .dropna()
-            .apply(lambda x: {xx["trait"]: xx["meanRankScore"] for xx in x})
-        ).rename("gwas_analytics")
-        self.gwas_analytics_df_key = pd.DataFrame(
-            {
-                "column": "gwas_analytics",
-                "key": (
-                    "GWAS trait and meanRankScore."
-                    " Target Illumination GWAS Analytics (TIGA) scores and ranks"
-                    " those traits according to a subset of study parameters."
-                    " https://unmtid-shinyapps.net/shiny/tiga/"
+    def __extract(self):
+        # the disease of interest is that of the first target with evidences
+        self.disease_id = next(
+            (
+                x
+                for x in (
+                    _lookup(annotation["OpenTargets_disease_evidence"], ("id",))
+                    for annotation in self.annotate_db.values()
+                )
+                if isinstance(x, str)
+            ),
+            None,
+        )
+        summary_fields = SUMMARY_FIELDS + (
+            (
+                "top_rna_expression",
+                "OpenTargets",
+                ("expressions",),
+                lambda x: Counter(
+                    {xx["tissue"]["label"]: xx["rna"]["value"] for xx in x}
+                ).most_common()[: self.top_expression_count],
+            ),
+        )
+        if self.disease_id is not None:
+            summary_fields += (
+                (
+                    "disease_association_score",
+                    "OpenTargets",
+                    ("associatedDiseases", "rows"),
+                    lambda x: _single_or_none(
+                        [
+                            xx["score"]
+                            for xx in x
+                            if xx["disease"]["id"] == self.disease_id
+                        ]
+                    ),
                 ),
-            },
-            index=[0],
-        )
-
-    def __get_genetic_constraint(self):
-        self.gen_constraint_df = (
-            self.annotate_ref_df["OT_geneticConstraint"]
-            .dropna()
-            .apply(
-                lambda x: [xx["oeUpper"] for xx in x if xx["constraintType"] == "lof"]
             )
-            .apply(lambda x: x[0] if len(x) == 1 else x)
-        ).rename("gnomAD_LOEUF")
-        self.gen_constraint_df_key = pd.DataFrame(
-            {
-                "column": "gnomAD_LOEUF",
-                "key": (
-                    "LOEUF genetic constraint:"
-                    " https://gnomad.broadinstitute.org/help/constraint"
-                ),
-            },
-            index=[0],
-        )
-
-    def __get_associated_diseases_pharos(self):
-        self.associated_diseases_pharos_df = (
-            self.annotate_ref_df["Pharos_diseases"]
-            .dropna()
-            .apply(lambda x: [{xx["name"]: xx["datasource_count"] for xx in x}])
-        ).rename("Pharos associated diseases")
-        self.associated_diseases_pharos_df_key = pd.DataFrame(
-            {
-                "column": "Pharos associated diseases",
-                "key": "associated disease and their datasource count from Pharos",
-            },
-            index=[0],
-        )
-
-    def __get_associated_diseases_ot(self):
-        self.associated_diseases_ot_df = (
-            self.annotate_ref_df["OT_associatedDiseases.rows"]
-            .dropna()
-            .apply(lambda x: {xx["disease"]["name"]: xx["score"] for xx in x})
-        ).rename("OT associated diseases")
-        self.associated_diseases_ot_df_key = pd.DataFrame(
-            {
-                "column": "OT associated diseases",
-                "key": "associated disease and their score from OT",
-            },
-            index=[0],
-        )
 
-    def __get_disease_association(self):
-        disease_id = None
-        count = 0
-        while not isinstance(disease_id, str):
-            if count == len(self.annotate_ref_df["OT_disease_id"]):
-                self.disease_association_df = None
-                self.disease_association_df_key = None
-                warnings.warn(
-                    "no disease code from annotation db:"
-                    + " OpenTargets_disease_evidence->id",
-                    stacklevel=2,
-                )
-                return
-            disease_id = self.annotate_ref_df["OT_disease_id"].iloc[count]
-            count += 1
-        self.disease_association_df = (
-            self.annotate_ref_df["OT_associatedDiseases.rows"]
-            .dropna()
-            .apply(
-                lambda x: [xx["score"] for xx in x if xx["disease"]["id"] == disease_id]
+        # one walk over the raw records of all targets. Summary fields skip values
+        # that are missing, null, NaN or nested records, like .dropna() did on the
+        # flattened db.
+        index = pd.Index(list(self.annotate_db))
+        raw = {column: [] for column, _, _ in RAW_FIELDS}
+        found = {column: ([], []) for column, _, _, _ in summary_fields}
+        null_counts = dict.fromkeys(found, 0)
+        for target, annotation in self.annotate_db.items():
+            for column, source, path in RAW_FIELDS:
+                value = _lookup(annotation[source], path)
+                raw[column].append(math.nan if value is _MISSING else value)
+            for column, source, path, extract in summary_fields:
+                value = _lookup(annotation[source], path)
+                if value is None:
+                    null_counts[column] += 1
+                elif value is not _MISSING and value == value:  # NaN != NaN
+                    found[column][0].append(target)
+                    found[column][1].append(extract(value))
+
+        # first function description, used when Pharos has no description
+        raw["ot_description"] = [
+            x[0] if isinstance(x, list) and len(x) > 0 else x
+            for x in raw["ot_description"]
+        ]
+        raw["pharos_link"] = ["https://pharos.nih.gov/targets/" + x for x in index]
+        self.raw_fields = {
+            column: pd.Series(values, index=index, name=column)
+            for column, values in raw.items()
+        }
+        self.summary_fields = {
+            column: _partial_series(
+                column, index, targets, values, null_counts[column] == len(index)
             )
-            .apply(lambda x: x[0] if len(x) > 0 else None)
-        ).rename("disease_association_score")
-        self.disease_association_df_key = pd.DataFrame(
-            {
-                "column": "disease_association_score",
-                "key": (
-                    "score of association between disease of interest"
-                    " and target from OT."
-                ),
-            },
-            index=[0],
-        )
-
-    def __get_safety_liabilities(self):
-        self.safety_liabilities_df = (
-            self.annotate_ref_df["OT_safetyLiabilities"]
-            .dropna()
-            .apply(lambda x: [xx["event"] for xx in x])
-        ).rename("safety_liabilities")
-        self.safety_liabilities_df_key = pd.DataFrame(
-            {
-                "column": "safety_liabilities",
-                "key": ("safety liabilities from OT."),
-            },
-            index=[0],
-        )
-
-    def __get_pharos_link(self):
-        self.pharos_link_df = (
-            self.annotate_ref_df.index.to_series()
-            .dropna()
-            .apply(lambda x: "https://pharos.nih.gov/targets/" + x)
-            .rename("pharos_link")
-        )
-        self.pharos_link_df_key = pd.DataFrame(
-            {"column": "pharos_link", "key": "link to Pharos Facets for target."},
-            index=[0],
-        )
-
-    def __get_lit_urls(self):
-        pmid = (
-            self.annotate_ref_df["OT_disease_evidences.rows"]
-            .dropna()
-            .apply(lambda x: [xx["literature"][0] for xx in x])
-        )
-
-        self.pmid_df = pmid.apply(
-            lambda x: ["https://pubmed.ncbi.nlm.nih.gov/" + xx for xx in x]
-        ).rename("related_publications")
-        self.pmid_df_key = pd.DataFrame(
-            {
-                "column": "related_publications",
-                "key": "PubMed links for publications relating target to disease",
-            },
-            index=[0],
-        )
+            for column, (targets, values) in found.items()
+        }
 
     def get_expression_table(self):
         """get gene expression table
@@ -420,13 +288,9 @@ class ExtractTable:
         Returns:
             pd.DataFrame: expression table
         """
-        if not hasattr(self, "annotate_ref_df"):
-            self.__create_ref_df()
-        temp = (
-            self.annotate_ref_df["OT_expressions"]
-            .dropna()
-            .apply(lambda xx: {x["tissue"]["label"]: x["rna"]["value"] for x in xx})
-        )
+        if not hasattr(self, "summary_fields"):
+            self.__extract()
+        temp = self.summary_fields["expressions"]
         self.expression_table = pd.json_normalize(temp).set_index(temp.index)
         return self.expression_table
 
@@ -436,76 +300,60 @@ class ExtractTable:
         Returns:
             pd.DataFrame: final targets table
         """
-        self.__create_ref_df()
-        self.__get_basic_df()
-        self.__get_pathways()
-        self.__get_classes()
-        self.__get_go_terms()
-        self.__get_tract_df()
-        self.__get_tdl()
-        self.__get_dep_map_essentiality()
-        self.__get_tissue_specificity()
-        self.__get_expression()
-        self.__get_chem_probes()
-        self.__get_known_drugs()
-        self.__get_gwas()
-        self.__get_gwas_analytics()
-        self.__get_genetic_constraint()
-        self.__get_associated_diseases_pharos()
-        self.__get_associated_diseases_ot()
-        self.__get_disease_association()
-        self.__get_safety_liabilities()
-        self.__get_pharos_link()
-        self.__get_lit_urls()
+        self.__extract()
+        raw, fields = self.raw_fields, self.summary_fields
 
+        basic_df = pd.DataFrame(
+            {
+                "name": raw["name"],
+                "symbol": raw["ot_symbol"].combine_first(raw["pharos_symbol"]),
+                "biotype": raw["biotype"],
+                "description": raw["pharos_description"].combine_first(
+                    raw["ot_description"]
+                ),
+            }
+        )
+        # classes are only listed for targets with both DTO and Panther classes
+        columns = {
+            "pharos_link": raw["pharos_link"],
+            "classes": fields["dto"] + fields["panther"],
+            "IDG Development Level": raw["IDG Development Level"],
+            "is_essential": raw["is_essential"],
+        }
+        if self.disease_id is None:
+            warnings.warn(
+                "no disease code from annotation db:"
+                + " OpenTargets_disease_evidence->id",
+                stacklevel=2,
+            )
+
+        summary_keys = [
+            (column, key)
+            for column, key in SUMMARY_KEYS
+            if column in columns or column in fields
+        ]
         self.final_table = pd.concat(
-            [
-                self.basic_df,
-                self.pharos_link_df,
-                self.path_df,
-                self.class_df,
-                self.go_df,
-                self.tract_df,
-                self.tdl_df,
-                self.essential_df,
-                self.pmid_df,
-                self.tissue_spec_df,
-                self.top_expression_df,
-                self.chem_probes_df,
-                self.known_drugs_df,
-                self.gwas_df,
-                self.gwas_analytics_df,
-                self.gen_constraint_df,
-                self.associated_diseases_pharos_df,
-                self.associated_diseases_ot_df,
-                self.disease_association_df,
-                self.safety_liabilities_df,
+            [basic_df]
+            + [
+                (columns[column] if column in columns else fields[column]).rename(
+                    column
+                )
+                for column, _ in summary_keys
             ],
             axis=1,
         )
-
         self.final_table_key = pd.concat(
             [
-                self.basic_df_key,
-                self.pharos_link_df_key,
-                self.path_df_key,
-                self.class_df_key,
-                self.go_df_key,
-                self.tract_df_key,
-                self.tdl_df_key,
-                self.essential_df_key,
-                self.pmid_df_key,
-                self.tissue_spec_df_key,
-                self.top_expression_df_key,
-                self.chem_probes_df_key,
-                self.known_drugs_df_key,
-                self.gwas_df_key,
-                self.gwas_analytics_df_key,
-                self.gen_constraint_df_key,
-                self.associated_diseases_pharos_df_key,
-                self.associated_diseases_ot_df_key,
-                self.disease_association_df_key,
-                self.safety_liabilities_df_key,
+                pd.DataFrame(
+                    {
+                        "column": [x for x, _ in BASIC_KEYS],
+                        "key": [x for _, x in BASIC_KEYS],
+                    }
+                )
+            ]
+            + [
+                pd.DataFrame({"column": column, "key": key}, index=[0])
+                for column, key in summary_keys
             ]
         )
 
@@ -524,3 +372,33 @@ class ExtractTable:
                 writer, sheet_name="summary_table_key", index=False
             )
             expression_table.to_excel(writer, sheet_name="expression_table")
+
+
+def _lookup(record, path):
+    # not type checked, since it runs once per field and target
+    for key in path:
+        if not isinstance(record, dict) or key not in record:
+            return _MISSING
+        record = record[key]
+    return _MISSING if isinstance(record, dict) else record
+
+
+def _single_or_list(values):
+    return values[0] if len(values) == 1 else values
+
+
+def _single_or_none(values):
+    return values[0] if len(values) > 0 else None
+
+
+@internal_typechecked
+def _partial_series(
+    column: str, index: pd.Index, targets: list, values: list, all_null: bool
+) -> pd.Series:
+    # same dtypes as .dropna().apply(...) on a flattened column, which keeps the
+    # dtype of an all-missing column: float, or object if every value was null
+    if len(values) == 0:
+        return pd.Series(
+            index=index[:0], dtype=object if all_null else float, name=column
+        )
+    return pd.Series(values, index=targets, dtype=object, name=column).infer_objects()
@@ -0,0 +1,302 @@
+"""
+Methods to answer ontology hierarchy queries, such as all descendants of a disease,
+from a local closure index instead of repeated OLS requests.
+
+OntologyIndex.build_from_obo reads an OBO file, e.g. mondo.obo from
+https://mondo.monarchinitiative.org, and OntologyIndex.build_from_ols pages through
+the classes of an ontology in OLS. Both follow is_a (subclass) relations only and
+skip obsolete terms. The transitive closure of the hierarchy is written once to a
+SQLite file with one row per ancestor-descendant pair, indexed in both directions,
+so a lookup is a single index range scan.
+
+Term IDs are stored in the Open Targets form with an underscore, e.g.
+MONDO_0004975. Lookups also accept the OBO form MONDO:0004975.
+"""
+
+import os
+import sqlite3
+import threading
+import typing
+from .utils.typecheck import internal_typechecked
+
+# SQLite limits the number of host parameters per statement
+MAX_PARAMETERS = 500
+
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE terms (id TEXT PRIMARY KEY, label TEXT) WITHOUT ROWID;
+CREATE TABLE closure (
+    ancestor TEXT, descendant TEXT, PRIMARY KEY (ancestor, descendant)
+) WITHOUT ROWID;
+CREATE INDEX closure_descendant ON closure (descendant, ancestor);
+"""
+
+
+@internal_typechecked
+class OntologyIndex:
+    """Transitive closure of an ontology hierarchy in a SQLite file"""
+
+    def __init__(self, db_path: str):
+        """Open an index written by build_from_obo or build_from_ols
+
+        Args:
+            db_path (str): path of the index
+        """
+        self.db_path = os.path.expanduser(db_path)
+        if not os.path.isfile(self.db_path):
+            raise FileNotFoundError(f"{self.db_path} is not a file")
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.metadata = dict(self._connection.execute("SELECT * FROM metadata"))
+
+    @classmethod
+    def build_from_obo(cls, db_path: str, obo_path: str) -> "OntologyIndex":
+        """Build an index from an OBO file
+
+        Args:
+            db_path (str): path to write the index to
+            obo_path (str): OBO file such as mondo.obo
+
+        Returns:
+            OntologyIndex: the opened index
+        """
+        labels, parents = _read_obo(os.path.expanduser(obo_path))
+        return cls._build(db_path, labels, parents, os.path.basename(obo_path))
+
+    @classmethod
+    def build_from_ols(cls, db_path: str, ontology: str, **kwargs) -> "OntologyIndex":
+        """Build an index from the classes of an ontology in OLS
+
+        Args:
+            db_path (str): path to write the index to
+            ontology (str): OLS ontology ID such as "mondo" or "efo"
+            **kwargs: extra parameters passed to ontology_source.iter_ols_classes
+
+        Returns:
+            OntologyIndex: the opened index
+        """
+        from .ontology_source import iter_ols_classes
+
+        labels, parents = {}, {}
+        for term in iter_ols_classes(ontology, **kwargs):
+            term_id = _normalize_id(term.get("shortForm") or term.get("curie") or "")
+            if not term_id or term.get("isObsolete") or term.get("is_obsolete"):
+                continue
+            label = term.get("label")
+            labels[term_id] = label[0] if isinstance(label, list) else label
+            parents[term_id] = [
+                _normalize_id(_short_form(x)) for x in term.get("directParent") or []
+            ]
+        return cls._build(db_path, labels, parents, ontology)
+
+    @classmethod
+    def _build(
+        cls, db_path: str, labels: dict, parents: dict, source: str
+    ) -> "OntologyIndex":
+        # obsolete or unknown parents are left out of the hierarchy
+        parents = {
+            term: [x for x in term_parents if x in labels]
+            for term, term_parents in parents.items()
+        }
+        ancestors = _ancestors(parents)
+
+        db_path = os.path.expanduser(db_path)
+        temp_path = db_path + ".tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        with sqlite3.connect(temp_path) as connection:
+            connection.executescript(SCHEMA)
+            connection.executemany(
+                "INSERT INTO metadata VALUES (?, ?)",
+                [("version", str(INDEX_VERSION)), ("source", source)],
+            )
+            connection.executemany("INSERT INTO terms VALUES (?, ?)", labels.items())
+            connection.executemany(
+                "INSERT INTO closure VALUES (?, ?)",
+                (
+                    (ancestor, term)
+                    for term, term_ancestors in ancestors.items()
+                    for ancestor in term_ancestors
+                ),
+            )
+        connection.close()
+        os.replace(temp_path, db_path)
+        return cls(db_path)
+
+    def ancestors(self, term: str, include_self: bool = False) -> list:
+        """Find all ancestors of a term
+
+        Args:
+            term (str): term ID such as MONDO_0004975
+            include_self (bool, optional): include the term itself. Defaults to
+                False.
+
+        Returns:
+            list: sorted ancestor IDs
+        """
+        term = _normalize_id(term)
+        found = self._select(
+            "SELECT ancestor FROM closure WHERE descendant = ?", [term]
+        )
+        return sorted(found + ([term] if include_self and self.has_term(term) else []))
+
+    def descendants(self, term: str, include_self: bool = False) -> list:
+        """Find all descendants of a term
+
+        Args:
+            term (str): term ID such as MONDO_0004975
+            include_self (bool, optional): include the term itself. Defaults to
+                False.
+
+        Returns:
+            list: sorted descendant IDs
+        """
+        term = _normalize_id(term)
+        found = self._select(
+            "SELECT descendant FROM closure WHERE ancestor = ?", [term]
+        )
+        return sorted(found + ([term] if include_self and self.has_term(term) else []))
+
+    def expand(self, terms: list) -> list:
+        """Find many terms and all of their descendants
+
+        Args:
+            terms (list): term IDs
+
+        Returns:
+            list: the terms, in input order, followed by their sorted descendants.
+                Terms missing from the index are kept.
+        """
+        terms = list(dict.fromkeys(_normalize_id(x) for x in terms))
+        descendants = set()
+        for start in range(0, len(terms), MAX_PARAMETERS):
+            chunk = terms[start : start + MAX_PARAMETERS]
+            descendants.update(
+                self._select(
+                    "SELECT descendant FROM closure WHERE ancestor IN"
+                    f" ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return terms + sorted(descendants - set(terms))
+
+    def has_term(self, term: str) -> bool:
+        """Check whether a term is in the index
+
+        Args:
+            term (str): term ID such as MONDO_0004975
+
+        Returns:
+            bool: whether the term is in the index
+        """
+        found = self._select("SELECT id FROM terms WHERE id = ?", [_normalize_id(term)])
+        return len(found) > 0
+
+    def labels(self, terms: list) -> dict:
+        """Look up the labels of many terms
+
+        Args:
+            terms (list): term IDs
+
+        Returns:
+            dict: label by term ID, for the terms in the index
+        """
+        terms = list(dict.fromkeys(_normalize_id(x) for x in terms))
+        found = {}
+        with self._lock:
+            for start in range(0, len(terms), MAX_PARAMETERS):
+                chunk = terms[start : start + MAX_PARAMETERS]
+                found.update(
+                    self._connection.execute(
+                        "SELECT id, label FROM terms WHERE id IN"
+                        f" ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return found
+
+    def close(self):
+        """Close the database connection"""
+        self._connection.close()
+
+    def _select(self, sql: str, parameters: list) -> list:
+        with self._lock:
+            return [row[0] for row in self._connection.execute(sql, parameters)]
+
+
+@internal_typechecked
+def _read_obo(obo_path: str) -> typing.Tuple[dict, dict]:
+    labels, parents = {}, {}
+    term = None
+    with open(obo_path, "r", encoding="UTF-8") as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("["):
+                term = {"is_a": []} if line == "[Term]" else None
+                continue
+            if term is None or ":" not in line:
+                continue
+            tag, value = line.split(":", 1)
+            value = value.strip()
+            if tag == "id":
+                term["id"] = _normalize_id(value)
+                labels[term["id"]] = None
+                parents[term["id"]] = term["is_a"]
+            elif tag == "name" and "id" in term:
+                labels[term["id"]] = value
+            elif tag == "is_a":
+                # drop trailing modifiers and comments, e.g. "{source=...} ! label"
+                value = value.split(" ! ", 1)[0].split(" {", 1)[0]
+                term["is_a"].append(_normalize_id(value))
+            elif tag == "is_obsolete" and value == "true" and "id" in term:
+                del labels[term["id"]]
+                del parents[term["id"]]
+                term = None
+    return labels, parents
+
+
+@internal_typechecked
+def _ancestors(parents: dict) -> dict:
+    # memoized depth-first search without recursion, ignoring cycles
+    ancestors = {}
+    for root in parents:
+        stack, in_progress = [root], set()
+        while len(stack) > 0:
+            term = stack[-1]
+            if term in ancestors:
+                stack.pop()
+                continue
+            pending = [
+                x
+                for x in parents.get(term, [])
+                if x not in ancestors and x not in in_progress
+            ]
+            if len(pending) > 0 and term not in in_progress:
+                in_progress.add(term)
+                stack.extend(pending)
+                continue
+            found = set()
+            for parent in parents.get(term, []):
+                found.add(parent)
+                found.update(ancestors.get(parent, ()))
+            found.discard(term)
+            ancestors[term] = frozenset(found)
+            in_progress.discard(term)
+            stack.pop()
+    return ancestors
+
+
+@internal_typechecked
+def _normalize_id(term: str) -> str:
+    return term.strip().replace(":", "_", 1)
+
+
+@internal_typechecked
+def _short_form(iri: typing.Union[str, dict]) -> str:
+    # OLS lists parents as IRIs such as http://purl.obolibrary.org/obo/MONDO_0000001
+    if isinstance(iri, dict):
+        iri = iri.get("value") or iri.get("iri") or ""
+    return iri.rstrip("/").rsplit("/", 1)[-1].rsplit("#", 1)[-1]
@@ -1,12 +1,30 @@
-"""Methods to look up ontology source ID prefixes"""
+"""Methods to look up ontology source ID prefixes
 
+The OLS ontologies endpoint is paged. iter_ebi_ontologies follows the pages, fetching
+them concurrently once the first page reports the total, and yields the ontology
+records as they arrive. The ontology list is cached in a persistent cache for
+ONTOLOGY_CACHE_EXPIRE_AFTER, and get_ontology_prefixes keeps the derived disease ID
+prefixes in memory, so disease IDs can be checked locally before any query is sent.
+"""
 
+import functools
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 import requests
 import typeguard
-from typing import Union
+from typing import FrozenSet, Iterator, Optional, Union
 from .utils import exceptions, retry
+from .utils.cache import PersistentCache
+from .utils.typecheck import internal_typechecked
 
-EBI_ONTOLOGY_URL = "https://www.ebi.ac.uk/ols4/api/ontologies?size=1000"
+EBI_ONTOLOGY_URL = "https://www.ebi.ac.uk/ols4/api/ontologies"
+
+# OLS v2 API, which lists the direct parents of each class
+EBI_CLASSES_URL = "https://www.ebi.ac.uk/ols4/api/v2/ontologies"
+
+ONTOLOGY_PAGE_SIZE = 500
 
 VALID_STATUS_CODE = 200
 
@@ -14,37 +32,239 @@ MAX_TRIES = 3
 
 SECONDS_TO_WAIT = 10
 
+# persistent cache of request_ebi_ontology_sources
+ONTOLOGY_CACHE_NAME = "ebi_ontologies.sqlite"
+
+ONTOLOGY_CACHE_EXPIRE_AFTER = timedelta(days=7)
+
+# timeout of the single attempt get_ontology_prefixes makes when nothing is cached
+PREFIX_REQUEST_TIMEOUT = 30
+
+# after a failed attempt, get_ontology_prefixes only checks the format of IDs for
+# this long before asking OLS again
+PREFIX_RETRY_AFTER = timedelta(minutes=10)
+
+# time.monotonic() of the last failed attempt of get_ontology_prefixes
+_prefix_failed_at = None
+
+# disease ID prefixes that differ from the OLS ontology ID, e.g. Orphanet_ for ordo
+ONTOLOGY_PREFIX_ALIASES = {"ordo": ("Orphanet",)}
 
-@retry.Retryer(max_tries=MAX_TRIES, seconds_to_wait=SECONDS_TO_WAIT)
-def request_ebi_ontology_sources(timeout: Union[float, None] = None) -> list:
+# disease ID prefixes of terms that are not in an OLS ontology, e.g. Open Targets'
+# own therapeutic areas
+EXTRA_DISEASE_PREFIXES = ("OTAR",)
+
+
+@typeguard.typechecked
+def request_ebi_ontology_sources(
+    timeout: Union[float, None] = None,
+    use_cache: bool = True,
+    max_tries: int = MAX_TRIES,
+) -> list:
     """Look up all EBI ontology IDs
 
     Args:
         timeout (Union[float, None], optional): timeout for request.
             Default to None.
-        
+        use_cache (bool, optional): read and update the persistent cache.
+            Defaults to True.
+        max_tries (int, optional): attempts made. Defaults to MAX_TRIES.
+
     Returns:
         list: Ontology codes from EBI such as EFO, MONDO, NCIT etc.
     """
-    response = requests.get(EBI_ONTOLOGY_URL, timeout=timeout)
-    found_ontology_sources = _find_all_ontology_sources_in_response(response)
+    cache = (
+        PersistentCache(ONTOLOGY_CACHE_NAME, ONTOLOGY_CACHE_EXPIRE_AFTER)
+        if use_cache
+        else None
+    )
+    if cache is not None:
+        cached = cache.get_many([EBI_ONTOLOGY_URL])
+        if EBI_ONTOLOGY_URL in cached:
+            return cached[EBI_ONTOLOGY_URL]
 
+    found_ontology_sources = [
+        x["ontologyId"]
+        for x in iter_ebi_ontologies(timeout=timeout, max_tries=max_tries)
+    ]
+    if cache is not None:
+        cache.set_many({EBI_ONTOLOGY_URL: found_ontology_sources})
     return found_ontology_sources
 
 
 @typeguard.typechecked
-def _find_all_ontology_sources_in_response(response: requests.models.Response) -> list:
+def iter_ebi_ontologies(
+    timeout: Union[float, None] = None,
+    page_size: int = ONTOLOGY_PAGE_SIZE,
+    max_workers: int = 4,
+    max_tries: int = MAX_TRIES,
+) -> Iterator[dict]:
+    """Stream the records of all EBI ontologies, page by page
+
+    The remaining pages are requested concurrently when the first page reports the
+    number of pages, otherwise the HAL next links are followed one by one.
+
+    Args:
+        timeout (Union[float, None], optional): timeout for each request.
+            Default to None.
+        page_size (int, optional): ontologies per page. Defaults to
+            ONTOLOGY_PAGE_SIZE.
+        max_workers (int, optional): pages requested at the same time. Defaults
+            to 4.
+        max_tries (int, optional): attempts made per page. Defaults to MAX_TRIES.
+
+    Yields:
+        dict: OLS ontology record with ontologyId, config, status etc.
+    """
+    for page in _iter_ols_pages(
+        EBI_ONTOLOGY_URL, timeout, page_size, max_workers, max_tries
+    ):
+        yield from page.get("_embedded", {}).get("ontologies", [])
+
+
+@typeguard.typechecked
+def iter_ols_classes(
+    ontology: str,
+    timeout: Union[float, None] = None,
+    page_size: int = ONTOLOGY_PAGE_SIZE,
+    max_workers: int = 4,
+    max_tries: int = MAX_TRIES,
+) -> Iterator[dict]:
+    """Stream the classes (terms) of one EBI ontology, page by page
+
+    Args:
+        ontology (str): OLS ontology ID such as "mondo" or "efo"
+        timeout (Union[float, None], optional): timeout for each request.
+            Default to None.
+        page_size (int, optional): classes per page. Defaults to
+            ONTOLOGY_PAGE_SIZE.
+        max_workers (int, optional): pages requested at the same time. Defaults
+            to 4.
+        max_tries (int, optional): attempts made per page. Defaults to MAX_TRIES.
+
+    Yields:
+        dict: OLS v2 class record with curie, shortForm, label, directParent etc.
+    """
+    url = f"{EBI_CLASSES_URL}/{ontology.lower()}/classes"
+    for page in _iter_ols_pages(url, timeout, page_size, max_workers, max_tries):
+        yield from page.get("elements", [])
+
+
+def get_ontology_prefixes() -> Optional[FrozenSet[str]]:
+    """Upper-case disease ID prefixes of all EBI ontologies, including aliases
+
+    The set is built once per process. When the ontology list is neither cached nor
+    available from OLS a warning is shown and None is returned, so callers can fall
+    back to checking the format of IDs only. OLS is not asked again for
+    PREFIX_RETRY_AFTER after a failure.
+
+    Returns:
+        Optional[FrozenSet[str]]: prefixes such as EFO, MONDO and ORPHANET, or None
+    """
+    global _prefix_failed_at  # pylint: disable=global-statement
+    if (
+        _prefix_failed_at is not None
+        and time.monotonic() - _prefix_failed_at < PREFIX_RETRY_AFTER.total_seconds()
+    ):
+        return None
+    try:
+        prefixes = _load_ontology_prefixes()
+    except (requests.exceptions.RequestException, exceptions.InvalidStatusCode) as e:
+        _prefix_failed_at = time.monotonic()
+        warnings.warn(
+            f"EBI ontology list unavailable, disease ID prefixes are not checked for"
+            f" {PREFIX_RETRY_AFTER}: {e}",
+            stacklevel=2,
+        )
+        return None
+    _prefix_failed_at = None
+    return prefixes
+
+
+@functools.lru_cache(maxsize=None)
+def _load_ontology_prefixes() -> FrozenSet[str]:
+    # lru_cache does not keep exceptions, so only a complete set is cached
+    ontologies = request_ebi_ontology_sources(
+        timeout=PREFIX_REQUEST_TIMEOUT, max_tries=1
+    )
+    prefixes = {x.upper() for x in ontologies}
+    prefixes.update(x.upper() for x in EXTRA_DISEASE_PREFIXES)
+    for ontology, aliases in ONTOLOGY_PREFIX_ALIASES.items():
+        if ontology.upper() in prefixes:
+            prefixes.update(x.upper() for x in aliases)
+    return frozenset(prefixes)
+
+
+@functools.lru_cache(maxsize=None)
+def get_ontology_index(db_path: str):
+    """Open (once per file) a local ontology closure index
+
+    Args:
+        db_path (str): path written by OntologyIndex.build_from_obo or
+            OntologyIndex.build_from_ols
+
+    Returns:
+        OntologyIndex: index answering ancestor and descendant lookups locally
+    """
+    from .ontology_index import OntologyIndex
+
+    return OntologyIndex(db_path)
+
+
+@internal_typechecked
+def _iter_ols_pages(
+    url: str,
+    timeout: Union[float, None],
+    page_size: int,
+    max_workers: int,
+    max_tries: int,
+) -> Iterator[dict]:
+    # OLS v1 (HAL) pages report totals in a "page" object, v2 pages at the top
+    # level next to the page number
+    if page_size < 1:
+        raise exceptions.InvalidQueryParameter("page_size must be at least 1")
+
+    def get_page(page_url, params=None):
+        @retry.Retryer(max_tries=max_tries, seconds_to_wait=SECONDS_TO_WAIT)
+        def make_response():
+            response = requests.get(page_url, params=params, timeout=timeout)
+            return _read_ontology_page(response)
+
+        return make_response()
+
+    page = get_page(url, {"page": 0, "size": page_size})
+    yield page
+
+    page_info = page.get("page")
+    total_pages = (
+        page_info.get("totalPages")
+        if isinstance(page_info, dict)
+        else page.get("totalPages")
+    )
+    if total_pages is not None:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            yield from pool.map(
+                lambda number: get_page(url, {"page": number, "size": page_size}),
+                range(1, total_pages),
+            )
+        return
+
+    next_link = page.get("_links", {}).get("next")
+    while next_link is not None:
+        page = get_page(next_link["href"])
+        yield page
+        next_link = page.get("_links", {}).get("next")
+
+
+@internal_typechecked
+def _read_ontology_page(response: requests.models.Response) -> dict:
     if not _has_valid_status(response):
         raise exceptions.InvalidStatusCode(
             "EBI returned an invalid status code while looking up ontology ids"
         )
+    return response.json()
 
-    response_list = response.json()["_embedded"]["ontologies"]
 
-    ontologies = [x["ontologyId"] for x in response_list]
-    return ontologies
-
-
-@typeguard.typechecked
+@internal_typechecked
 def _has_valid_status(response: requests.models.Response) -> bool:
     return response.status_code == VALID_STATUS_CODE
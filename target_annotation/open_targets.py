@@ -4,15 +4,25 @@ Methods to look up Open Targets records. Options currently supported are:
 1. Target annotation
 2. Associated targets to disease
 3. Disease - Target evidence
+4. Disease - Target evidence streamed past 10000 rows with cursors
+5. Disease - Target evidence fetched concurrently per datasource
+6. Disease - Target evidence for many diseases and targets, batched by target
+7. Gene symbol to ensemble ID mapping, batched and persistently cached
 """
 
 
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import requests_cache
-from .utils import retry, exceptions
+from . import ontology_source
+from .utils import retry, exceptions, graphql, validators
+from .utils.cache import PersistentCache
+from .utils.typecheck import internal_typechecked
 import typing
 import typeguard
-import re
 from datetime import timedelta
 
 
@@ -22,9 +32,6 @@ OPEN_TARGETS_SIZE_BOUNDS = (1, 10000)
 
 VALID_STATUS_CODE = 200
 
-VALID_DISEASE_ID_PATTERNS = r"[A-Za-z0-9_]"
-
-
 TARGET_ANNOTATION = """
 query target($ensemblId: String!){
     target(ensemblId: $ensemblId){
@@ -160,16 +167,7 @@ query associatedTargets($efoId: String!) {
 """
 
 
-TARGET_DISEASE_EVIDENCE_QUERY = """
-query targetDiseaseEvidence($efoId: String!, $ensemblIds: [String!]!,
-                            $datasourceIds: [String!]!, $size: Int!) {
-  disease(efoId: $efoId) {
-    id
-    name
-    evidences(datasourceIds: $datasourceIds, ensemblIds:
-              $ensemblIds, size: $size) {
-      count
-      rows {
+EVIDENCE_ID_FIELDS = """
         disease {
             id
             name
@@ -178,16 +176,22 @@ query targetDiseaseEvidence($efoId: String!, $ensemblIds: [String!]!,
             id
             approvedSymbol
         }
+        datasourceId
+        datatypeId
+        score
+"""
+
+EVIDENCE_LITERATURE_FIELDS = """
+        literature
+        publicationYear
+"""
+
+EVIDENCE_DETAIL_FIELDS = """
         urls{
           url
           niceName
         }
         diseaseFromSource
-        literature
-        publicationYear
-        datasourceId
-        datatypeId
-        score
         resourceScore
         textMiningSentences{
             section
@@ -203,29 +207,99 @@ query targetDiseaseEvidence($efoId: String!, $ensemblIds: [String!]!,
                 label
             }
             numberSamplesTested
-                numberMutatedSamples
-            }
-      }
+            numberMutatedSamples
+        }
+"""
+
+EVIDENCE_PROFILES = {
+    "ids-only": (EVIDENCE_ID_FIELDS,),
+    "literature": (EVIDENCE_ID_FIELDS, EVIDENCE_LITERATURE_FIELDS),
+    "full": (EVIDENCE_ID_FIELDS, EVIDENCE_LITERATURE_FIELDS, EVIDENCE_DETAIL_FIELDS),
+}
+
+TARGET_DISEASE_EVIDENCE_TEMPLATE = """
+query targetDiseaseEvidence($efoId: String!, $ensemblIds: [String!]!,
+                            $datasourceIds: [String!]!, $size: Int!,
+                            $cursor: String) {
+  disease(efoId: $efoId) {
+    id
+    name
+    evidences(datasourceIds: $datasourceIds, ensemblIds:
+              $ensemblIds, size: $size, cursor: $cursor) {
+      count
+      cursor
+      rows {%s      }
     }
   }
 }
 """
 
+TARGET_DISEASE_EVIDENCE_QUERIES = {
+    profile: TARGET_DISEASE_EVIDENCE_TEMPLATE
+    % "".join("\n" + fields.strip("\n") for fields in field_blocks + ("",))
+    for profile, field_blocks in EVIDENCE_PROFILES.items()
+}
+
+TARGET_DISEASE_EVIDENCE_QUERY = TARGET_DISEASE_EVIDENCE_QUERIES["full"]
+
+# one aliased search per symbol, see _search_targets_query
+SEARCH_TARGET_FIELDS = """
+    hits {
+        id
+        entity
+        object {
+            ... on Target {
+                approvedSymbol
+                symbolSynonyms {
+                    label
+                }
+                obsoleteSymbols {
+                    label
+                }
+            }
+        }
+    }
+"""
+
+# targets per request of request_ot_target_disease_evidences_batch
+EVIDENCE_BATCH_SIZE = 50
+
+# symbols searched per request and hits returned per symbol
+SEARCH_BATCH_SIZE = 50
+
+SEARCH_PAGE_SIZE = 10
+
+# persistent cache of map_symbols_to_ensembl
+SYMBOL_CACHE_NAME = "ot_gene_symbols.sqlite"
+
+SYMBOL_CACHE_EXPIRE_AFTER = timedelta(days=30)
+
+for _query in (
+    TARGET_ANNOTATION,
+    ASSOCIATED_TARGETS_QUERY,
+    *TARGET_DISEASE_EVIDENCE_QUERIES.values(),
+):
+    graphql.QUERY_REGISTRY.register(_query)
+
 
 @typeguard.typechecked
-def request_ot_target_annotation(ensembl_id: str, **kwargs) -> dict:
+def request_ot_target_annotation(
+    ensembl_id: str, parquet_dir: typing.Optional[str] = None, **kwargs
+) -> dict:
     """Find target annotations
     Query constructed from
     https://api.platform.opentargets.org/api/v4/graphql/browser
 
     Args:
         ensemble_id (str): ensemble ID such as ENSG00000149554
+        parquet_dir (str, optional): directory of Open Targets Platform parquet
+            datasets to answer from instead of the API. Defaults to None.
         **kwargs: extra parameters passed to analysis_functions.retry.Retryer
 
     Returns:
         dict: dictionary of target data from open targets
     """
-    if not _has_valid_ensemble_id(ensembl_id):
+    if not validators.is_valid_ensembl_id(ensembl_id):
         raise exceptions.InvalidEnsembleId(
             f"""
             {ensembl_id} is an invalid ensemble ID. Please specify an ID with an
@@ -234,9 +308,12 @@ def request_ot_target_annotation(ensembl_id: str, **kwargs) -> dict:
             """
         )
 
-    variables = {"ensemblId": ensembl_id}
-    results = request_open_targets(TARGET_ANNOTATION, variables, **kwargs)
-    results = results.get("target", {})
+    if parquet_dir is not None:
+        results = get_parquet_backend(parquet_dir).target_annotation(ensembl_id)
+    else:
+        variables = {"ensemblId": ensembl_id}
+        results = request_open_targets(TARGET_ANNOTATION, variables, **kwargs)
+        results = results.get("target", {})
 
     if results is None:
         raise exceptions.EmptyOpenTargetsResponse(
@@ -251,30 +328,30 @@ def request_ot_target_annotation(ensembl_id: str, **kwargs) -> dict:
 
 
 @typeguard.typechecked
-def request_ot_associated_targets(efo_id: str, **kwargs) -> dict:
+def request_ot_associated_targets(
+    efo_id: str, parquet_dir: typing.Optional[str] = None, **kwargs
+) -> dict:
     """Find targets associated with a disease
     Query constructed from
     https://api.platform.opentargets.org/api/v4/graphql/browser
 
     Args:
         efo_id (str): disease ID such as EFO_0001378
+        parquet_dir (str, optional): directory of Open Targets Platform parquet
+            datasets to answer from instead of the API. Defaults to None.
         **kwargs: extra parameters passed to analysis_functions.retry.Retryer
 
     Returns:
         dict: dictionary of disease data from open targets.
     """
-    if not _has_valid_disease_id(efo_id):
-        raise exceptions.InvalidDiseaseID(
-            f"""
-            {efo_id} is an invalid disease ID. Please specify an ID with an appropriate
-            ontology prefix such as EFO, MONDO, etc. followed by _#######. Please see
-            https://www.ebi.ac.uk/efo/ to look up your disease identifier.
-            """
-        )
+    _check_disease_id(efo_id, check_prefix=parquet_dir is None)
 
-    variables = {"efoId": efo_id}
-    results = request_open_targets(ASSOCIATED_TARGETS_QUERY, variables, **kwargs)
-    results = results.get("disease", {})
+    if parquet_dir is not None:
+        results = get_parquet_backend(parquet_dir).associated_targets(efo_id)
+    else:
+        variables = {"efoId": efo_id}
+        results = request_open_targets(ASSOCIATED_TARGETS_QUERY, variables, **kwargs)
+        results = results.get("disease", {})
 
     if results is None:
         raise exceptions.EmptyOpenTargetsResponse(
@@ -294,6 +371,8 @@ def request_ot_target_disease_evidences(
     ensembl_id: str,
     datasource_ids: typing.Union[list, str] = "europepmc",
     size: int = 10000,
+    profile: str = "full",
+    parquet_dir: typing.Optional[str] = None,
     **kwargs,
 ) -> dict:
     """Find Target-Disease Evidences from Open Targets
@@ -308,57 +387,386 @@ def request_ot_target_disease_evidences(
             Defaults to "europepmc".
         size (int): number of evidences returned from open targets.
             Must be between 1 and 10000. Defaults to 10000
+        profile (str): which evidence fields to request, one of "ids-only",
+            "literature" or "full". Smaller profiles skip heavy fields such as
+            textMiningSentences. Defaults to "full".
+        parquet_dir (str, optional): directory of Open Targets Platform parquet
+            datasets to answer from instead of the API. Defaults to None.
         **kwargs: extra parameters passed to analysis_functions.retry.Retryer
 
     Returns:
         dict: dictionary of disease data and target evidences from open targets.
     """
-    if not _has_valid_disease_id(efo_id):
-        raise exceptions.InvalidDiseaseID(
-            f"""
-            {efo_id} is an invalid disease ID. Please specify an ID with an appropriate
-            ontology prefix such as EFO, MONDO, etc. followed by _#######. Please see
-            https://www.ebi.ac.uk/efo/ to look up your disease identifier.
-            """
-        )
-    if not _has_valid_ensemble_id(ensembl_id):
-        raise exceptions.InvalidEnsembleId(
-            f"""
-            {ensembl_id} is an invalid ensemble ID. Please specify an ID with an
-            appropriate ENSG prefix followed by 11 digits. Please see
-            https://www.genecards.org to look up your ensemble ID.
-            """
+    _check_target_disease_evidence_args(
+        efo_id, ensembl_id, size, profile, check_prefix=parquet_dir is None
+    )
+
+    variables = {
+        "efoId": efo_id,
+        "ensemblIds": [ensembl_id],
+        "datasourceIds": (
+            datasource_ids if isinstance(datasource_ids, list) else [datasource_ids]
+        ),
+        "size": size,
+        "cursor": None,
+    }
+    if parquet_dir is not None:
+        results = get_parquet_backend(parquet_dir).target_disease_evidences(
+            efo_id, ensembl_id, variables["datasourceIds"], size, profile
         )
-    if not _has_valid_size_param(size):
-        raise exceptions.InvalidQueryParameter(
-            f"size parameter must be within {OPEN_TARGETS_SIZE_BOUNDS}"
+        return _get_disease_from_evidence_response(
+            {"disease": results}, efo_id, ensembl_id
         )
 
+    results = request_open_targets(
+        TARGET_DISEASE_EVIDENCE_QUERIES[profile], variables, **kwargs
+    )
+    return _get_disease_from_evidence_response(results, efo_id, ensembl_id)
+
+
+@typeguard.typechecked
+def iter_ot_target_disease_evidences(
+    efo_id: str,
+    ensembl_id: str,
+    datasource_ids: typing.Union[list, str] = "europepmc",
+    page_size: int = 1000,
+    checkpoint_path: typing.Optional[str] = None,
+    profile: str = "full",
+    **kwargs,
+) -> typing.Iterator[dict]:
+    """Stream every Target-Disease Evidence from Open Targets by following cursors.
+
+    Unlike request_ot_target_disease_evidences, the evidences are not capped at
+    10000 rows. Only one page of evidences is held in memory at a time.
+
+    Args:
+        efo_id (str): disease ID such as EFO_0001378
+        ensemble_id (str): ensemble ID such as ENSG00000149554
+        datasource_ids (list, str): let open targets know what datasource to use.
+            Defaults to "europepmc".
+        page_size (int): number of evidences requested per page.
+            Must be between 1 and 10000. Defaults to 1000
+        checkpoint_path (str, optional): JSON file where the cursor of the next page
+            is saved once a page has been fully consumed. If the file exists, streaming
+            resumes from the saved cursor. The file is removed once all evidences
+            have been streamed. Defaults to None.
+        profile (str): which evidence fields to request, one of "ids-only",
+            "literature" or "full". Defaults to "full".
+        **kwargs: extra parameters passed to analysis_functions.retry.Retryer
+
+    Yields:
+        dict: one evidence row, in the same shape as disease->evidences->rows
+    """
+    _check_target_disease_evidence_args(efo_id, ensembl_id, page_size, profile)
+
     variables = {
         "efoId": efo_id,
         "ensemblIds": [ensembl_id],
         "datasourceIds": (
             datasource_ids if isinstance(datasource_ids, list) else [datasource_ids]
         ),
-        "size": size,
+        "size": page_size,
+        "cursor": None,
     }
-    results = request_open_targets(TARGET_DISEASE_EVIDENCE_QUERY, variables, **kwargs)
-    results = results.get("disease", {})
+    if checkpoint_path is not None:
+        checkpoint_path = os.path.expanduser(checkpoint_path)
+    return _stream_target_disease_evidences(
+        TARGET_DISEASE_EVIDENCE_QUERIES[profile], variables, checkpoint_path, **kwargs
+    )
 
-    if results is None:
-        raise exceptions.EmptyOpenTargetsResponse(
-            f"""
-            Returned empty response with {(efo_id, ensembl_id)}. Possible reason is an
-            invalid ensemble ID or disease ID. Please specify an ID with an appropriate
-            ENSG prefix followed by 11 digits Please see https://www.genecards.org to
-            look up your ensemble ID. Please specify an ID with an appropriate ontology
-            prefix such as EFO, MONDO, etc. followed by _#######. Please see
-            https://www.ebi.ac.uk/efo/ to look up your disease identifier.
-            """
+
+@typeguard.typechecked
+def request_ot_target_disease_evidences_by_datasource(
+    efo_id: str,
+    ensembl_id: str,
+    datasource_ids: list,
+    size: int = 10000,
+    profile: str = "full",
+    all_pages: bool = False,
+    max_workers: typing.Optional[int] = None,
+    **kwargs,
+) -> dict:
+    """Find Target-Disease Evidences with one concurrent query per datasource
+
+    Each datasource is paged independently, so every datasource gets its own
+    10000 row window and a slow datasource does not hold back the others. The
+    results are merged into the same shape as request_ot_target_disease_evidences.
+
+    Args:
+        efo_id (str): disease ID such as EFO_0001378
+        ensemble_id (str): ensemble ID such as ENSG00000149554
+        datasource_ids (list): datasources to query such as ["europepmc", "chembl"]
+        size (int): number of evidences returned per datasource (or page size when
+            all_pages is True). Must be between 1 and 10000. Defaults to 10000
+        profile (str): which evidence fields to request, one of "ids-only",
+            "literature" or "full". Defaults to "full".
+        all_pages (bool): follow cursors until every evidence of each datasource
+            is fetched. Defaults to False.
+        max_workers (int, optional): number of concurrent queries. Defaults to one
+            per datasource.
+        **kwargs: extra parameters passed to analysis_functions.retry.Retryer
+
+    Returns:
+        dict: dictionary of disease data and target evidences from open targets.
+            evidences->count is the sum over datasources and evidences->rows are
+            ordered by datasource as given in datasource_ids.
+    """
+    _check_target_disease_evidence_args(efo_id, ensembl_id, size, profile)
+    if len(datasource_ids) == 0:
+        raise exceptions.InvalidQueryParameter("datasource_ids must not be empty")
+
+    def fetch_datasource(datasource_id):
+        if all_pages:
+            rows = list(
+                iter_ot_target_disease_evidences(
+                    efo_id,
+                    ensembl_id,
+                    datasource_ids=datasource_id,
+                    page_size=size,
+                    profile=profile,
+                    **kwargs,
+                )
+            )
+            return {"evidences": {"count": len(rows), "rows": rows}}
+        return request_ot_target_disease_evidences(
+            efo_id,
+            ensembl_id,
+            datasource_ids=datasource_id,
+            size=size,
+            profile=profile,
+            **kwargs,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(datasource_ids)) as pool:
+        all_results = list(pool.map(fetch_datasource, datasource_ids))
+
+    return _merge_datasource_evidences(efo_id, all_results)
+
+
+@typeguard.typechecked
+def request_ot_target_disease_evidences_batch(
+    efo_ids: list,
+    ensembl_ids: list,
+    datasource_ids: typing.Union[list, str] = "europepmc",
+    size: int = 10000,
+    profile: str = "full",
+    batch_size: int = EVIDENCE_BATCH_SIZE,
+    max_workers: int = 4,
+    parquet_dir: typing.Optional[str] = None,
+    **kwargs,
+) -> dict:
+    """Find Target-Disease Evidences for many diseases and targets
+
+    Each request asks for the evidences of one disease and a batch of targets, the
+    requests are sent concurrently and the rows are split by target. A batch shares
+    one window of size rows, so each batch is first probed for its count with a one
+    row "ids-only" request. A batch with more evidences than size has its targets
+    requested one at a time, as with request_ot_target_disease_evidences, and a
+    batch without evidences is not requested again.
+
+    Args:
+        efo_ids (list): disease IDs such as EFO_0001378
+        ensembl_ids (list): ensemble IDs such as ENSG00000149554
+        datasource_ids (list, str): let open targets know what datasource to use.
+            Defaults to "europepmc".
+        size (int): number of evidences returned per request.
+            Must be between 1 and 10000. Defaults to 10000
+        profile (str): which evidence fields to request, one of "ids-only",
+            "literature" or "full". Defaults to "full".
+        batch_size (int, optional): targets per request. Defaults to
+            EVIDENCE_BATCH_SIZE.
+        max_workers (int, optional): number of concurrent requests. Defaults to 4.
+        parquet_dir (str, optional): directory of Open Targets Platform parquet
+            datasets to answer from instead of the API, all diseases and targets
+            are then read in one scan. Defaults to None.
+        **kwargs: extra parameters passed to analysis_functions.retry.Retryer
+
+    Returns:
+        dict: results by disease ID and ensemble ID, each in the shape of
+            request_ot_target_disease_evidences. Diseases unknown to Open Targets
+            are left out.
+    """
+    if batch_size < 1:
+        raise exceptions.InvalidQueryParameter("batch_size must be at least 1")
+    efo_ids = list(dict.fromkeys(efo_ids))
+    ensembl_ids = list(dict.fromkeys(ensembl_ids))
+    for efo_id in efo_ids:
+        _check_disease_id(efo_id, check_prefix=parquet_dir is None)
+    for ensembl_id in ensembl_ids:
+        _check_ensembl_id(ensembl_id)
+    _check_evidence_query_args(size, profile)
+    datasource_ids = (
+        datasource_ids if isinstance(datasource_ids, list) else [datasource_ids]
+    )
+    if parquet_dir is not None:
+        return get_parquet_backend(parquet_dir).target_disease_evidences_many(
+            efo_ids, ensembl_ids, datasource_ids, size, profile
         )
+
+    def fetch_each(efo_id, batch):
+        return {
+            ensembl_id: request_ot_target_disease_evidences(
+                efo_id,
+                ensembl_id,
+                datasource_ids=datasource_ids,
+                size=size,
+                profile=profile,
+                **kwargs,
+            )
+            for ensembl_id in batch
+        }
+
+    def fetch(job):
+        efo_id, batch = job
+        try:
+            if len(batch) == 1:
+                return fetch_each(efo_id, batch)
+            variables = {
+                "efoId": efo_id,
+                "ensemblIds": batch,
+                "datasourceIds": datasource_ids,
+                "size": 1,
+                "cursor": None,
+            }
+            # a one row probe for the count of the batch, so a batch over size
+            # rows is split before its evidences are requested
+            results = _get_disease_from_evidence_response(
+                request_open_targets(
+                    TARGET_DISEASE_EVIDENCE_QUERIES["ids-only"], variables, **kwargs
+                ),
+                efo_id,
+                ", ".join(batch),
+            )
+            count = (results.get("evidences") or {}).get("count") or 0
+            if count > size:
+                return fetch_each(efo_id, batch)
+            evidences = {}
+            if count > 0:
+                results = _get_disease_from_evidence_response(
+                    request_open_targets(
+                        TARGET_DISEASE_EVIDENCE_QUERIES[profile],
+                        {**variables, "size": size},
+                        **kwargs,
+                    ),
+                    efo_id,
+                    ", ".join(batch),
+                )
+                evidences = results.get("evidences") or {}
+                if evidences.get("cursor") is not None:
+                    return fetch_each(efo_id, batch)
+        except (exceptions.EmptyOpenTargetsResponse, typeguard.TypeCheckError):
+            # unknown disease, a TypeCheckError while type checks are enabled
+            return None
+
+        rows = {ensembl_id: [] for ensembl_id in batch}
+        for row in evidences.get("rows") or []:
+            rows.setdefault((row.get("target") or {}).get("id"), []).append(row)
+        return {
+            ensembl_id: {
+                **results,
+                "evidences": {
+                    "count": len(rows[ensembl_id]),
+                    "cursor": None,
+                    "rows": rows[ensembl_id],
+                },
+            }
+            for ensembl_id in batch
+        }
+
+    jobs = [
+        (efo_id, ensembl_ids[i : i + batch_size])
+        for efo_id in efo_ids
+        for i in range(0, len(ensembl_ids), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        found = list(pool.map(fetch, jobs))
+
+    results = {}
+    for (efo_id, _), by_target in zip(jobs, found):
+        if by_target is not None:
+            results.setdefault(efo_id, {}).update(by_target)
     return results
 
 
+@typeguard.typechecked
+def map_symbols_to_ensembl(
+    symbols: list,
+    batch_size: int = SEARCH_BATCH_SIZE,
+    max_workers: int = 4,
+    use_cache: bool = True,
+    **kwargs,
+) -> dict:
+    """Map many gene symbols to ensemble IDs with the Open Targets search
+
+    Symbols are searched in batches of aliased queries, one request per batch, and
+    the batches are sent concurrently. A symbol maps to the target with that approved
+    symbol, else to the first hit listing it as a synonym or obsolete symbol.
+    Mappings, including symbols without a match, are stored in a persistent cache,
+    so only new symbols are searched.
+
+    Args:
+        symbols (list): gene symbols such as BRAF, case-insensitive
+        batch_size (int, optional): symbols per request. Defaults to
+            SEARCH_BATCH_SIZE.
+        max_workers (int, optional): requests sent at the same time. Defaults to 4.
+        use_cache (bool, optional): read and update the persistent cache.
+            Defaults to True.
+        **kwargs: extra parameters passed to analysis_functions.retry.Retryer
+
+    Returns:
+        dict: ensemble ID by symbol, None if Open Targets found no match
+    """
+    if batch_size < 1:
+        raise exceptions.InvalidQueryParameter("batch_size must be at least 1")
+
+    symbols = list(dict.fromkeys(symbols))
+    keys = {symbol: symbol.strip().upper() for symbol in symbols}
+    cache = (
+        PersistentCache(SYMBOL_CACHE_NAME, SYMBOL_CACHE_EXPIRE_AFTER)
+        if use_cache
+        else None
+    )
+    ensembl_ids = cache.get_many(keys.values()) if cache is not None else {}
+    missing = [key for key in dict.fromkeys(keys.values()) if key not in ensembl_ids]
+
+    def search_batch(batch):
+        query = _search_targets_query(len(batch))
+        variables = {f"q{i}": key for i, key in enumerate(batch)}
+        results = request_open_targets(query, variables, **kwargs)
+        return {
+            key: _find_target_hit(key, (results.get(f"q{i}") or {}).get("hits") or [])
+            for i, key in enumerate(batch)
+        }
+
+    batches = [
+        missing[start : start + batch_size]
+        for start in range(0, len(missing), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for resolved in pool.map(search_batch, batches):
+            ensembl_ids.update(resolved)
+            if cache is not None:
+                cache.set_many(resolved)
+
+    return {symbol: ensembl_ids[key] for symbol, key in keys.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def get_parquet_backend(parquet_dir: str):
+    """Open (once per directory) a local Open Targets Platform parquet backend
+
+    Args:
+        parquet_dir (str): directory of Open Targets Platform parquet datasets
+
+    Returns:
+        OpenTargetsParquet: backend answering target annotation, associated target
+            and disease evidence lookups locally
+    """
+    from .open_targets_parquet import OpenTargetsParquet
+
+    return OpenTargetsParquet(parquet_dir)
+
+
 @typeguard.typechecked
 def request_open_targets(query: str, variables: dict, **retry_kwargs) -> dict:
     """Generic functions for submitting queries to OpenTargets
@@ -381,9 +789,7 @@ def request_open_targets(query: str, variables: dict, **retry_kwargs) -> dict:
 
     @retry.Retryer(**retry_kwargs)
     def make_response():
-        response = session.post(
-            BASE_URL, json={"query": query, "variables": variables}, timeout=None
-        )
+        response = graphql.QUERY_REGISTRY.post(session, BASE_URL, query, variables)
         if not _has_valid_status(response):
             raise exceptions.InvalidStatusCode(
                 f"Bad status code with response result\n{response.json()}"
@@ -393,36 +799,180 @@ def request_open_targets(query: str, variables: dict, **retry_kwargs) -> dict:
     return make_response()
 
 
-@typeguard.typechecked
-def _has_valid_disease_id(disease_id: str) -> bool:
-    matched_patterns = re.findall(VALID_DISEASE_ID_PATTERNS, disease_id)
-    contains_one_underscore = re.findall("_", disease_id)
-    return (
-        not disease_id.isdigit()
-        and disease_id != ""
-        and matched_patterns == list(disease_id)
-        and len(contains_one_underscore) == 1
+@internal_typechecked
+def _check_disease_id(efo_id: str, check_prefix: bool = True):
+    # the prefix list comes from OLS, which local parquet lookups do not need
+    prefixes = ontology_source.get_ontology_prefixes() if check_prefix else None
+    if not validators.is_valid_disease_id(efo_id, prefixes):
+        raise exceptions.InvalidDiseaseID(
+            f"""
+            {efo_id} is an invalid disease ID. Please specify an ID with an appropriate
+            ontology prefix such as EFO, MONDO, etc. followed by _#######. Please see
+            https://www.ebi.ac.uk/efo/ to look up your disease identifier.
+            """
+        )
+
+
+@internal_typechecked
+def _check_target_disease_evidence_args(
+    efo_id: str, ensembl_id: str, size: int, profile: str, check_prefix: bool = True
+):
+    _check_disease_id(efo_id, check_prefix)
+    _check_ensembl_id(ensembl_id)
+    _check_evidence_query_args(size, profile)
+
+
+@internal_typechecked
+def _check_ensembl_id(ensembl_id: str):
+    if not validators.is_valid_ensembl_id(ensembl_id):
+        raise exceptions.InvalidEnsembleId(
+            f"""
+            {ensembl_id} is an invalid ensemble ID. Please specify an ID with an
+            appropriate ENSG prefix followed by 11 digits. Please see
+            https://www.genecards.org to look up your ensemble ID.
+            """
+        )
+
+
+@internal_typechecked
+def _check_evidence_query_args(size: int, profile: str):
+    if not _has_valid_size_param(size):
+        raise exceptions.InvalidQueryParameter(
+            f"size parameter must be within {OPEN_TARGETS_SIZE_BOUNDS}"
+        )
+    if profile not in EVIDENCE_PROFILES:
+        raise exceptions.InvalidQueryParameter(
+            f"profile parameter must be one of {list(EVIDENCE_PROFILES)}"
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _search_targets_query(n_symbols: int) -> str:
+    # registered once per batch size, so only the last batch of a call adds a query
+    variables = ", ".join(f"$q{i}: String!" for i in range(n_symbols))
+    searches = "".join(
+        f"""
+  q{i}: search(queryString: $q{i}, entityNames: ["target"],
+               page: {{index: 0, size: {SEARCH_PAGE_SIZE}}}) {{{SEARCH_TARGET_FIELDS}  }}"""
+        for i in range(n_symbols)
     )
+    query = f"query searchTargets({variables}) {{{searches}\n}}\n"
+    graphql.QUERY_REGISTRY.register(query)
+    return query
+
+
+@internal_typechecked
+def _find_target_hit(symbol: str, hits: list) -> typing.Optional[str]:
+    targets = [x for x in hits if x.get("entity") == "target"]
+    for hit in targets:
+        if ((hit.get("object") or {}).get("approvedSymbol") or "").upper() == symbol:
+            return hit["id"]
+    for hit in targets:
+        target = hit.get("object") or {}
+        labels = (target.get("symbolSynonyms") or []) + (
+            target.get("obsoleteSymbols") or []
+        )
+        if symbol in {(x.get("label") or "").upper() for x in labels}:
+            return hit["id"]
+    return None
 
 
-@typeguard.typechecked
-def _has_valid_ensemble_id(ensemble_id: str) -> bool:
-    ensemble_digits = _extract_digits_from_string(ensemble_id)
-    is_ensemble_prefix = re.match("^ENSG", ensemble_id)
-    return is_ensemble_prefix is not None and len(ensemble_digits) == 11
+@internal_typechecked
+def _get_disease_from_evidence_response(
+    results: dict, efo_id: str, ensembl_id: str
+) -> dict:
+    results = results.get("disease", {})
+
+    if results is None:
+        raise exceptions.EmptyOpenTargetsResponse(
+            f"""
+            Returned empty response with {(efo_id, ensembl_id)}. Possible reason is an
+            invalid ensemble ID or disease ID. Please specify an ID with an appropriate
+            ENSG prefix followed by 11 digits Please see https://www.genecards.org to
+            look up your ensemble ID. Please specify an ID with an appropriate ontology
+            prefix such as EFO, MONDO, etc. followed by _#######. Please see
+            https://www.ebi.ac.uk/efo/ to look up your disease identifier.
+            """
+        )
+    return results
 
 
-@typeguard.typechecked
-def _extract_digits_from_string(string: str) -> str:
-    return re.sub("[^0-9]", "", string)
+@internal_typechecked
+def _stream_target_disease_evidences(
+    query: str, variables: dict, checkpoint_path: typing.Optional[str], **kwargs
+) -> typing.Iterator[dict]:
+    query_key = {k: v for k, v in variables.items() if k not in ("size", "cursor")}
+    if checkpoint_path is not None:
+        variables["cursor"] = _read_evidence_checkpoint(checkpoint_path, query_key)
+
+    while True:
+        results = request_open_targets(query, variables, **kwargs)
+        evidences = _get_disease_from_evidence_response(
+            results, variables["efoId"], variables["ensemblIds"][0]
+        ).get("evidences") or {}
+        rows = evidences.get("rows") or []
+        cursor = evidences.get("cursor")
+
+        yield from rows
+
+        if cursor is None or len(rows) == 0:
+            break
+        variables["cursor"] = cursor
+        if checkpoint_path is not None:
+            _write_evidence_checkpoint(checkpoint_path, query_key, cursor)
+
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+@internal_typechecked
+def _merge_datasource_evidences(efo_id: str, all_results: list) -> dict:
+    merged = {"id": efo_id, "name": None}
+    count = 0
+    rows = []
+    for results in all_results:
+        for key in ("id", "name"):
+            if results.get(key) is not None:
+                merged[key] = results[key]
+        evidences = results.get("evidences") or {}
+        count += evidences.get("count") or 0
+        rows.extend(evidences.get("rows") or [])
+    if merged["name"] is None and len(rows) > 0:
+        merged["name"] = (rows[0].get("disease") or {}).get("name")
+    merged["evidences"] = {"count": count, "cursor": None, "rows": rows}
+    return merged
+
+
+@internal_typechecked
+def _read_evidence_checkpoint(
+    checkpoint_path: str, query_key: dict
+) -> typing.Optional[str]:
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "r", encoding="UTF-8") as file:
+        checkpoint = json.load(file)
+    if checkpoint.get("query") != query_key:
+        raise exceptions.InvalidQueryParameter(
+            f"checkpoint {checkpoint_path} was written for a different query:"
+            f" {checkpoint.get('query')}"
+        )
+    return checkpoint.get("cursor")
 
 
-@typeguard.typechecked
+@internal_typechecked
+def _write_evidence_checkpoint(checkpoint_path: str, query_key: dict, cursor: str):
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, "w", encoding="UTF-8") as file:
+        json.dump({"query": query_key, "cursor": cursor}, file)
+    os.replace(temp_path, checkpoint_path)
+
+
+@internal_typechecked
 def _has_valid_size_param(size: int) -> bool:
     min_size, max_size = OPEN_TARGETS_SIZE_BOUNDS
     return min_size <= size <= max_size
 
 
-@typeguard.typechecked
+@internal_typechecked
 def _has_valid_status(response: requests.models.Response) -> bool:
     return response.status_code == VALID_STATUS_CODE
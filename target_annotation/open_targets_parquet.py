@@ -0,0 +1,505 @@
+"""
+Methods to look up Open Targets records from a local copy of the Open Targets
+Platform parquet datasets instead of the GraphQL API. Options currently supported are:
+
+1. Target annotation
+2. Associated targets to disease
+3. Disease - Target evidence
+
+The datasets can be downloaded from https://platform.opentargets.org/downloads and
+are expected in one directory, e.g.
+
+    data_dir/
+        targets/
+        diseases/
+        evidence/sourceId=europepmc/
+        associationByOverallIndirect/
+        knownDrugsAggregated/
+        expression/
+        targetEssentiality/
+
+Results have the same shape as the dictionaries returned by the GraphQL queries in
+open_targets. Datasets or columns missing from data_dir are returned as None.
+Requires pyarrow.
+"""
+
+import os
+import typing
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from .utils.typecheck import internal_typechecked
+
+PARQUET_DATASETS = {
+    "targets": "targets",
+    "diseases": "diseases",
+    "evidence": "evidence",
+    "associations": "associationByOverallIndirect",
+    "known_drugs": "knownDrugsAggregated",
+    "expression": "expression",
+    "essentiality": "targetEssentiality",
+}
+
+TARGET_COLUMNS = [
+    "id",
+    "approvedSymbol",
+    "biotype",
+    "proteinIds",
+    "go",
+    "targetClass",
+    "functionDescriptions",
+    "tractability",
+    "constraint",
+    "pathways",
+    "chemicalProbes",
+    "safetyLiabilities",
+]
+
+EVIDENCE_PROFILE_COLUMNS = {
+    "ids-only": [
+        "diseaseId",
+        "targetId",
+        "datasourceId",
+        "datatypeId",
+        "score",
+    ],
+    "literature": [
+        "diseaseId",
+        "targetId",
+        "datasourceId",
+        "datatypeId",
+        "score",
+        "literature",
+        "publicationYear",
+    ],
+    "full": [
+        "diseaseId",
+        "targetId",
+        "datasourceId",
+        "datatypeId",
+        "score",
+        "literature",
+        "publicationYear",
+        "urls",
+        "diseaseFromSource",
+        "resourceScore",
+        "textMiningSentences",
+        "significantDriverMethods",
+        "cohortId",
+        "cohortShortName",
+        "cohortDescription",
+        "mutatedSamples",
+    ],
+}
+
+
+@internal_typechecked
+class OpenTargetsParquet:
+    """Answer Open Targets queries from a directory of parquet datasets"""
+
+    def __init__(self, data_dir: str, datasets: typing.Optional[dict] = None):
+        """Initialize Class
+
+        Args:
+            data_dir (str): directory holding the Open Targets parquet datasets.
+            datasets (dict, optional): overrides for the dataset directory names in
+                PARQUET_DATASETS. Defaults to None.
+        """
+        self.data_dir = os.path.expanduser(data_dir)
+        self.dataset_names = {**PARQUET_DATASETS, **(datasets or {})}
+        self._datasets = {}
+
+        if not os.path.isdir(self.data_dir):
+            raise FileNotFoundError(f"{self.data_dir} is not a directory")
+
+    def target_annotations(self, ensembl_ids: list) -> dict:
+        """Find target annotations for many targets with one scan per dataset
+
+        Args:
+            ensembl_ids (list): ensemble IDs such as ENSG00000149554
+
+        Returns:
+            dict: target data by ensemble ID, in the shape of
+                open_targets.TARGET_ANNOTATION. Unknown targets are left out.
+        """
+        targets = {
+            row["id"]: row
+            for row in self._select("targets", "id", ensembl_ids, TARGET_COLUMNS)
+        }
+        if len(targets) == 0:
+            return {}
+        ensembl_ids = list(targets)
+
+        expressions = {
+            row["id"]: row["tissues"]
+            for row in self._select("expression", "id", ensembl_ids, ["id", "tissues"])
+        }
+        essentiality = {
+            row["id"]: (row["geneEssentiality"] or [{}])[0]
+            for row in self._select(
+                "essentiality", "id", ensembl_ids, ["id", "geneEssentiality"]
+            )
+        }
+        associations = self._group_by(
+            self._select(
+                "associations",
+                "targetId",
+                ensembl_ids,
+                ["targetId", "diseaseId", "score"],
+            ),
+            "targetId",
+        )
+        known_drugs = self._group_by(
+            self._select(
+                "known_drugs",
+                "targetId",
+                ensembl_ids,
+                ["targetId", "diseaseId", "prefName", "label", "drugType"],
+            ),
+            "targetId",
+        )
+        disease_names = self._disease_names(
+            [row["diseaseId"] for rows in associations.values() for row in rows]
+            + [row["diseaseId"] for rows in known_drugs.values() for row in rows]
+        )
+
+        return {
+            ensembl_id: self._format_target(
+                target,
+                expressions.get(ensembl_id),
+                essentiality.get(ensembl_id),
+                associations.get(ensembl_id, []),
+                known_drugs.get(ensembl_id, []),
+                disease_names,
+            )
+            for ensembl_id, target in targets.items()
+        }
+
+    def target_annotation(self, ensembl_id: str) -> typing.Optional[dict]:
+        """Find target annotations
+
+        Args:
+            ensemble_id (str): ensemble ID such as ENSG00000149554
+
+        Returns:
+            dict: target data, or None if the target is not in the targets dataset
+        """
+        return self.target_annotations([ensembl_id]).get(ensembl_id)
+
+    def associated_targets(self, efo_id: str) -> typing.Optional[dict]:
+        """Find targets associated with a disease
+
+        Args:
+            efo_id (str): disease ID such as EFO_0001378
+
+        Returns:
+            dict: disease data in the shape of open_targets.ASSOCIATED_TARGETS_QUERY,
+                or None if the disease is not in the diseases dataset
+        """
+        disease_names = self._disease_names([efo_id])
+        if efo_id not in disease_names:
+            return None
+
+        rows = sorted(
+            self._select("associations", "diseaseId", [efo_id], ["targetId", "score"]),
+            key=lambda x: x["score"],
+            reverse=True,
+        )
+        symbols = {
+            row["id"]: row["approvedSymbol"]
+            for row in self._select(
+                "targets",
+                "id",
+                [row["targetId"] for row in rows],
+                ["id", "approvedSymbol"],
+            )
+        }
+        return {
+            "id": efo_id,
+            "name": disease_names[efo_id],
+            "associatedTargets": {
+                "count": len(rows),
+                "rows": [
+                    {
+                        "target": {
+                            "id": row["targetId"],
+                            "approvedSymbol": symbols.get(row["targetId"]),
+                        },
+                        "score": row["score"],
+                    }
+                    for row in rows
+                ],
+            },
+        }
+
+    def target_disease_evidences(
+        self,
+        efo_id: str,
+        ensembl_id: str,
+        datasource_ids: list,
+        size: int = 10000,
+        profile: str = "full",
+    ) -> typing.Optional[dict]:
+        """Find Target-Disease Evidences
+
+        Args:
+            efo_id (str): disease ID such as EFO_0001378
+            ensemble_id (str): ensemble ID such as ENSG00000149554
+            datasource_ids (list): datasources to keep such as ["europepmc"]
+            size (int): maximum number of evidences returned. Defaults to 10000
+            profile (str): which evidence columns to read, one of "ids-only",
+                "literature" or "full". Defaults to "full".
+
+        Returns:
+            dict: disease data and target evidences in the shape of
+                open_targets.TARGET_DISEASE_EVIDENCE_QUERY, or None if the disease
+                is not in the diseases dataset
+        """
+        results = self.target_disease_evidences_many(
+            [efo_id], [ensembl_id], datasource_ids, size, profile
+        )
+        return results.get(efo_id, {}).get(ensembl_id)
+
+    def target_disease_evidences_many(
+        self,
+        efo_ids: list,
+        ensembl_ids: list,
+        datasource_ids: list,
+        size: int = 10000,
+        profile: str = "full",
+    ) -> dict:
+        """Find Target-Disease Evidences for many diseases and targets in one scan
+
+        Args:
+            efo_ids (list): disease IDs such as EFO_0001378
+            ensembl_ids (list): ensemble IDs such as ENSG00000149554
+            datasource_ids (list): datasources to keep such as ["europepmc"]
+            size (int): maximum number of evidences returned per disease and target.
+                Defaults to 10000
+            profile (str): which evidence columns to read, one of "ids-only",
+                "literature" or "full". Defaults to "full".
+
+        Returns:
+            dict: results by disease ID and ensemble ID, each in the shape of
+                target_disease_evidences. Diseases that are not in the diseases
+                dataset are left out.
+        """
+        disease_names = self._disease_names(efo_ids)
+        efo_ids = [x for x in dict.fromkeys(efo_ids) if x in disease_names]
+        ensembl_ids = list(dict.fromkeys(ensembl_ids))
+        if len(efo_ids) == 0:
+            return {}
+
+        dataset = self._dataset("evidence")
+        grouped = {}
+        if dataset is not None and len(ensembl_ids) > 0:
+            names = dataset.schema.names
+            source_field = "sourceId" if "sourceId" in names else "datasourceId"
+            table = dataset.to_table(
+                columns=[x for x in EVIDENCE_PROFILE_COLUMNS[profile] if x in names],
+                filter=(
+                    ds.field("diseaseId").isin(efo_ids)
+                    & ds.field("targetId").isin(ensembl_ids)
+                    & ds.field(source_field).isin(datasource_ids)
+                ),
+            )
+            if "score" in table.column_names:
+                table = table.take(
+                    pc.sort_indices(table, sort_keys=[("score", "descending")])
+                )
+            for row in table.to_pylist():
+                grouped.setdefault((row["diseaseId"], row["targetId"]), []).append(row)
+
+        symbols = {
+            row["id"]: row["approvedSymbol"]
+            for row in self._select(
+                "targets", "id", ensembl_ids, ["id", "approvedSymbol"]
+            )
+        }
+        results = {}
+        for efo_id in efo_ids:
+            results[efo_id] = {}
+            for ensembl_id in ensembl_ids:
+                rows = grouped.get((efo_id, ensembl_id), [])
+                results[efo_id][ensembl_id] = {
+                    "id": efo_id,
+                    "name": disease_names[efo_id],
+                    "evidences": {
+                        "count": len(rows),
+                        "cursor": None,
+                        "rows": [
+                            self._format_evidence(
+                                row,
+                                profile,
+                                disease_names[efo_id],
+                                symbols.get(ensembl_id),
+                            )
+                            for row in rows[:size]
+                        ],
+                    },
+                }
+        return results
+
+    def _dataset(self, name: str) -> typing.Optional[ds.Dataset]:
+        if name not in self._datasets:
+            path = os.path.join(self.data_dir, self.dataset_names[name])
+            self._datasets[name] = (
+                ds.dataset(path, format="parquet", partitioning="hive")
+                if os.path.exists(path)
+                else None
+            )
+        return self._datasets[name]
+
+    def _select(self, name: str, key: str, values: list, columns: list) -> list:
+        dataset = self._dataset(name)
+        if dataset is None or len(values) == 0:
+            return []
+        names = dataset.schema.names
+        table = dataset.to_table(
+            columns=[x for x in columns if x in names],
+            filter=ds.field(key).isin(list(set(values))),
+        )
+        return [
+            {column: row.get(column) for column in columns} for row in table.to_pylist()
+        ]
+
+    def _disease_names(self, disease_ids: list) -> dict:
+        return {
+            row["id"]: row["name"]
+            for row in self._select("diseases", "id", disease_ids, ["id", "name"])
+        }
+
+    @staticmethod
+    def _group_by(rows: list, key: str) -> dict:
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row[key], []).append(row)
+        return grouped
+
+    @staticmethod
+    def _format_target(
+        target: dict,
+        tissues: typing.Optional[list],
+        essentiality: typing.Optional[dict],
+        associations: list,
+        known_drugs: list,
+        disease_names: dict,
+    ) -> dict:
+        def project(values, keys):
+            if values is None:
+                return None
+            return [{key: value.get(key) for key in keys} for value in values]
+
+        essentiality = essentiality or {}
+        return {
+            "id": target["id"],
+            "approvedSymbol": target["approvedSymbol"],
+            "biotype": target["biotype"],
+            "proteinIds": project(target["proteinIds"], ["id", "source"]),
+            "geneOntology": (
+                None
+                if target["go"] is None
+                else [
+                    {
+                        "aspect": x.get("aspect"),
+                        "evidence": x.get("evidence"),
+                        "geneProduct": x.get("geneProduct"),
+                        "source": x.get("source"),
+                        "term": {"id": x.get("id"), "name": x.get("name")},
+                    }
+                    for x in target["go"]
+                ]
+            ),
+            "targetClass": project(target["targetClass"], ["id", "label", "level"]),
+            "functionDescriptions": target["functionDescriptions"],
+            "tractability": (
+                None
+                if target["tractability"] is None
+                else [
+                    {
+                        "modality": x.get("modality"),
+                        "label": x.get("label", x.get("id")),
+                        "value": x.get("value"),
+                    }
+                    for x in target["tractability"]
+                ]
+            ),
+            "geneticConstraint": project(
+                target["constraint"],
+                ["constraintType", "exp", "obs", "score", "oe", "oeLower", "oeUpper"],
+            ),
+            "pathways": project(target["pathways"], ["pathway", "topLevelTerm"]),
+            "expressions": (
+                None
+                if tissues is None
+                else [
+                    {
+                        "tissue": {"label": x.get("label")},
+                        "rna": {"value": (x.get("rna") or {}).get("value")},
+                    }
+                    for x in tissues
+                ]
+            ),
+            "associatedDiseases": {
+                "rows": [
+                    {
+                        "score": x["score"],
+                        "disease": {
+                            "id": x["diseaseId"],
+                            "name": disease_names.get(x["diseaseId"]),
+                        },
+                    }
+                    for x in sorted(
+                        associations, key=lambda x: x["score"], reverse=True
+                    )
+                ]
+            },
+            "isEssential": essentiality.get("isEssential"),
+            "depMapEssentiality": essentiality.get("depMapEssentiality"),
+            "chemicalProbes": project(target["chemicalProbes"], ["id", "drugId"]),
+            "knownDrugs": {
+                "rows": [
+                    {
+                        "prefName": x["prefName"],
+                        "label": x["label"],
+                        "drugType": x["drugType"],
+                        "disease": {
+                            "id": x["diseaseId"],
+                            "name": disease_names.get(x["diseaseId"]),
+                        },
+                    }
+                    for x in known_drugs
+                ]
+            },
+            "safetyLiabilities": project(
+                target["safetyLiabilities"],
+                [
+                    "event",
+                    "eventId",
+                    "biosamples",
+                    "effects",
+                    "studies",
+                    "datasource",
+                    "literature",
+                ],
+            ),
+        }
+
+    @staticmethod
+    def _format_evidence(
+        row: dict,
+        profile: str,
+        disease_name: typing.Optional[str],
+        approved_symbol: typing.Optional[str],
+    ) -> dict:
+        evidence = {
+            "disease": {"id": row["diseaseId"], "name": disease_name},
+            "target": {"id": row["targetId"], "approvedSymbol": approved_symbol},
+        }
+        for column in EVIDENCE_PROFILE_COLUMNS[profile][2:]:
+            evidence[column] = row.get(column)
+        if evidence.get("textMiningSentences") is not None:
+            evidence["textMiningSentences"] = [
+                {"section": x.get("section"), "text": x.get("text")}
+                for x in evidence["textMiningSentences"]
+            ]
+        return evidence
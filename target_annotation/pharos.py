@@ -1,34 +1,41 @@
+import functools
+import textwrap
+import typing
+import warnings
 import requests
 import requests_cache
 
-from .utils import retry, exceptions
+from .utils import retry, exceptions, graphql, validators
+from .utils.typecheck import internal_typechecked
 
 import typeguard
-import re
 from datetime import timedelta
 
 BASE_URL = "https://pharos-api.ncats.io/graphql"
 
 VALID_STATUS_CODE = 200
 
-TARGET_ANNOTATION = """
-query targetDetails($ensemblId: String!){
-  target(q:{stringid: $ensemblId}) {
-    name
-    preferredSymbol
-    tdl
-    fam
-    sym
-    description
-    novelty
+PHAROS_FIELDS = {
+    "name": "name",
+    "preferredSymbol": "preferredSymbol",
+    "tdl": "tdl",
+    "fam": "fam",
+    "sym": "sym",
+    "description": "description",
+    "novelty": "novelty",
+    "pantherClasses": """
     pantherClasses {
       name
       pcid
     }
+""",
+    "dto": """
     dto {
       name
       dtoid
     }
+""",
+    "gwas": """
     gwas {
       gwasid
       pvalue
@@ -38,6 +45,8 @@ query targetDetails($ensemblId: String!){
       }
       trait
     }
+""",
+    "gwasAnalytics": """
     gwasAnalytics {
       associations {
         meanRankScore
@@ -46,6 +55,8 @@ query targetDetails($ensemblId: String!){
         efoID
       }
     }
+""",
+    "pathways": """
     pathways {
       name
       pwid
@@ -55,10 +66,14 @@ query targetDetails($ensemblId: String!){
       }
       type
     }
+""",
+    "diseaseCounts": """
     diseaseCounts {
       name
       value
     }
+""",
+    "diseases": """
     diseases {
       name
       associationCount
@@ -75,15 +90,21 @@ query targetDetails($ensemblId: String!){
         source
       }
     }
+""",
+    "tissueSpecificity": """
     tissueSpecificity {
       name
       value
     }
+""",
+    "gtex": """
     gtex {
       log2foldchange
       tissue
       tpm
     }
+""",
+    "ppis": """
     ppis {
       nid
       props {
@@ -95,6 +116,8 @@ query targetDetails($ensemblId: String!){
         preferredSymbol
       }
     }
+""",
+    "tinx": """
     tinx{
       novelty
       score
@@ -103,25 +126,169 @@ query targetDetails($ensemblId: String!){
         doid
       }
     }
+""",
+}
+
+# "summary" holds the fields read by ExtractTable
+PHAROS_PROFILES = {
+    "summary": (
+        "name",
+        "sym",
+        "description",
+        "tdl",
+        "pantherClasses",
+        "dto",
+        "gwas",
+        "gwasAnalytics",
+        "pathways",
+        "diseases",
+        "tissueSpecificity",
+    ),
+    "full": tuple(PHAROS_FIELDS),
+}
+
+# top-N arguments of the nested collections, sized to what ExtractTable reads. A
+# limit of 0 leaves a collection out of the query and None sends no top argument.
+# ExtractTable lists every Pharos disease of a target in one cell, 100 keeps that
+# cell readable and covers most targets, and it keeps one pathway per pathway type,
+# which the first 50 pathways cover. ppis and tinx are not read by ExtractTable and
+# run into the thousands for well studied targets, so they are left out unless a
+# limit is passed. gtex has one row per GTEx tissue and no paging arguments.
+PHAROS_COLLECTION_LIMITS = {
+    "ppis": 0,
+    "tinx": 0,
+    "gtex": None,
+    "diseases": 100,
+    "pathways": 50,
+}
+
+# collections that take a top argument, the others can only be left out with 0
+PHAROS_PAGED_COLLECTIONS = ("ppis", "diseases", "pathways")
+
+TARGET_ANNOTATION_TEMPLATE = """
+query targetDetails($ensemblId: String!){
+  target(q:{stringid: $ensemblId}) {
+%s
   }
 }
 """
 
 
 @typeguard.typechecked
-def request_pharos_target_annotation(ensembl_id: str, **kwargs) -> dict:
+def build_target_annotation_query(
+    fields: typing.Tuple[str, ...],
+    limits: typing.Optional[typing.Dict[str, typing.Optional[int]]] = None,
+) -> str:
+    """Build the target annotation query for a selection of Pharos fields
+
+    Args:
+        fields (Tuple[str, ...]): keys of PHAROS_FIELDS. They are requested in the
+            order of PHAROS_FIELDS, so the same selection always gives the same
+            query.
+        limits (Dict[str, Optional[int]], optional): top-N limits for the nested
+            collections in PHAROS_COLLECTION_LIMITS, updating its defaults. 0 leaves
+            a collection out and None leaves it at the server default. Defaults to
+            None.
+
+    Returns:
+        str: GraphQL query with an $ensemblId variable
+    """
+    limits = {**PHAROS_COLLECTION_LIMITS, **(limits or {})}
+    return _build_target_annotation_query(
+        tuple(sorted(set(fields))), tuple(sorted(limits.items()))
+    )
+
+
+@functools.lru_cache(maxsize=None)
+@internal_typechecked
+def _build_target_annotation_query(
+    fields: typing.Tuple[str, ...],
+    limits: typing.Tuple[typing.Tuple[str, typing.Optional[int]], ...],
+) -> str:
+    unknown = set(fields) - set(PHAROS_FIELDS)
+    if len(fields) == 0 or unknown:
+        raise exceptions.InvalidQueryParameter(
+            f"fields must be a non-empty selection of {list(PHAROS_FIELDS)},"
+            f" got unknown fields {sorted(unknown)}"
+        )
+    for field, limit in limits:
+        if field not in PHAROS_COLLECTION_LIMITS:
+            raise exceptions.InvalidQueryParameter(
+                f"limits can only be set for {list(PHAROS_COLLECTION_LIMITS)},"
+                f" got {field}"
+            )
+        if limit is not None and limit < 0:
+            raise exceptions.InvalidQueryParameter(
+                f"limit for {field} must be a non-negative integer or None,"
+                f" got {limit}"
+            )
+        if limit and field not in PHAROS_PAGED_COLLECTIONS:
+            raise exceptions.InvalidQueryParameter(
+                f"{field} has no top argument, its limit must be 0 or None"
+            )
+
+    fields = tuple(x for x in fields if dict(limits).get(x) != 0)
+    if len(fields) == 0:
+        raise exceptions.InvalidQueryParameter(
+            "every selected field is left out by a limit of 0"
+        )
+
+    selections = []
+    for field, selection in PHAROS_FIELDS.items():
+        if field not in fields:
+            continue
+        selection = textwrap.dedent(selection).strip("\n")
+        limit = dict(limits).get(field)
+        if limit is not None:
+            selection = selection.replace(field, f"{field}(top: {limit})", 1)
+        selections.append(textwrap.indent(selection, "    "))
+    return TARGET_ANNOTATION_TEMPLATE % "\n".join(selections)
+
+
+TARGET_ANNOTATION_QUERIES = {
+    profile: build_target_annotation_query(fields)
+    for profile, fields in PHAROS_PROFILES.items()
+}
+
+TARGET_ANNOTATION = TARGET_ANNOTATION_QUERIES["full"]
+
+for _query in TARGET_ANNOTATION_QUERIES.values():
+    graphql.QUERY_REGISTRY.register(_query)
+
+
+@typeguard.typechecked
+def request_pharos_target_annotation(
+    ensembl_id: str,
+    profile: str = "full",
+    fields: typing.Optional[typing.List[str]] = None,
+    limits: typing.Optional[typing.Dict[str, typing.Optional[int]]] = None,
+    tcrd_db: typing.Optional[str] = None,
+    **kwargs,
+) -> dict:
     """Find target annotations
     Query constructed from
     https://pharos.nih.gov/api
 
     Args:
         ensemble_id (str): ensemble ID such as ENSG00000149554
+        profile (str, optional): which fields to request, "summary" for the fields
+            read by ExtractTable or "full". Large collections such as ppis, gtex and
+            tinx are only in "full", and ppis and tinx only with a limit. Defaults
+            to "full".
+        fields (List[str], optional): explicit selection of PHAROS_FIELDS, used
+            instead of profile. Defaults to None.
+        limits (Dict[str, Optional[int]], optional): top-N limits for the nested
+            collections, updating PHAROS_COLLECTION_LIMITS. 0 leaves a collection
+            out and None leaves it at the server default. Defaults to None.
+        tcrd_db (str, optional): path of a local TCRD SQLite database. When given,
+            the annotations are read from it instead of requested from the API.
+            Defaults to None.
         **kwargs: extra parameters passed to analysis_functions.retry.Retryer
 
     Returns:
         dict: dictionary of target data from Pharos
     """
-    if not _has_valid_ensemble_id(ensembl_id):
+    if not validators.is_valid_ensembl_id(ensembl_id):
         raise exceptions.InvalidEnsembleId(
             f"""
             {ensembl_id} is an invalid ensemble ID. Please specify an ID with an
@@ -130,9 +297,25 @@ def request_pharos_target_annotation(ensembl_id: str, **kwargs) -> dict:
             """
         )
 
-    variables = {"ensemblId": ensembl_id}
-    results = request_pharos(TARGET_ANNOTATION, variables, **kwargs)
-    results = results.get("target", {})
+    if fields is None and profile not in PHAROS_PROFILES:
+        raise exceptions.InvalidQueryParameter(
+            f"profile parameter must be one of {list(PHAROS_PROFILES)}"
+        )
+    selected = tuple(PHAROS_PROFILES[profile] if fields is None else fields)
+    if fields is None and limits is None:
+        query = TARGET_ANNOTATION_QUERIES[profile]
+    else:
+        # also validates fields and limits for the local backend
+        query = build_target_annotation_query(selected, limits)
+
+    if tcrd_db is not None:
+        results = get_tcrd_backend(tcrd_db).target_annotation(
+            ensembl_id, selected, limits
+        )
+    else:
+        variables = {"ensemblId": ensembl_id}
+        results = request_pharos(query, variables, **kwargs)
+        results = results.get("target", {})
 
     if results is None:
         raise exceptions.EmptyPharosResponse(
@@ -146,6 +329,31 @@ def request_pharos_target_annotation(ensembl_id: str, **kwargs) -> dict:
     return results
 
 
+@functools.lru_cache(maxsize=None)
+def get_tcrd_backend(tcrd_db: str):
+    """Open (once per file) a local Pharos TCRD backend
+
+    Args:
+        tcrd_db (str): path of a TCRD SQLite database
+
+    Returns:
+        PharosTCRD: backend answering target annotation lookups locally. A warning
+            is given when the database lacks the indexes in
+            pharos_tcrd.TCRD_INDEXES.
+    """
+    from .pharos_tcrd import PharosTCRD
+
+    backend = PharosTCRD(tcrd_db)
+    missing = backend.missing_indexes()
+    if missing:
+        warnings.warn(
+            f"{tcrd_db} is missing the lookup indexes {missing}, so lookups scan"
+            f" whole tables. Add them once with PharosTCRD({tcrd_db!r})"
+            ".create_indexes()"
+        )
+    return backend
+
+
 @typeguard.typechecked
 def request_pharos(query: str, variables: dict, **retry_kwargs) -> dict:
     """Generic functions for submitting queries to Pharos
@@ -168,9 +376,7 @@ def request_pharos(query: str, variables: dict, **retry_kwargs) -> dict:
 
     @retry.Retryer(**retry_kwargs)
     def make_response():
-        response = session.post(
-            BASE_URL, json={"query": query, "variables": variables}, timeout=None
-        )
+        response = graphql.QUERY_REGISTRY.post(session, BASE_URL, query, variables)
         if not _has_valid_status(response):
             raise exceptions.InvalidStatusCode(
                 f"Bad status code with response result\n{response.json()}"
@@ -180,18 +386,6 @@ def request_pharos(query: str, variables: dict, **retry_kwargs) -> dict:
     return make_response()
 
 
-@typeguard.typechecked
-def _has_valid_ensemble_id(ensemble_id: str) -> bool:
-    ensemble_digits = _extract_digits_from_string(ensemble_id)
-    is_ensemble_prefix = re.match("^ENSG", ensemble_id)
-    return is_ensemble_prefix is not None and len(ensemble_digits) == 11
-
-
-@typeguard.typechecked
-def _extract_digits_from_string(string: str) -> str:
-    return re.sub("[^0-9]", "", string)
-
-
-@typeguard.typechecked
+@internal_typechecked
 def _has_valid_status(response: requests.models.Response) -> bool:
     return response.status_code == VALID_STATUS_CODE
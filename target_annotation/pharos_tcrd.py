@@ -0,0 +1,523 @@
+"""
+Methods to look up Pharos target annotations from a local copy of TCRD, the
+relational database behind Pharos, instead of the Pharos GraphQL API.
+
+TCRD is distributed as a MySQL dump at http://juniper.health.unm.edu/tcrd/download/
+and is expected here converted to a single SQLite file with the TCRD table and
+column names, e.g. target, protein, t2tc, xref, pathway, disease, ppi and tinx_*.
+Targets are resolved through the Ensembl xrefs and protein.stringid, and every
+field is read with one query per batch of targets. The lookup indexes in
+TCRD_INDEXES are not part of the dump; add them once with
+PharosTCRD.create_indexes, otherwise the database is only read and
+pharos.get_tcrd_backend warns that lookups scan whole tables.
+
+Results have the same shape as the dictionaries returned by
+pharos.TARGET_ANNOTATION. Fields whose tables are missing from the database are
+returned as None. Collections with a limit of 0 are left out, as in the Pharos
+queries, and collections without a limit are returned in full rather than at the
+Pharos server default.
+"""
+
+import os
+import sqlite3
+import threading
+import typing
+from .pharos import PHAROS_FIELDS, PHAROS_COLLECTION_LIMITS
+from .utils.typecheck import internal_typechecked
+
+# SQLite limits the number of host parameters per statement
+MAX_PARAMETERS = 500
+
+# (table, columns) of the lookup indexes
+TCRD_INDEXES = (
+    ("xref", ["xtype", "value"]),
+    ("protein", ["stringid"]),
+    ("t2tc", ["protein_id"]),
+    ("p2pc", ["protein_id"]),
+    ("p2dto", ["protein_id"]),
+    ("gwas", ["protein_id"]),
+    ("tiga", ["protein_id"]),
+    ("pathway", ["protein_id"]),
+    ("pathway", ["name"]),
+    ("disease", ["protein_id"]),
+    ("tdl_info", ["protein_id"]),
+    ("gtex", ["protein_id"]),
+    ("ppi", ["protein1_id"]),
+    ("tinx_novelty", ["protein_id"]),
+    ("tinx_importance", ["protein_id"]),
+)
+
+TISSUE_SPECIFICITY_ITYPE = "%Tissue Specificity Index"
+
+PPI_PROPERTIES = ["p_int", "p_ni", "p_wrong", "score", "evidence", "interaction_type"]
+
+
+@internal_typechecked
+class PharosTCRD:
+    """Answer Pharos target annotation queries from a local TCRD SQLite database"""
+
+    def __init__(self, db_path: str, create_indexes: bool = False):
+        """Initialize Class
+
+        Args:
+            db_path (str): path of the TCRD SQLite database.
+            create_indexes (bool, optional): add the indexes in TCRD_INDEXES that
+                are missing, see create_indexes. Defaults to False.
+        """
+        self.db_path = os.path.expanduser(db_path)
+        if not os.path.isfile(self.db_path):
+            raise FileNotFoundError(f"{self.db_path} is not a file")
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self.tables = {
+            row["name"]
+            for row in self._connection.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')"
+            )
+        }
+        if create_indexes:
+            self.create_indexes()
+
+    def target_annotations(
+        self,
+        ensembl_ids: list,
+        fields: typing.Optional[typing.Iterable[str]] = None,
+        limits: typing.Optional[dict] = None,
+    ) -> dict:
+        """Find target annotations for many targets with one query per field
+
+        Args:
+            ensembl_ids (list): ensemble IDs such as ENSG00000149554
+            fields (Iterable[str], optional): keys of pharos.PHAROS_FIELDS.
+                Defaults to all fields.
+            limits (dict, optional): top-N limits for the nested collections,
+                updating pharos.PHAROS_COLLECTION_LIMITS. Defaults to None.
+
+        Returns:
+            dict: target data by ensemble ID, in the shape of
+                pharos.TARGET_ANNOTATION. Unknown targets are left out.
+        """
+        limits = {**PHAROS_COLLECTION_LIMITS, **(limits or {})}
+        fields = {
+            x
+            for x in (PHAROS_FIELDS if fields is None else fields)
+            if limits.get(x) != 0
+        }
+
+        protein_ids = self._resolve_ensembl_ids(ensembl_ids)
+        targets = {
+            row["protein_id"]: dict(row)
+            for row in self._select(
+                """
+                SELECT protein.id AS protein_id, protein.sym, protein.description,
+                       target.name, target.tdl, target.fam
+                FROM protein
+                JOIN t2tc ON t2tc.protein_id = protein.id
+                JOIN target ON target.id = t2tc.target_id
+                WHERE protein.id IN ({ids})
+                """,
+                list(set(protein_ids.values())),
+            )
+        }
+        if len(targets) == 0:
+            return {}
+
+        collections = {
+            field: self._collect(field, list(targets), limits.get(field))
+            for field in fields
+            if field in COLLECTIONS
+        }
+
+        results = {}
+        for ensembl_id, protein_id in protein_ids.items():
+            target = targets.get(protein_id)
+            if target is None:
+                continue
+            scalars = {
+                "name": target["name"],
+                "preferredSymbol": target["sym"],
+                "tdl": target["tdl"],
+                "fam": target["fam"],
+                "sym": target["sym"],
+                "description": target["description"],
+            }
+            results[ensembl_id] = {
+                field: (
+                    scalars[field]
+                    if field in scalars
+                    else _get_collection(collections[field], protein_id, field)
+                )
+                for field in PHAROS_FIELDS
+                if field in fields
+            }
+        return results
+
+    def target_annotation(
+        self,
+        ensembl_id: str,
+        fields: typing.Optional[typing.Iterable[str]] = None,
+        limits: typing.Optional[dict] = None,
+    ) -> typing.Optional[dict]:
+        """Find target annotations
+
+        Args:
+            ensemble_id (str): ensemble ID such as ENSG00000149554
+            fields (Iterable[str], optional): keys of pharos.PHAROS_FIELDS.
+                Defaults to all fields.
+            limits (dict, optional): top-N limits for the nested collections.
+                Defaults to None.
+
+        Returns:
+            dict: target data, or None if the target is not in the database
+        """
+        return self.target_annotations([ensembl_id], fields, limits).get(ensembl_id)
+
+    def close(self):
+        """Close the database connection"""
+        self._connection.close()
+
+    def create_indexes(self):
+        """Add the indexes in TCRD_INDEXES that are missing from the database
+
+        This writes to the database file and only needs to be run once per file.
+        """
+        with self._lock, self._connection:
+            for table, columns in TCRD_INDEXES:
+                if table in self.tables:
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {_index_name(table, columns)}"
+                        f" ON {table} ({', '.join(columns)})"
+                    )
+
+    def missing_indexes(self) -> list:
+        """List the indexes in TCRD_INDEXES that are missing from the database
+
+        Returns:
+            list: names of the missing indexes on tables in the database
+        """
+        with self._lock:
+            indexes = {
+                row["name"]
+                for row in self._connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index'"
+                )
+            }
+        return [
+            _index_name(table, columns)
+            for table, columns in TCRD_INDEXES
+            if table in self.tables and _index_name(table, columns) not in indexes
+        ]
+
+    def _select(self, sql: str, ids: list, *tables: str) -> list:
+        if len(ids) == 0 or not set(tables) <= self.tables:
+            return []
+        rows = []
+        with self._lock:
+            for start in range(0, len(ids), MAX_PARAMETERS):
+                chunk = ids[start : start + MAX_PARAMETERS]
+                rows.extend(
+                    self._connection.execute(
+                        sql.format(ids=", ".join("?" * len(chunk))), chunk
+                    ).fetchall()
+                )
+        return rows
+
+    def _resolve_ensembl_ids(self, ensembl_ids: list) -> dict:
+        ensembl_ids = list(dict.fromkeys(ensembl_ids))
+        protein_ids = {
+            row["value"]: row["protein_id"]
+            for row in self._select(
+                """
+                SELECT value, protein_id FROM xref
+                WHERE xtype = 'Ensembl' AND protein_id IS NOT NULL AND value IN ({ids})
+                """,
+                ensembl_ids,
+                "xref",
+            )
+        }
+        for row in self._select(
+            "SELECT stringid, id FROM protein WHERE stringid IN ({ids})",
+            [x for x in ensembl_ids if x not in protein_ids],
+            "protein",
+        ):
+            protein_ids.setdefault(row["stringid"], row["id"])
+        return {x: protein_ids[x] for x in ensembl_ids if x in protein_ids}
+
+    def _collect(
+        self, field: str, protein_ids: list, limit: typing.Optional[int]
+    ) -> typing.Optional[dict]:
+        tables, sql, formatter = COLLECTIONS[field]
+        if not set(tables) <= self.tables:
+            return None
+
+        grouped = {}
+        for row in self._select(sql, protein_ids, *tables):
+            grouped.setdefault(row["protein_id"], []).append(row)
+
+        if field == "pathways":
+            target_counts = self._pathway_target_counts(
+                [row["name"] for rows in grouped.values() for row in rows]
+            )
+            return {
+                protein_id: _format_pathways(rows, target_counts)[:limit]
+                for protein_id, rows in grouped.items()
+            }
+        return {
+            protein_id: formatter(rows)[:limit] if limit else formatter(rows)
+            for protein_id, rows in grouped.items()
+        }
+
+    def _pathway_target_counts(self, names: list) -> dict:
+        target_counts = {}
+        for row in self._select(
+            """
+            SELECT pathway.pwtype, pathway.name, target.tdl,
+                   COUNT(DISTINCT target.id) AS count
+            FROM pathway
+            JOIN t2tc ON t2tc.protein_id = pathway.protein_id
+            JOIN target ON target.id = t2tc.target_id
+            WHERE pathway.name IN ({ids})
+            GROUP BY pathway.pwtype, pathway.name, target.tdl
+            ORDER BY target.tdl
+            """,
+            list(set(names)),
+            "pathway",
+            "t2tc",
+            "target",
+        ):
+            target_counts.setdefault((row["pwtype"], row["name"]), []).append(
+                {"name": row["tdl"], "value": row["count"]}
+            )
+        return target_counts
+
+
+@internal_typechecked
+def _get_collection(
+    collection: typing.Optional[dict], protein_id: int, field: str
+) -> typing.Any:
+    if collection is None:
+        return None
+    if field in ("novelty", "gwasAnalytics"):
+        return collection.get(protein_id)
+    return collection.get(protein_id, [])
+
+
+@internal_typechecked
+def _format_gwas(rows: list) -> list:
+    gwas = []
+    for row in rows:
+        snps = [x.strip() for x in (row["snps"] or "").split(";")]
+        contexts = [x.strip() for x in (row["context"] or "").split(";")]
+        contexts += [contexts[-1]] * (len(snps) - len(contexts))
+        gwas.append(
+            {
+                "gwasid": str(row["id"]),
+                "pvalue": row["p_value"],
+                "snps": [
+                    {"name": snp, "value": context}
+                    for snp, context in zip(snps, contexts)
+                ],
+                "trait": row["disease_trait"],
+            }
+        )
+    return gwas
+
+
+@internal_typechecked
+def _index_name(table: str, columns: list) -> str:
+    return f"idx_{table}_{'_'.join(columns)}"
+
+
+@internal_typechecked
+def _format_pathways(rows: list, target_counts: dict) -> list:
+    return [
+        {
+            "name": row["name"],
+            "pwid": row["id_in_source"],
+            "targetCounts": target_counts.get((row["pwtype"], row["name"]), []),
+            "type": row["pwtype"],
+        }
+        for row in rows
+    ]
+
+
+@internal_typechecked
+def _group_diseases(rows: list) -> list:
+    diseases = {}
+    for row in rows:
+        diseases.setdefault(row["name"], []).append(row)
+    grouped = [
+        {
+            "name": name,
+            "associationCount": len(associations),
+            "directAssociationCount": len(associations),
+            "mondoID": next((x["mondoid"] for x in associations if x["mondoid"]), None),
+            "datasource_count": len({x["dtype"] for x in associations}),
+            "associations": [
+                {
+                    "disassid": str(x["id"]),
+                    "type": x["dtype"],
+                    "name": x["name"],
+                    "did": x["did"],
+                    "evidence": x["evidence"],
+                    "score": x["score"],
+                    "source": x["source"],
+                }
+                for x in associations
+            ],
+        }
+        for name, associations in diseases.items()
+    ]
+    return sorted(grouped, key=lambda x: (-x["datasource_count"], x["name"]))
+
+
+@internal_typechecked
+def _format_ppis(rows: list) -> list:
+    return [
+        {
+            "nid": row["uniprot"],
+            "props": [
+                {"name": name, "value": str(row[name])}
+                for name in PPI_PROPERTIES
+                if row[name] is not None
+            ],
+            "type": row["ppitype"],
+            "target": {"preferredSymbol": row["sym"]},
+        }
+        for row in rows
+    ]
+
+
+# field: (tables, query by protein_id, formatter of the rows of one protein)
+COLLECTIONS = {
+    "novelty": (
+        ("tinx_novelty",),
+        "SELECT protein_id, score FROM tinx_novelty WHERE protein_id IN ({ids})",
+        lambda rows: rows[0]["score"],
+    ),
+    "pantherClasses": (
+        ("p2pc", "panther_class"),
+        """
+        SELECT p2pc.protein_id, panther_class.name, panther_class.pcid
+        FROM p2pc JOIN panther_class ON panther_class.id = p2pc.panther_class_id
+        WHERE p2pc.protein_id IN ({ids})
+        """,
+        lambda rows: [{"name": x["name"], "pcid": x["pcid"]} for x in rows],
+    ),
+    "dto": (
+        ("p2dto", "dto"),
+        """
+        SELECT p2dto.protein_id, dto.name, dto.dtoid
+        FROM p2dto JOIN dto ON dto.dtoid = p2dto.dtoid
+        WHERE p2dto.protein_id IN ({ids})
+        """,
+        lambda rows: [{"name": x["name"], "dtoid": x["dtoid"]} for x in rows],
+    ),
+    "gwas": (
+        ("gwas",),
+        """
+        SELECT protein_id, id, p_value, snps, context, disease_trait
+        FROM gwas WHERE protein_id IN ({ids}) ORDER BY p_value
+        """,
+        _format_gwas,
+    ),
+    "gwasAnalytics": (
+        ("tiga",),
+        """
+        SELECT protein_id, meanRankScore, trait, efoid
+        FROM tiga WHERE protein_id IN ({ids}) ORDER BY meanRankScore DESC
+        """,
+        lambda rows: {
+            "associations": [
+                {
+                    "meanRankScore": x["meanRankScore"],
+                    "diseaseName": x["trait"],
+                    "trait": x["trait"],
+                    "efoID": x["efoid"],
+                }
+                for x in rows
+            ]
+        },
+    ),
+    "pathways": (
+        ("pathway",),
+        """
+        SELECT protein_id, name, id_in_source, pwtype
+        FROM pathway WHERE protein_id IN ({ids}) ORDER BY pwtype, name
+        """,
+        None,
+    ),
+    "diseaseCounts": (
+        ("disease",),
+        """
+        SELECT protein_id, name, COUNT(*) AS value
+        FROM disease WHERE protein_id IN ({ids})
+        GROUP BY protein_id, name ORDER BY value DESC, name
+        """,
+        lambda rows: [{"name": x["name"], "value": x["value"]} for x in rows],
+    ),
+    "diseases": (
+        ("disease",),
+        """
+        SELECT protein_id, id, dtype, name, did, evidence, score, source, mondoid
+        FROM disease WHERE protein_id IN ({ids}) ORDER BY id
+        """,
+        _group_diseases,
+    ),
+    "tissueSpecificity": (
+        ("tdl_info",),
+        """
+        SELECT protein_id, itype, number_value FROM tdl_info
+        WHERE protein_id IN ({ids}) AND itype LIKE '%s'
+        """ % TISSUE_SPECIFICITY_ITYPE,
+        lambda rows: [{"name": x["itype"], "value": x["number_value"]} for x in rows],
+    ),
+    "gtex": (
+        ("gtex",),
+        """
+        SELECT protein_id, log2foldchange, tissue, tpm
+        FROM gtex WHERE protein_id IN ({ids}) ORDER BY tissue
+        """,
+        lambda rows: [
+            {
+                "log2foldchange": x["log2foldchange"],
+                "tissue": x["tissue"],
+                "tpm": x["tpm"],
+            }
+            for x in rows
+        ],
+    ),
+    "ppis": (
+        ("ppi", "protein"),
+        """
+        SELECT ppi.protein1_id AS protein_id, ppi.ppitype, ppi.p_int, ppi.p_ni,
+               ppi.p_wrong, ppi.score, ppi.evidence, ppi.interaction_type,
+               protein.uniprot, protein.sym
+        FROM ppi JOIN protein ON protein.id = ppi.protein2_id
+        WHERE ppi.protein1_id IN ({ids})
+        ORDER BY COALESCE(ppi.p_int, ppi.score / 1000.0) DESC
+        """,
+        _format_ppis,
+    ),
+    "tinx": (
+        ("tinx_importance", "tinx_disease"),
+        """
+        SELECT tinx_importance.protein_id, tinx_importance.score,
+               tinx_disease.novelty, tinx_disease.name, tinx_disease.doid
+        FROM tinx_importance
+        JOIN tinx_disease ON tinx_disease.id = tinx_importance.disease_id
+        WHERE tinx_importance.protein_id IN ({ids})
+        ORDER BY tinx_importance.score DESC
+        """,
+        lambda rows: [
+            {
+                "novelty": x["novelty"],
+                "score": x["score"],
+                "disease": {"name": x["name"], "doid": x["doid"]},
+            }
+            for x in rows
+        ],
+    ),
+}
@@ -1,18 +1,33 @@
+import functools
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 import requests
 
 import pandas as pd
-import IPython
-from IPython.display import Image
-# from IPython.display import SVG, display
-from IPython import get_ipython
 import typeguard
-from typing import Union
-from .utils import retry, exceptions
+from typing import TYPE_CHECKING, Optional, Union
+from .utils import retry, exceptions, session
+from .utils.cache import PersistentCache
+from .utils.typecheck import internal_typechecked
+from .stringdb_graph import StringGraph
+
+if TYPE_CHECKING:
+    from IPython.display import SVG, Image
 
 VALID_STATUS_CODE = 200
 
 string_api_url = "https://version-12-0.string-db.org/api"
 
+# responses, including network images, and identifier mappings are cached for
+# this long
+STRING_CACHE_EXPIRE_AFTER = timedelta(days=30)
+
+STRING_CACHE_NAME = "stringdb_cache"
+
+# persistent cache of map_string_ids
+STRING_ID_CACHE_NAME = "stringdb_ids.sqlite"
+
 
 @typeguard.typechecked
 def get_interactions(
@@ -20,6 +35,8 @@ def get_interactions(
     net_type: str = "physical",
     required_score: int = 400,
     limit: int = 10,
+    string_store: Optional[str] = None,
+    map_ids: bool = True,
     **retry_kwargs,
 ) -> pd.DataFrame:
     """Returns top interactions for specific gene
@@ -29,15 +46,27 @@ def get_interactions(
         net_type (str, optional): "functional" or "physical". Defaults to "physical".
         required_score (int, optional): required score. Defaults to 400.
         limit (int, optional): number of nodes to add to network. Defaults to 5.
+        string_store (str, optional): directory of a local StringEdgeStore built
+            from the STRING links files, answering without the API. Defaults to
+            None.
+        map_ids (bool, optional): send stringdb ids resolved with map_string_ids
+            instead of the names. Defaults to True.
 
     Returns:
         pd.DataFrame: top interactions for gene.
         see https://string-db.org/help/api/#getting-all-the-string-interaction-partners-of-the-protein-set for more info.
     """
+    if string_store is not None:
+        return get_string_backend(string_store).interaction_partners(
+            [gene], net_type, required_score, limit
+        )
 
     method = "interaction_partners"
     output_format = "json"
 
+    if map_ids:
+        gene = _map_identifiers([gene], **retry_kwargs)[0]
+
     params = {
         "identifiers": gene,  # your protein list
         "species": 9606,  # species NCBI identifier
@@ -50,7 +79,7 @@ def get_interactions(
 
     @retry.Retryer(**retry_kwargs)
     def make_response():
-        response = requests.post(request_url, data=params, timeout=None)
+        response = _get_session().post(request_url, data=params, timeout=None)
         if not _has_valid_status(response):
             raise exceptions.InvalidStatusCode(
                 f"Bad status code with response result\n{response.json()}"
@@ -61,13 +90,99 @@ def get_interactions(
 
 
 @typeguard.typechecked
-def get_network(
+def get_interactions_batch(
     genes: list,
     net_type: str = "physical",
     required_score: int = 400,
     limit: int = 10,
+    chunk_size: int = 100,
+    max_workers: int = 1,
+    string_store: Optional[str] = None,
+    map_ids: bool = True,
     **retry_kwargs,
 ) -> pd.DataFrame:
+    """Returns top interactions for many genes with one request per chunk of genes
+
+    Args:
+        genes (list): list of gene names, protein names, or stringdb ids
+        net_type (str, optional): "functional" or "physical". Defaults to "physical".
+        required_score (int, optional): required score. Defaults to 400.
+        limit (int, optional): number of partners per gene. Defaults to 10.
+        chunk_size (int, optional): genes per request. Defaults to 100.
+        max_workers (int, optional): chunks requested at the same time. Defaults
+            to 1.
+        string_store (str, optional): directory of a local StringEdgeStore built
+            from the STRING links files, answering without the API. Defaults to
+            None.
+        map_ids (bool, optional): send stringdb ids resolved with map_string_ids
+            instead of the names. Defaults to True.
+
+    Returns:
+        pd.DataFrame: top interactions of all genes in the schema of
+        get_interactions, with the input gene of each row in a "query_gene" column.
+    """
+    if chunk_size < 1:
+        raise exceptions.InvalidQueryParameter("chunk_size must be at least 1")
+
+    method = "interaction_partners"
+    output_format = "json"
+    request_url = "/".join([string_api_url, output_format, method])
+    genes = list(dict.fromkeys(genes))
+
+    def post_chunk(chunk):
+        params = {
+            "identifiers": "\r".join(chunk),  # your protein list
+            "species": 9606,  # species NCBI identifier
+            "network_type": net_type,
+            "limit": limit,
+            "required_score": required_score,
+            "caller_identity": "Aitia",
+        }
+        response = _get_session().post(request_url, data=params, timeout=None)
+        if not _has_valid_status(response):
+            raise exceptions.InvalidStatusCode(
+                f"Bad status code with response result\n{response.json()}"
+            )
+        return response.json()
+
+    def make_response(chunk):
+        # a Retryer counts its tries, so every chunk gets its own
+        return retry.Retryer(**retry_kwargs)(post_chunk)(chunk)
+
+    if string_store is not None:
+        interactions = get_string_backend(string_store).interaction_partners(
+            genes, net_type, required_score, limit
+        )
+    else:
+        identifiers = _map_identifiers(genes, **retry_kwargs) if map_ids else genes
+        chunks = [
+            identifiers[i : i + chunk_size]
+            for i in range(0, len(identifiers), chunk_size)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            rows = [row for result in pool.map(make_response, chunks) for row in result]
+        interactions = pd.DataFrame.from_dict(rows)
+    interactions.insert(
+        0,
+        "query_gene",
+        _match_query_genes(
+            interactions, genes, identifiers if string_store is None else genes
+        ),
+    )
+    return interactions
+
+
+@typeguard.typechecked
+def get_network(
+    genes: list,
+    net_type: str = "physical",
+    required_score: int = 400,
+    limit: int = 10,
+    string_store: Optional[str] = None,
+    map_ids: bool = True,
+    as_graph: bool = False,
+    **retry_kwargs,
+) -> Union[pd.DataFrame, StringGraph]:
     """Returns top interactions for specific genes
 
     Args:
@@ -75,14 +190,28 @@ def get_network(
         net_type (str, optional): "functional" or "physical". Defaults to "physical".
         required_score (int, optional): required score. Defaults to 400.
         limit (int, optional): number of nodes to add to network. Defaults to 5.
+        string_store (str, optional): directory of a local StringEdgeStore built
+            from the STRING links files, answering without the API. Defaults to
+            None.
+        map_ids (bool, optional): send stringdb ids resolved with map_string_ids
+            instead of the names. Defaults to True.
+        as_graph (bool, optional): return a StringGraph instead of a DataFrame.
+            Defaults to False.
 
     Returns:
-        pd.Dataframe: top interactions for gene.
+        Union[pd.Dataframe, StringGraph]: top interactions for gene.
         see https://string-db.org/help/api/#getting-all-the-string-interaction-partners-of-the-protein-set for more info.
     """
+    if string_store is not None:
+        network = get_string_backend(string_store).network(
+            genes, net_type, required_score, limit
+        )
+        return StringGraph.from_frame(network) if as_graph else network
 
     method = "network"
     output_format = "json"
+    if map_ids:
+        genes = _map_identifiers(genes, **retry_kwargs)
 
     params = {
         "identifiers": "%0d".join(genes),  # your protein list
@@ -96,14 +225,107 @@ def get_network(
 
     @retry.Retryer(**retry_kwargs)
     def make_response():
-        response = requests.post(request_url, data=params, timeout=None)
+        response = _get_session().post(request_url, data=params, timeout=None)
         if not _has_valid_status(response):
             raise exceptions.InvalidStatusCode(
                 f"Bad status code with response result\n{response.json()}"
             )
         return response.json()
 
-    return pd.DataFrame.from_dict(make_response())
+    network = pd.DataFrame.from_dict(make_response())
+    return StringGraph.from_frame(network) if as_graph else network
+
+
+@typeguard.typechecked
+def expand_network(
+    seeds: list,
+    hops: int = 2,
+    net_type: str = "physical",
+    required_score: int = 400,
+    limit: int = 10,
+    max_nodes: Optional[int] = None,
+    chunk_size: int = 100,
+    max_workers: int = 4,
+    string_store: Optional[str] = None,
+    map_ids: bool = True,
+    edge_cache: Optional[dict] = None,
+    **retry_kwargs,
+) -> pd.DataFrame:
+    """Returns the interactions found by a breadth-first search around seed genes
+
+    Each hop requests the interaction partners of all new nodes of the previous hop
+    with get_interactions_batch, i.e. in chunks that can run in parallel. Nodes are
+    visited once and their partners are kept in edge_cache.
+
+    Args:
+        seeds (list): list of gene names, protein names, or stringdb ids
+        hops (int, optional): number of hops from the seeds. Defaults to 2.
+        net_type (str, optional): "functional" or "physical". Defaults to "physical".
+        required_score (int, optional): required score. Defaults to 400.
+        limit (int, optional): partners per node and hop. Defaults to 10.
+        max_nodes (int, optional): stop adding nodes, and their interactions, once
+            the network has this many nodes. Defaults to None.
+        chunk_size (int, optional): nodes per request. Defaults to 100.
+        max_workers (int, optional): chunks requested at the same time. Defaults
+            to 4.
+        string_store (str, optional): directory of a local StringEdgeStore built
+            from the STRING links files, answering without the API. Defaults to
+            None.
+        map_ids (bool, optional): resolve the seeds with map_string_ids. Defaults
+            to True.
+        edge_cache (dict, optional): partners by node, filled during the search.
+            Pass the same dict to reuse them in later expansions. Defaults to None.
+
+    Returns:
+        pd.DataFrame: each interaction once, in the schema of get_interactions with
+        the hop it was found at in a "hop" column.
+    """
+    if hops < 1:
+        raise exceptions.InvalidQueryParameter("hops must be at least 1")
+
+    edge_cache = {} if edge_cache is None else edge_cache
+    key = (net_type, required_score, limit, string_store)
+    frontier = list(dict.fromkeys(seeds))
+    if map_ids and string_store is None:
+        frontier = list(dict.fromkeys(_map_identifiers(frontier, **retry_kwargs)))
+    nodes = set()
+
+    edges = {}
+    for hop in range(1, hops + 1):
+        missing = [node for node in frontier if (key, node) not in edge_cache]
+        if len(missing) > 0:
+            partners = get_interactions_batch(
+                missing,
+                net_type=net_type,
+                required_score=required_score,
+                limit=limit,
+                chunk_size=chunk_size,
+                max_workers=max_workers,
+                string_store=string_store,
+                map_ids=False,
+                **retry_kwargs,
+            )
+            by_node = {node: [] for node in missing}
+            for row in partners.to_dict("records"):
+                by_node.setdefault(row.pop("query_gene"), []).append(row)
+            edge_cache.update(((key, node), rows) for node, rows in by_node.items())
+
+        rows = [row for node in frontier for row in edge_cache[(key, node)]]
+        # seeds given as names are only known by their STRING id after hop 1
+        nodes.update(row["stringId_A"] for row in rows)
+        frontier = []
+        for row in rows:
+            if row["stringId_B"] not in nodes:
+                if max_nodes is not None and len(nodes) >= max_nodes:
+                    continue
+                nodes.add(row["stringId_B"])
+                frontier.append(row["stringId_B"])
+            pair = tuple(sorted([row["stringId_A"], row["stringId_B"]]))
+            edges.setdefault(pair, {**row, "hop": hop})
+        if len(frontier) == 0:
+            break
+
+    return pd.DataFrame(list(edges.values()))
 
 
 @typeguard.typechecked
@@ -114,8 +336,12 @@ def get_network_plot(
     required_score: int = 400,
     limit: int = 10,
     display_image: bool = True,
+    map_ids: bool = True,
+    renderer: str = "string",
+    image_format: str = "svg",
+    string_store: Optional[str] = None,
     **retry_kwargs,
-) -> Union[IPython.core.display.Image, bytes]:
+) -> Union["Image", "SVG", bytes]:
     """Returns top interactions for specific gene
 
     Args:
@@ -124,18 +350,54 @@ def get_network_plot(
         network_flavor (str, optional): "evidence", "confidence", or "actions". Defaults to "evidence".
         required_score (int, optional): required score. Defaults to 400.
         limit (int, optional): number of nodes to add to network. Defaults to 5.
-
+        map_ids (bool, optional): send stringdb ids resolved with map_string_ids
+            instead of the names. Defaults to True.
+        renderer (str, optional): "string" downloads the image rendered by STRING,
+            "local" draws the get_network result with stringdb_plot, without
+            requests for networks in the response cache or a string_store.
+            Defaults to "string".
+        image_format (str, optional): "svg" or "png" for the local renderer.
+            Defaults to "svg".
+        string_store (str, optional): directory of a local StringEdgeStore used
+            by the local renderer. Defaults to None.
 
     Returns:
-        bytes: svg image as bytes.
+        bytes: png image (STRING) or image_format image (local) as bytes.
         see https://string-db.org/help/api/#getting-all-the-string-interaction-partners-of-the-protein-set for more info.
     """
+    if renderer not in ("string", "local"):
+        raise exceptions.InvalidQueryParameter(
+            f'renderer must be "string" or "local", got {renderer}'
+        )
+
+    if isinstance(genes, str):
+        genes = [genes]
+    if renderer == "local":
+        from .stringdb_plot import render_network
+
+        network = get_network(
+            genes,
+            net_type=net_type,
+            required_score=required_score,
+            limit=limit,
+            string_store=string_store,
+            map_ids=map_ids,
+            as_graph=True,
+            **retry_kwargs,
+        )
+        image = render_network(network, image_format, query_genes=genes)
+        if display_image and _in_notebook():
+            # pylint: disable=import-outside-toplevel
+            from IPython.display import SVG, Image
+
+            return SVG(image) if image_format == "svg" else Image(image)
+        return image
 
     output_format = "highres_image"
     method = "network"
 
-    if isinstance(genes, str):
-        genes = [genes]
+    if map_ids:
+        genes = _map_identifiers(genes, **retry_kwargs)
 
     params = {
         "identifiers": "%0d".join(genes),  # your protein list
@@ -150,18 +412,153 @@ def get_network_plot(
 
     @retry.Retryer(**retry_kwargs)
     def make_response():
-        response = requests.post(request_url, data=params, timeout=None)
+        response = _get_session().post(request_url, data=params, timeout=None)
         if not _has_valid_status(response):
             raise exceptions.InvalidStatusCode(
                 f"Bad status code with response result\n{response.content}"
             )
         return response.content
 
-    if (get_ipython().__class__.__name__ == "ZMQInteractiveShell") and display_image:
+    if display_image and _in_notebook():
+        from IPython.display import Image  # pylint: disable=import-outside-toplevel
+
         return Image(make_response())
     return make_response()
 
 
 @typeguard.typechecked
+def map_string_ids(
+    genes: list,
+    species: int = 9606,
+    chunk_size: int = 1000,
+    use_cache: bool = True,
+    **retry_kwargs,
+) -> dict:
+    """Map many gene names, protein names or identifiers to stringdb ids
+
+    Mappings, including identifiers STRING could not resolve, are stored in a
+    persistent cache for STRING_CACHE_EXPIRE_AFTER, so only new or expired
+    identifiers are sent to STRING.
+
+    Args:
+        genes (list): list of gene names, protein names, or stringdb ids
+        species (int, optional): NCBI taxon id. Defaults to 9606.
+        chunk_size (int, optional): identifiers per request. Defaults to 1000.
+        use_cache (bool, optional): read and update the persistent cache.
+            Defaults to True.
+
+    Returns:
+        dict: best matching stringdb id by gene, None if STRING found no match.
+        see https://string-db.org/help/api/#mapping-identifiers for more info.
+    """
+    if chunk_size < 1:
+        raise exceptions.InvalidQueryParameter("chunk_size must be at least 1")
+
+    method = "get_string_ids"
+    output_format = "json"
+    request_url = "/".join([string_api_url, output_format, method])
+    genes = list(dict.fromkeys(genes))
+
+    cache = (
+        PersistentCache(STRING_ID_CACHE_NAME, STRING_CACHE_EXPIRE_AFTER)
+        if use_cache
+        else None
+    )
+    cached = (
+        cache.get_many(f"{species}:{gene}" for gene in genes)
+        if cache is not None
+        else {}
+    )
+    string_ids = {
+        gene: cached[f"{species}:{gene}"]
+        for gene in genes
+        if f"{species}:{gene}" in cached
+    }
+    missing = [gene for gene in genes if gene not in string_ids]
+
+    def post_chunk(chunk):
+        params = {
+            "identifiers": "\r".join(chunk),  # your protein list
+            "species": species,  # species NCBI identifier
+            "limit": 1,  # only the best match
+            "echo_query": 1,
+            "caller_identity": "Aitia",
+        }
+        response = _get_session().post(request_url, data=params, timeout=None)
+        if not _has_valid_status(response):
+            raise exceptions.InvalidStatusCode(
+                f"Bad status code with response result\n{response.json()}"
+            )
+        return response.json()
+
+    for i in range(0, len(missing), chunk_size):
+        chunk = missing[i : i + chunk_size]
+        # a Retryer counts its tries, so every chunk gets its own
+        rows = retry.Retryer(**retry_kwargs)(post_chunk)(chunk)
+        found = {chunk[row["queryIndex"]]: row["stringId"] for row in rows}
+        resolved = {gene: found.get(gene) for gene in chunk}
+        string_ids.update(resolved)
+        if cache is not None:
+            cache.set_many(
+                {f"{species}:{gene}": value for gene, value in resolved.items()}
+            )
+
+    return {gene: string_ids[gene] for gene in genes}
+
+
+@functools.lru_cache(maxsize=None)
+def get_string_backend(string_store: str):
+    """Open (once per directory) a local STRING edge store
+
+    Args:
+        string_store (str): directory written by StringEdgeStore.build
+
+    Returns:
+        StringEdgeStore: backend answering interaction lookups locally
+    """
+    from .stringdb_local import StringEdgeStore
+
+    return StringEdgeStore(string_store)
+
+
+@internal_typechecked
+def _map_identifiers(genes: list, **retry_kwargs) -> list:
+    # identifiers STRING cannot resolve are sent unchanged
+    string_ids = map_string_ids(genes, **retry_kwargs)
+    return [string_ids[gene] or gene for gene in genes]
+
+
+@internal_typechecked
+def _match_query_genes(
+    interactions: pd.DataFrame, genes: list, identifiers: list
+) -> list:
+    # STRING reports the resolved query protein, which is matched back to the
+    # input by the identifier sent, stringdb id or case-insensitive preferred name
+    by_name = {gene.lower(): gene for gene in genes}
+    by_name.update(
+        (identifier.lower(), gene) for gene, identifier in zip(genes, identifiers)
+    )
+    return [
+        by_name.get(string_id.lower(), by_name.get(name.lower(), name))
+        for string_id, name in zip(
+            interactions.get("stringId_A", []), interactions.get("preferredName_A", [])
+        )
+    ]
+
+
+@internal_typechecked
+def _get_session() -> requests.Session:
+    return session.get_cached_session(STRING_CACHE_NAME, STRING_CACHE_EXPIRE_AFTER)
+
+
+@internal_typechecked
 def _has_valid_status(response: requests.models.Response) -> bool:
     return response.status_code == VALID_STATUS_CODE
+
+
+def _in_notebook() -> bool:
+    # IPython is only imported when it is already loaded, i.e. inside IPython
+    ipython = sys.modules.get("IPython")
+    if ipython is None:
+        return False
+    return ipython.get_ipython().__class__.__name__ == "ZMQInteractiveShell"
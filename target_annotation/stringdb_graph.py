@@ -0,0 +1,233 @@
+"""
+Compact graph form of STRING networks for graph analytics on large gene panels.
+
+A StringGraph holds an undirected network in compressed sparse row layout: nodes
+are numbered 0..n_nodes-1, the partners of node i are indices[indptr[i]:indptr[i+1]]
+and the combined scores of those interactions are in the float32 array scores at
+the same positions. Each interaction is stored in both directions, so the arrays
+can be passed directly to sparse matrix libraries, e.g.
+
+    scipy.sparse.csr_matrix((graph.scores, graph.indices, graph.indptr))
+
+Graphs are built from get_network or get_interactions results and merged
+incrementally, so a large network can be collected panel by panel without keeping
+all DataFrames in memory.
+"""
+
+import typing
+import numpy as np
+import pandas as pd
+from .utils.typecheck import internal_typechecked
+
+
+@internal_typechecked
+class StringGraph:
+    """Undirected STRING network in compressed sparse row layout"""
+
+    def __init__(
+        self,
+        string_ids: np.ndarray,
+        preferred_names: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        scores: np.ndarray,
+    ):
+        """Wrap CSR arrays, use StringGraph.from_frame to build a graph
+
+        Args:
+            string_ids (np.ndarray): stringdb id per node
+            preferred_names (np.ndarray): preferred name per node
+            indptr (np.ndarray): int64 offsets of the partners of each node
+            indices (np.ndarray): int32 node index of each partner
+            scores (np.ndarray): float32 combined score of each interaction
+        """
+        self.string_ids = string_ids
+        self.preferred_names = preferred_names
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self._index = {x: i for i, x in enumerate(string_ids)}
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "StringGraph":
+        """Build a graph from interactions in the schema of the STRING API
+
+        Args:
+            frame (pd.DataFrame): get_network or get_interactions result with the
+                columns stringId_A, stringId_B, preferredName_A, preferredName_B
+                and score
+
+        Returns:
+            StringGraph: graph of the interactions. Pairs listed more than once keep
+            their highest score.
+        """
+        if len(frame) == 0:
+            return cls._from_edges(
+                np.array([], dtype=object),
+                np.array([], dtype=object),
+                *(np.array([], dtype=np.int64),) * 2,
+                np.array([], dtype=np.float32),
+            )
+        nodes = pd.concat(
+            [
+                frame[["stringId_A", "preferredName_A"]].set_axis(
+                    ["string_id", "preferred_name"], axis=1
+                ),
+                frame[["stringId_B", "preferredName_B"]].set_axis(
+                    ["string_id", "preferred_name"], axis=1
+                ),
+            ]
+        ).drop_duplicates("string_id")
+        string_ids = pd.Index(nodes["string_id"])
+        return cls._from_edges(
+            string_ids.to_numpy(dtype=object),
+            nodes["preferred_name"].to_numpy(dtype=object),
+            string_ids.get_indexer(frame["stringId_A"]),
+            string_ids.get_indexer(frame["stringId_B"]),
+            frame["score"].to_numpy(dtype=np.float32),
+        )
+
+    @classmethod
+    def _from_edges(
+        cls,
+        string_ids: np.ndarray,
+        preferred_names: np.ndarray,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        scores: np.ndarray,
+    ) -> "StringGraph":
+        rows = np.concatenate([sources, targets]).astype(np.int64)
+        columns = np.concatenate([targets, sources]).astype(np.int64)
+        scores = np.concatenate([scores, scores]).astype(np.float32)
+
+        # sort by row and column with the highest score of duplicate pairs first
+        order = np.lexsort((-scores, columns, rows))
+        rows, columns, scores = rows[order], columns[order], scores[order]
+        keep = np.ones(len(rows), dtype=bool)
+        keep[1:] = (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])
+        rows, columns, scores = rows[keep], columns[keep], scores[keep]
+
+        indptr = np.zeros(len(string_ids) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(rows, minlength=len(string_ids)))
+        return cls(
+            string_ids, preferred_names, indptr, columns.astype(np.int32), scores
+        )
+
+    @property
+    def n_nodes(self) -> int:
+        """Number of nodes"""
+        return len(self.string_ids)
+
+    @property
+    def n_edges(self) -> int:
+        """Number of interactions, each pair counted once"""
+        return int(np.count_nonzero(self._sources() <= self.indices))
+
+    def degrees(self) -> np.ndarray:
+        """Number of partners per node"""
+        return np.diff(self.indptr)
+
+    def node_index(self, identifiers: list) -> list:
+        """Find the node index of stringdb ids or preferred names
+
+        Args:
+            identifiers (list): stringdb ids or preferred names
+
+        Returns:
+            list: index per identifier, None for identifiers not in the graph
+        """
+        names = {x: i for i, x in enumerate(self.preferred_names) if x}
+        return [self._index.get(x, names.get(x)) for x in identifiers]
+
+    def neighbors(self, identifier: str) -> pd.DataFrame:
+        """Partners of one node sorted by descending score
+
+        Args:
+            identifier (str): stringdb id or preferred name
+
+        Returns:
+            pd.DataFrame: stringId, preferredName and score of each partner
+        """
+        node = self.node_index([identifier])[0]
+        if node is None:
+            raise KeyError(f"{identifier} is not in the graph")
+        start, stop = self.indptr[node], self.indptr[node + 1]
+        partners = self.indices[start:stop]
+        return (
+            pd.DataFrame(
+                {
+                    "stringId": self.string_ids[partners],
+                    "preferredName": self.preferred_names[partners],
+                    "score": self.scores[start:stop],
+                }
+            )
+            .sort_values("score", ascending=False, kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def merge(
+        self, *others: typing.Union["StringGraph", pd.DataFrame]
+    ) -> "StringGraph":
+        """Combine this graph with other graphs or interaction DataFrames
+
+        Args:
+            others (Union[StringGraph, pd.DataFrame]): graphs, or get_network and
+                get_interactions results
+
+        Returns:
+            StringGraph: new graph with the nodes of this graph first, in their
+            order, and the highest score of pairs found more than once
+        """
+        graphs = [self] + [
+            x if isinstance(x, StringGraph) else StringGraph.from_frame(x)
+            for x in others
+        ]
+        nodes = pd.concat(
+            [
+                pd.DataFrame(
+                    {"string_id": x.string_ids, "preferred_name": x.preferred_names}
+                )
+                for x in graphs
+            ]
+        ).drop_duplicates("string_id")
+        string_ids = pd.Index(nodes["string_id"])
+
+        sources, targets, scores = [], [], []
+        for graph in graphs:
+            # graph index to merged index, each pair once
+            mapping = string_ids.get_indexer(graph.string_ids)
+            graph_sources = graph._sources()
+            keep = graph_sources <= graph.indices
+            sources.append(mapping[graph_sources[keep]])
+            targets.append(mapping[graph.indices[keep]])
+            scores.append(graph.scores[keep])
+        return StringGraph._from_edges(
+            string_ids.to_numpy(dtype=object),
+            nodes["preferred_name"].to_numpy(dtype=object),
+            np.concatenate(sources),
+            np.concatenate(targets),
+            np.concatenate(scores),
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Interactions as a DataFrame, each pair once
+
+        Returns:
+            pd.DataFrame: stringId_A, stringId_B, preferredName_A, preferredName_B
+            and score of each interaction
+        """
+        sources = self._sources()
+        keep = sources <= self.indices
+        sources, targets = sources[keep], self.indices[keep]
+        return pd.DataFrame(
+            {
+                "stringId_A": self.string_ids[sources],
+                "stringId_B": self.string_ids[targets],
+                "preferredName_A": self.preferred_names[sources],
+                "preferredName_B": self.preferred_names[targets],
+                "score": self.scores[keep],
+            }
+        )
+
+    def _sources(self) -> np.ndarray:
+        return np.repeat(np.arange(self.n_nodes, dtype=np.int64), self.degrees())
@@ -0,0 +1,308 @@
+"""
+Methods to answer STRING interaction queries from the downloadable STRING flat files
+instead of the STRING API. Options currently supported are:
+
+1. Interaction partners
+2. Network between proteins
+
+The files can be downloaded from https://string-db.org/cgi/download, e.g.
+
+    9606.protein.links.v12.0.txt.gz (or protein.links.detailed)
+    9606.protein.physical.links.v12.0.txt.gz
+    9606.protein.info.v12.0.txt.gz
+
+StringEdgeStore.build converts them once into an on-disk store of NumPy arrays in
+compressed sparse row layout: the partners of each protein are stored contiguously
+and sorted by descending combined score. The arrays are memory-mapped when the store
+is opened, so a lookup reads only the rows of the queried proteins. Results have the
+same columns as the JSON responses of the STRING API.
+"""
+
+import json
+import os
+import typing
+import numpy as np
+import pandas as pd
+from .utils.typecheck import internal_typechecked
+
+NETWORK_TYPES = ("functional", "physical")
+
+# columns of the detailed links files and the matching API sub-scores
+CHANNEL_SCORES = {
+    "neighborhood": "nscore",
+    "fusion": "fscore",
+    "cooccurence": "pscore",
+    "coexpression": "ascore",
+    "experimental": "escore",
+    "database": "dscore",
+    "textmining": "tscore",
+}
+
+STORE_VERSION = 1
+
+
+@internal_typechecked
+class StringEdgeStore:
+    """Indexed, memory-mapped store of STRING protein links"""
+
+    def __init__(self, store_dir: str):
+        """Open a store written by StringEdgeStore.build
+
+        Args:
+            store_dir (str): directory of the store
+        """
+        self.store_dir = os.path.expanduser(store_dir)
+        metadata_path = os.path.join(self.store_dir, "metadata.json")
+        if not os.path.isfile(metadata_path):
+            raise FileNotFoundError(f"{self.store_dir} is not a STRING edge store")
+        with open(metadata_path, "r", encoding="UTF-8") as file:
+            self.metadata = json.load(file)
+
+        proteins = pd.read_csv(
+            os.path.join(self.store_dir, "proteins.tsv"),
+            sep="\t",
+            dtype=str,
+            keep_default_na=False,
+        )
+        self.string_ids = proteins["string_id"].to_numpy()
+        self.preferred_names = proteins["preferred_name"].to_numpy()
+        self._index = {}
+        for column in ["preferred_name", "protein_id", "string_id"]:
+            self._index.update(
+                (name.lower(), i) for i, name in enumerate(proteins[column]) if name
+            )
+
+        self._graphs = {}
+        for net_type in self.metadata["network_types"]:
+            path = os.path.join(self.store_dir, net_type)
+            self._graphs[net_type] = {
+                name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+                for name in ["indptr", "indices", "scores", "channels"]
+                if os.path.exists(os.path.join(path, name + ".npy"))
+            }
+
+    @classmethod
+    def build(
+        cls,
+        store_dir: str,
+        links_path: typing.Optional[str] = None,
+        physical_links_path: typing.Optional[str] = None,
+        info_path: typing.Optional[str] = None,
+    ) -> "StringEdgeStore":
+        """Convert STRING links files into an edge store
+
+        Args:
+            store_dir (str): directory to write the store to
+            links_path (str, optional): protein.links or protein.links.detailed
+                file, used for the "functional" network. Defaults to None.
+            physical_links_path (str, optional): protein.physical.links file, used
+                for the "physical" network. Defaults to None.
+            info_path (str, optional): protein.info file with the preferred names.
+                Defaults to None.
+
+        Returns:
+            StringEdgeStore: the opened store
+        """
+        paths = dict(zip(NETWORK_TYPES, [links_path, physical_links_path]))
+        paths = {net_type: path for net_type, path in paths.items() if path}
+        if len(paths) == 0:
+            raise ValueError("at least one links file is required")
+
+        links = {
+            net_type: pd.read_csv(path, sep=r"\s+") for net_type, path in paths.items()
+        }
+        string_ids = pd.Index(
+            sorted(
+                set().union(
+                    *(set(x["protein1"]) | set(x["protein2"]) for x in links.values())
+                )
+            )
+        )
+
+        proteins = pd.DataFrame(
+            {
+                "string_id": string_ids,
+                "protein_id": string_ids.str.split(".", n=1).str[-1],
+                "preferred_name": "",
+            }
+        )
+        if info_path is not None:
+            info = pd.read_csv(info_path, sep="\t", usecols=[0, 1], dtype=str)
+            info.columns = ["string_id", "preferred_name"]
+            names = info.set_index("string_id")["preferred_name"]
+            proteins["preferred_name"] = (
+                proteins["string_id"].map(names).fillna("").to_numpy()
+            )
+
+        os.makedirs(store_dir, exist_ok=True)
+        proteins.to_csv(os.path.join(store_dir, "proteins.tsv"), sep="\t", index=False)
+        for net_type, net_links in links.items():
+            _write_graph(os.path.join(store_dir, net_type), net_links, string_ids)
+        with open(
+            os.path.join(store_dir, "metadata.json"), "w", encoding="UTF-8"
+        ) as file:
+            json.dump({"version": STORE_VERSION, "network_types": list(links)}, file)
+        return cls(store_dir)
+
+    def resolve(self, identifiers: list) -> list:
+        """Find the store index of STRING ids, protein ids or preferred names
+
+        Args:
+            identifiers (list): gene names, protein names, or stringdb ids
+
+        Returns:
+            list: index per identifier, None for unknown identifiers
+        """
+        return [self._index.get(str(x).lower()) for x in identifiers]
+
+    def interaction_partners(
+        self,
+        identifiers: list,
+        net_type: str = "physical",
+        required_score: int = 400,
+        limit: typing.Optional[int] = 10,
+    ) -> pd.DataFrame:
+        """Find the top interaction partners of each protein
+
+        Args:
+            identifiers (list): gene names, protein names, or stringdb ids
+            net_type (str, optional): "functional" or "physical". Defaults to
+                "physical".
+            required_score (int, optional): minimum combined score between 0 and
+                1000. Defaults to 400.
+            limit (int, optional): partners per protein, None for all. Defaults to
+                10.
+
+        Returns:
+            pd.DataFrame: interactions in the schema of the STRING API
+                interaction_partners method
+        """
+        graph = self._graph(net_type)
+        edges = []
+        for source in dict.fromkeys(self.resolve(identifiers)):
+            if source is None:
+                continue
+            start, stop = graph["indptr"][source], graph["indptr"][source + 1]
+            scores = graph["scores"][start:stop]
+            # partners are sorted by descending score
+            stop = start + int(np.searchsorted(-scores, -required_score, "right"))
+            if limit is not None:
+                stop = min(stop, start + limit)
+            edges.append((source, np.arange(start, stop)))
+        return self._to_frame(graph, edges)
+
+    def network(
+        self,
+        identifiers: list,
+        net_type: str = "physical",
+        required_score: int = 400,
+        add_nodes: int = 0,
+    ) -> pd.DataFrame:
+        """Find the interactions between proteins
+
+        Args:
+            identifiers (list): gene names, protein names, or stringdb ids
+            net_type (str, optional): "functional" or "physical". Defaults to
+                "physical".
+            required_score (int, optional): minimum combined score between 0 and
+                1000. Defaults to 400.
+            add_nodes (int, optional): number of highest scoring partners added to
+                the network. Defaults to 0.
+
+        Returns:
+            pd.DataFrame: interactions in the schema of the STRING API network
+                method, each pair once
+        """
+        graph = self._graph(net_type)
+        nodes = [x for x in dict.fromkeys(self.resolve(identifiers)) if x is not None]
+
+        if add_nodes > 0:
+            node_set, candidates = set(nodes), {}
+            for source in nodes:
+                start, stop = graph["indptr"][source], graph["indptr"][source + 1]
+                for target, score in zip(
+                    graph["indices"][start:stop], graph["scores"][start:stop]
+                ):
+                    if score >= required_score and target not in node_set:
+                        candidates[int(target)] = max(
+                            candidates.get(int(target), 0), int(score)
+                        )
+            nodes += sorted(candidates, key=lambda x: (-candidates[x], x))[:add_nodes]
+
+        # each pair once, from the node that comes first in nodes
+        later_nodes = list(nodes)
+        edges = []
+        for source in nodes:
+            later_nodes.remove(source)
+            start, stop = graph["indptr"][source], graph["indptr"][source + 1]
+            keep = np.isin(graph["indices"][start:stop], later_nodes) & (
+                graph["scores"][start:stop] >= required_score
+            )
+            edges.append((source, start + np.flatnonzero(keep)))
+        return self._to_frame(graph, edges)
+
+    def _graph(self, net_type: str) -> dict:
+        if net_type not in self._graphs:
+            raise ValueError(
+                f"net_type must be one of {list(self._graphs)} for this store,"
+                f" got {net_type}"
+            )
+        return self._graphs[net_type]
+
+    def _to_frame(self, graph: dict, edges: list) -> pd.DataFrame:
+        # edges holds (source index, positions of its partners in indices)
+        sources = np.array(
+            [source for source, selection in edges for _ in selection], dtype=np.int64
+        )
+        positions = np.concatenate(
+            [np.asarray(selection, dtype=np.int64) for _, selection in edges]
+            + [np.array([], dtype=np.int64)]
+        )
+        targets = np.asarray(graph["indices"][positions], dtype=np.int64)
+
+        frame = pd.DataFrame(
+            {
+                "stringId_A": self.string_ids[sources],
+                "stringId_B": self.string_ids[targets],
+                "preferredName_A": self.preferred_names[sources],
+                "preferredName_B": self.preferred_names[targets],
+                "ncbiTaxonId": [
+                    int(x.split(".", 1)[0]) for x in self.string_ids[sources]
+                ],
+                "score": np.round(graph["scores"][positions] / 1000, 3),
+            }
+        )
+        channels = graph.get("channels")
+        for i, column in enumerate(CHANNEL_SCORES.values()):
+            frame[column] = (
+                np.round(channels[positions, i] / 1000, 3)
+                if channels is not None
+                else 0.0
+            )
+        return frame
+
+
+@internal_typechecked
+def _write_graph(path: str, links: pd.DataFrame, string_ids: pd.Index):
+    columns = [x for x in CHANNEL_SCORES if x in links.columns]
+    links = links[["protein1", "protein2", "combined_score"] + columns]
+    # links files list both directions, which is enforced for partial files
+    reverse = links.rename(columns={"protein1": "protein2", "protein2": "protein1"})
+    links = pd.concat([links, reverse]).drop_duplicates(["protein1", "protein2"])
+
+    sources = string_ids.get_indexer(links["protein1"])
+    targets = string_ids.get_indexer(links["protein2"])
+    scores = links["combined_score"].to_numpy(dtype=np.int16)
+    order = np.lexsort((targets, -scores, sources))
+
+    os.makedirs(path, exist_ok=True)
+    indptr = np.zeros(len(string_ids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(sources, minlength=len(string_ids)))
+    np.save(os.path.join(path, "indptr.npy"), indptr)
+    np.save(os.path.join(path, "indices.npy"), targets[order].astype(np.int32))
+    np.save(os.path.join(path, "scores.npy"), scores[order])
+    if len(columns) == len(CHANNEL_SCORES):
+        np.save(
+            os.path.join(path, "channels.npy"),
+            links[columns].to_numpy(dtype=np.int16)[order],
+        )
@@ -0,0 +1,260 @@
+"""
+Local rendering of STRING networks from interaction data that was already fetched,
+as an alternative to downloading rendered images from the STRING API.
+
+Nodes are placed with a force-directed (Fruchterman-Reingold) layout computed with
+NumPy. Layouts are stored in a persistent cache keyed by the network, so drawing
+the same network again costs neither requests nor layout time. SVG is written
+directly; PNG output requires matplotlib (pip install target-annotation[plot]).
+"""
+
+import hashlib
+import io
+import json
+import typing
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+import pandas as pd
+from .stringdb_graph import StringGraph
+from .utils.cache import PersistentCache
+from .utils.typecheck import internal_typechecked
+
+IMAGE_FORMATS = ("svg", "png")
+
+# persistent cache of network layouts
+LAYOUT_CACHE_NAME = "stringdb_layouts.sqlite"
+
+QUERY_NODE_COLOR = "#7fb8e6"
+ADDED_NODE_COLOR = "#ffffff"
+EDGE_COLOR = "#555555"
+
+
+@internal_typechecked
+def render_network(
+    network: typing.Union[pd.DataFrame, StringGraph],
+    image_format: str = "svg",
+    query_genes: typing.Optional[list] = None,
+    width: int = 800,
+    height: int = 800,
+    iterations: int = 50,
+    use_cache: bool = True,
+) -> bytes:
+    """Draw a network
+
+    Args:
+        network (Union[pd.DataFrame, StringGraph]): get_network result or graph
+        image_format (str, optional): "svg" or "png". Defaults to "svg".
+        query_genes (list, optional): stringdb ids or preferred names of the nodes
+            drawn in color, like the query proteins in STRING images. All nodes
+            are colored when None. Defaults to None.
+        width (int, optional): image width in pixels. Defaults to 800.
+        height (int, optional): image height in pixels. Defaults to 800.
+        iterations (int, optional): iterations of the layout. Defaults to 50.
+        use_cache (bool, optional): read and update the persistent layout cache.
+            Defaults to True.
+
+    Returns:
+        bytes: the image
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(
+            f"image_format must be one of {list(IMAGE_FORMATS)}, got {image_format}"
+        )
+    graph = (
+        network if isinstance(network, StringGraph) else StringGraph.from_frame(network)
+    )
+    positions = network_layout(graph, iterations, use_cache)
+
+    # pixel coordinates inside a margin that leaves room for the labels
+    margin = 40
+    points = np.column_stack(
+        [
+            margin + positions[:, 0] * (width - 2 * margin),
+            margin + positions[:, 1] * (height - 2 * margin),
+        ]
+    )
+    if query_genes is None:
+        colored = np.ones(graph.n_nodes, dtype=bool)
+    else:
+        # case-insensitive, like identifiers in STRING requests
+        query = {str(x).lower() for x in query_genes}
+        colored = np.array(
+            [
+                string_id.lower() in query or name.lower() in query
+                for string_id, name in zip(graph.string_ids, graph.preferred_names)
+            ],
+            dtype=bool,
+        )
+    # each pair once
+    sources = np.repeat(np.arange(graph.n_nodes), graph.degrees())
+    keep = sources <= graph.indices
+    edges = list(
+        zip(
+            sources[keep].tolist(),
+            graph.indices[keep].tolist(),
+            graph.scores[keep].tolist(),
+        )
+    )
+
+    draw = _draw_svg if image_format == "svg" else _draw_png
+    return draw(graph, points, colored, edges, width, height)
+
+
+@internal_typechecked
+def network_layout(
+    graph: StringGraph, iterations: int = 50, use_cache: bool = True
+) -> np.ndarray:
+    """Place the nodes of a network
+
+    Args:
+        graph (StringGraph): network
+        iterations (int, optional): iterations of the layout. Defaults to 50.
+        use_cache (bool, optional): read and update the persistent layout cache.
+            Defaults to True.
+
+    Returns:
+        np.ndarray: x and y position between 0 and 1 of each node
+    """
+    edges = graph.to_frame()
+    key = hashlib.sha1(
+        json.dumps(
+            [
+                iterations,
+                graph.string_ids.tolist(),
+                edges["stringId_A"].tolist(),
+                edges["stringId_B"].tolist(),
+                np.round(edges["score"].to_numpy(dtype=float), 3).tolist(),
+            ]
+        ).encode()
+    ).hexdigest()
+
+    cache = PersistentCache(LAYOUT_CACHE_NAME) if use_cache else None
+    if cache is not None:
+        cached = cache.get_many([key])
+        if key in cached:
+            return np.array(cached[key], dtype=float).reshape(-1, 2)
+
+    positions = _spring_layout(graph, iterations)
+    if cache is not None:
+        cache.set_many({key: positions.tolist()})
+    return positions
+
+
+@internal_typechecked
+def _spring_layout(graph: StringGraph, iterations: int) -> np.ndarray:
+    n_nodes = graph.n_nodes
+    if n_nodes < 2:
+        return np.full((n_nodes, 2), 0.5)
+
+    # fixed seed, so a network is always drawn the same way
+    positions = np.random.default_rng(0).random((n_nodes, 2))
+    weights = np.zeros((n_nodes, n_nodes))
+    weights[np.repeat(np.arange(n_nodes), graph.degrees()), graph.indices] = (
+        graph.scores
+    )
+
+    optimal_distance = np.sqrt(1.0 / n_nodes)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        delta = positions[:, np.newaxis, :] - positions[np.newaxis, :, :]
+        distance = np.clip(np.linalg.norm(delta, axis=-1), 0.01, None)
+        # repulsion between all nodes, attraction along interactions
+        force = (
+            optimal_distance**2 / distance**2 - weights * distance / optimal_distance
+        )
+        displacement = np.einsum("ijk,ij->ik", delta, force)
+        length = np.clip(np.linalg.norm(displacement, axis=-1), 0.01, None)
+        positions += displacement * (temperature / length)[:, np.newaxis]
+        temperature -= cooling
+
+    positions -= positions.min(axis=0)
+    return positions / np.maximum(positions.max(axis=0), 1e-9)
+
+
+@internal_typechecked
+def _draw_svg(
+    graph: StringGraph,
+    points: np.ndarray,
+    colored: np.ndarray,
+    edges: list,
+    width: int,
+    height: int,
+) -> bytes:
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}"'
+        f' viewBox="0 0 {width} {height}">',
+        f'<rect width="{width}" height="{height}" fill="#ffffff"/>',
+        f'<g stroke="{EDGE_COLOR}" stroke-linecap="round">',
+    ]
+    for a, b, score in edges:
+        lines.append(
+            f'<line x1="{points[a, 0]:.1f}" y1="{points[a, 1]:.1f}"'
+            f' x2="{points[b, 0]:.1f}" y2="{points[b, 1]:.1f}"'
+            f' stroke-width="{1 + 3 * score:.2f}" stroke-opacity="{score:.3f}"/>'
+        )
+    lines.append('</g>\n<g font-family="sans-serif" font-size="12">')
+    for i, (x, y) in enumerate(points):
+        name = graph.preferred_names[i] or graph.string_ids[i]
+        fill = QUERY_NODE_COLOR if colored[i] else ADDED_NODE_COLOR
+        lines.append(
+            f'<circle cx="{x:.1f}" cy="{y:.1f}" r="10" fill="{fill}"'
+            f' stroke="#333333"><title>{escape(graph.string_ids[i])}</title></circle>'
+        )
+        lines.append(
+            f'<text x="{x + 12:.1f}" y="{y - 12:.1f}"'
+            f" data-id={quoteattr(graph.string_ids[i])}>{escape(name)}</text>"
+        )
+    lines.append("</g>\n</svg>\n")
+    return "\n".join(lines).encode("UTF-8")
+
+
+@internal_typechecked
+def _draw_png(
+    graph: StringGraph,
+    points: np.ndarray,
+    colored: np.ndarray,
+    edges: list,
+    width: int,
+    height: int,
+) -> bytes:
+    try:
+        # pylint: disable=import-outside-toplevel
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+    except ImportError as error:
+        raise ImportError(
+            "PNG output requires matplotlib, install target-annotation[plot]"
+        ) from error
+
+    dpi = 100
+    # drawn without pyplot, so the caller's matplotlib backend is left alone
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_axes([0, 0, 1, 1])
+    axes.set_xlim(0, width)
+    axes.set_ylim(height, 0)
+    axes.axis("off")
+    for a, b, score in edges:
+        axes.plot(
+            points[[a, b], 0],
+            points[[a, b], 1],
+            color=EDGE_COLOR,
+            linewidth=1 + 3 * score,
+            alpha=score,
+            zorder=1,
+        )
+    axes.scatter(
+        points[:, 0],
+        points[:, 1],
+        s=300,
+        c=np.where(colored, QUERY_NODE_COLOR, ADDED_NODE_COLOR),
+        edgecolors="#333333",
+        zorder=2,
+    )
+    for i, (x, y) in enumerate(points):
+        axes.annotate(graph.preferred_names[i] or graph.string_ids[i], (x + 12, y - 12))
+
+    buffer = io.BytesIO()
+    canvas.print_png(buffer)
+    return buffer.getvalue()
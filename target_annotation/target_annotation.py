@@ -5,17 +5,19 @@ Creates annotations from OpenTarget and Pharos for a list of targets.
 """
 import json
 import os
-from typing import Union, List
-from typeguard import typechecked, TypeCheckError
+from typing import Union, List, Optional
+from typeguard import TypeCheckError
 from tqdm import tqdm
-import re
 
 from . import open_targets as ot
+from . import ontology_source
 from . import pharos
 from .utils.exceptions import EmptyOpenTargetsResponse, EmptyPharosResponse
+from .utils.validators import normalize_ensembl_ids
+from .utils.typecheck import internal_typechecked
 
 
-@typechecked
+@internal_typechecked
 class TargetAnnotation:
     """Class for conducting target annotation"""
 
@@ -24,28 +26,90 @@ class TargetAnnotation:
         targets: Union[List[str], str],
         disease_code: str,
         results_path: str,
+        evidence_profile: Optional[str] = None,
+        ot_parquet_dir: Optional[str] = None,
+        summary_only: bool = False,
+        tcrd_db: Optional[str] = None,
+        ontology_index: Optional[str] = None,
+        resolve_symbols: bool = False,
     ):
         """Initialize Class
 
         Args:
             targets (Union[List[str], str, None]): which targets to consider.
+                Ensembl IDs are upper-cased, stripped of versions and deduplicated,
+                see self.target_report.
             disease_code (str): A disease code such as "EFO_0001378".
                 https://www.ebi.ac.uk/ols/ontologie/efo.
             results_path (str): path for where results JSON should be saved.
+            evidence_profile (str, optional): fields requested for disease evidences,
+                one of "ids-only", "literature" or "full". "literature" is enough for
+                ExtractTable. Defaults to "literature" if summary_only else "full".
+            ot_parquet_dir (str, optional): directory of Open Targets Platform
+                parquet datasets. When given, Open Targets results are read locally
+                instead of requested from the API. Defaults to None.
+            summary_only (bool, optional): only request the fields needed for the
+                ExtractTable summary, i.e. the "summary" Pharos profile and the
+                "literature" evidence profile. Defaults to False.
+            tcrd_db (str, optional): path of a local Pharos TCRD SQLite database.
+                When given, Pharos results are read locally instead of requested
+                from the API. Defaults to None.
+            ontology_index (str, optional): path of an ontology_index.OntologyIndex.
+                When given, disease evidences are collected for disease_code and
+                all of its descendants, see self.disease_codes. Defaults to None.
+            resolve_symbols (bool, optional): map targets that are not ensembl ids,
+                such as gene symbols, with one bulk Open Targets search before
+                annotation, see open_targets.map_symbols_to_ensembl. Defaults to
+                False.
 
         """
 
-        self.targets = [targets] if isinstance(targets, str) else targets
+        targets = [targets] if isinstance(targets, str) else targets
+        self.targets, self.target_report = normalize_ensembl_ids(targets)
+        if resolve_symbols and not self.target_report["valid"].all():
+            symbols = self.target_report.loc[~self.target_report["valid"], "input"]
+            self.targets, self.target_report = normalize_ensembl_ids(
+                targets,
+                ot.map_symbols_to_ensembl(symbols.str.strip().dropna().tolist()),
+            )
         self.disease_code = disease_code
         self.results_path = os.path.expanduser(results_path)
-
-        if not all(re.match("ENSG[0-9]{11}$", x) for x in self.targets):
-            raise ValueError("targets must be a list of valid ensembl ids")
+        self.summary_only = summary_only
+        self.pharos_profile = "summary" if summary_only else "full"
+        if evidence_profile is None:
+            evidence_profile = "literature" if summary_only else "full"
+        self.evidence_profile = evidence_profile
+        self.ot_parquet_dir = ot_parquet_dir
+        self.tcrd_db = tcrd_db
+        self.ontology_index = ontology_index
+        self.disease_codes = (
+            ontology_source.get_ontology_index(ontology_index).expand([disease_code])
+            if ontology_index is not None
+            else [disease_code]
+        )
+
+        if not self.target_report["valid"].all():
+            invalid = self.target_report.loc[~self.target_report["valid"], "input"]
+            raise ValueError(
+                "targets must be a list of valid ensembl ids"
+                f"{' or gene symbols' if resolve_symbols else ''}, got"
+                f" {invalid.tolist()}"
+            )
+
+        if self.evidence_profile not in ot.EVIDENCE_PROFILES:
+            raise ValueError(
+                f"evidence_profile must be one of {list(ot.EVIDENCE_PROFILES)}"
+            )
 
         if not os.path.isdir(self.results_path):
             os.makedirs(self.results_path)
 
     def __get_target_open_targets(self):
+        if not hasattr(self, "ot_target_results") and self.ot_parquet_dir is not None:
+            found = ot.get_parquet_backend(self.ot_parquet_dir).target_annotations(
+                self.targets
+            )
+            self.ot_target_results = {u: found.get(u, {}) for u in self.targets}
         if not hasattr(self, "ot_target_results"):
             ot_target_results = {}
             for ensg in tqdm(self.targets, "OT: target annotation..."):
@@ -57,13 +121,20 @@ class TargetAnnotation:
         return self.ot_target_results
 
     def __get_target_pharos(self):
+        if not hasattr(self, "pharos_target_results") and self.tcrd_db is not None:
+            found = pharos.get_tcrd_backend(self.tcrd_db).target_annotations(
+                self.targets, pharos.PHAROS_PROFILES[self.pharos_profile]
+            )
+            self.pharos_target_results = {u: found.get(u, {}) for u in self.targets}
         if not hasattr(self, "pharos_target_results"):
             pharos_target_results = {}
             for ensg in tqdm(self.targets, "Pharos: target annotation..."):
                 try:
                     pharos_target_results[
                         ensg
-                    ] = pharos.request_pharos_target_annotation(ensg)
+                    ] = pharos.request_pharos_target_annotation(
+                        ensg, profile=self.pharos_profile
+                    )
                 except (EmptyPharosResponse, TypeCheckError):
                     pharos_target_results[ensg] = {}
             self.pharos_target_results = pharos_target_results
@@ -71,14 +142,25 @@ class TargetAnnotation:
 
     def __get_disease_open_targets(self):
         if not hasattr(self, "ot_disease_results"):
+            found = ot.request_ot_target_disease_evidences_batch(
+                self.disease_codes,
+                self.targets,
+                profile=self.evidence_profile,
+                parquet_dir=self.ot_parquet_dir,
+            )
             ot_disease_results = {}
-            for ensg in tqdm(self.targets, "OT: disease annotation..."):
-                try:
-                    ot_disease_results[ensg] = ot.request_ot_target_disease_evidences(
-                        self.disease_code, ensg
+            for ensg in self.targets:
+                results = [
+                    found[disease_code][ensg]
+                    for disease_code in self.disease_codes
+                    if disease_code in found
+                ]
+                if len(self.disease_codes) == 1:
+                    ot_disease_results[ensg] = results[0] if len(results) > 0 else {}
+                else:
+                    ot_disease_results[ensg] = _merge_disease_evidences(
+                        self.disease_code, results
                     )
-                except (EmptyOpenTargetsResponse, TypeCheckError):
-                    ot_disease_results[ensg] = {}
             self.ot_disease_results = ot_disease_results
         return self.ot_disease_results
 
@@ -119,3 +201,31 @@ class TargetAnnotation:
             encoding="UTF-8",
         ) as file:
             json.dump(res, file)
+
+
+@internal_typechecked
+def _merge_disease_evidences(disease_code: str, all_results: list) -> dict:
+    # evidences of the descendants are added to those of disease_code, each row
+    # keeps the disease it was found for. A cursor only resumes the query of its own
+    # disease, so the cursors of truncated results are kept by disease ID.
+    if len(all_results) == 0:
+        return {}
+    merged = {"id": disease_code, "name": None}
+    rows = []
+    count = 0
+    cursors = {}
+    for results in all_results:
+        if results.get("id") == disease_code:
+            merged["name"] = results.get("name")
+        evidences = results.get("evidences") or {}
+        count += evidences.get("count") or 0
+        rows.extend(evidences.get("rows") or [])
+        if evidences.get("cursor") is not None:
+            cursors[results.get("id")] = evidences["cursor"]
+    merged["evidences"] = {
+        "count": count,
+        "cursor": None,
+        "cursors": cursors,
+        "rows": rows,
+    }
+    return merged
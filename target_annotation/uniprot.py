@@ -0,0 +1,246 @@
+"""
+Methods to map many UniProt accessions at once with the asynchronous UniProt ID
+mapping service (https://www.uniprot.org/help/id_mapping) instead of downloading
+one UniProtKB entry per accession.
+
+A job is submitted with the accessions, polled until it finishes and its results
+are streamed page by page following the Link headers. map_uniprot_to_ensembl picks
+the Ensembl gene ID from the OpenTargets and HPA cross-references of each entry,
+like utils.util.get_ensembl_from_uniprot.
+"""
+
+import functools
+import time
+import typing
+import pandas as pd
+import requests
+import typeguard
+from .utils import exceptions, retry
+from .utils.util import find_ensembl_xref
+from .utils.typecheck import internal_typechecked
+
+UNIPROT_API_URL = "https://rest.uniprot.org"
+
+VALID_STATUS_CODE = 200
+
+# maximum number of IDs accepted per ID mapping job
+MAX_JOB_IDS = 100000
+
+RESULTS_PAGE_SIZE = 500
+
+# seconds to wait for each response of the UniProt REST API
+REQUEST_TIMEOUT = 60
+
+# only the cross-references used by find_ensembl_xref are requested
+ENSEMBL_XREF_FIELDS = "accession,xref_opentargets,xref_hpa"
+
+
+@typeguard.typechecked
+def submit_id_mapping(
+    ids: list,
+    from_db: str = "UniProtKB_AC-ID",
+    to_db: str = "UniProtKB",
+    base_url: str = UNIPROT_API_URL,
+    **retry_kwargs,
+) -> str:
+    """Submit an ID mapping job
+
+    Args:
+        ids (list): IDs to map, at most MAX_JOB_IDS
+        from_db (str, optional): database of the IDs. Defaults to "UniProtKB_AC-ID".
+        to_db (str, optional): database to map to. Defaults to "UniProtKB".
+        base_url (str, optional): UniProt REST API. Defaults to UNIPROT_API_URL.
+        **retry_kwargs: extra parameters passed to utils.retry.Retryer
+
+    Returns:
+        str: job ID
+    """
+    if len(ids) > MAX_JOB_IDS:
+        raise exceptions.InvalidQueryParameter(
+            f"ID mapping jobs accept at most {MAX_JOB_IDS} IDs, got {len(ids)}"
+        )
+
+    @retry.Retryer(**retry_kwargs)
+    def make_response():
+        response = requests.post(
+            f"{base_url}/idmapping/run",
+            data={"from": from_db, "to": to_db, "ids": ",".join(ids)},
+            timeout=REQUEST_TIMEOUT,
+        )
+        if not _has_valid_status(response):
+            raise exceptions.InvalidStatusCode(
+                f"Bad status code with response result\n{response.text}"
+            )
+        return response.json()
+
+    return make_response()["jobId"]
+
+
+@typeguard.typechecked
+def wait_for_id_mapping(
+    job_id: str,
+    poll_interval: float = 3.0,
+    max_wait: typing.Optional[float] = 600.0,
+    base_url: str = UNIPROT_API_URL,
+    **retry_kwargs,
+):
+    """Poll an ID mapping job until it has finished
+
+    Args:
+        job_id (str): job ID from submit_id_mapping
+        poll_interval (float, optional): seconds between polls. Defaults to 3.
+        max_wait (float, optional): seconds to wait in total, None to wait
+            indefinitely. Defaults to 600.
+        base_url (str, optional): UniProt REST API. Defaults to UNIPROT_API_URL.
+        **retry_kwargs: extra parameters passed to utils.retry.Retryer, used for
+            each poll
+    """
+
+    def get_status():
+        # finished jobs redirect to their results, which are not needed here
+        response = requests.get(
+            f"{base_url}/idmapping/status/{job_id}",
+            allow_redirects=False,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.is_redirect:
+            return {"jobStatus": "FINISHED"}
+        if not _has_valid_status(response):
+            raise exceptions.InvalidStatusCode(
+                f"Bad status code with response result\n{response.text}"
+            )
+        return response.json()
+
+    started = time.monotonic()
+    while True:
+        # a Retryer counts its tries, so every poll gets its own
+        status = retry.Retryer(**retry_kwargs)(get_status)()
+        if "results" in status or status.get("jobStatus") == "FINISHED":
+            return
+        if status.get("jobStatus") not in ("NEW", "RUNNING"):
+            raise exceptions.IDMappingJobFailed(f"ID mapping job {job_id}: {status}")
+        if max_wait is not None and time.monotonic() - started > max_wait:
+            raise exceptions.IDMappingJobFailed(
+                f"ID mapping job {job_id} did not finish within {max_wait} seconds"
+            )
+        time.sleep(poll_interval)
+
+
+@typeguard.typechecked
+def iter_id_mapping_results(
+    job_id: str,
+    fields: typing.Optional[str] = None,
+    page_size: int = RESULTS_PAGE_SIZE,
+    base_url: str = UNIPROT_API_URL,
+    **retry_kwargs,
+) -> typing.Iterator[dict]:
+    """Stream the results of a finished ID mapping job to UniProtKB, page by page
+
+    Args:
+        job_id (str): job ID from submit_id_mapping
+        fields (str, optional): comma separated UniProtKB return fields, e.g.
+            ENSEMBL_XREF_FIELDS. Defaults to None, i.e. full entries.
+        page_size (int, optional): results per page. Defaults to
+            RESULTS_PAGE_SIZE.
+        base_url (str, optional): UniProt REST API. Defaults to UNIPROT_API_URL.
+        **retry_kwargs: extra parameters passed to utils.retry.Retryer, used for
+            each page
+
+    Yields:
+        dict: result with the mapped ID in "from" and the entry in "to"
+    """
+    params = {"format": "json", "size": page_size}
+    if fields is not None:
+        params["fields"] = fields
+
+    def get_page(url, params):
+        response = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        if not _has_valid_status(response):
+            raise exceptions.InvalidStatusCode(
+                f"Bad status code with response result\n{response.text}"
+            )
+        return response
+
+    url = f"{base_url}/idmapping/uniprotkb/results/{job_id}"
+    while url is not None:
+        # a Retryer counts its tries, so every page gets its own
+        response = retry.Retryer(**retry_kwargs)(get_page)(url, params)
+        yield from response.json().get("results", [])
+        # the next link already holds the query parameters
+        url, params = response.links.get("next", {}).get("url"), None
+
+
+@typeguard.typechecked
+def map_uniprot_to_ensembl(
+    accessions: list,
+    poll_interval: float = 3.0,
+    max_wait: typing.Optional[float] = 600.0,
+    base_url: str = UNIPROT_API_URL,
+    uniprot_index: typing.Optional[str] = None,
+    as_series: bool = False,
+    **retry_kwargs,
+) -> typing.Union[dict, pd.Series]:
+    """Map many UniProt accessions to Ensembl gene IDs with ID mapping jobs
+
+    Args:
+        accessions (list): UniProt accessions such as P78508
+        poll_interval (float, optional): seconds between polls. Defaults to 3.
+        max_wait (float, optional): seconds to wait per job, None to wait
+            indefinitely. Defaults to 600.
+        base_url (str, optional): UniProt REST API. Defaults to UNIPROT_API_URL.
+        uniprot_index (str, optional): path of a local UniprotIndex answering
+            without the API. Defaults to None.
+        as_series (bool, optional): return a Series indexed by accession instead
+            of a dict. Defaults to False.
+
+    Returns:
+        Union[dict, pd.Series]: Ensembl gene ID by accession, None for accessions
+            UniProt could not map or without OpenTargets or HPA cross-reference
+    """
+    accessions = list(dict.fromkeys(accessions))
+    if uniprot_index is not None:
+        ensembl_ids = get_uniprot_index(uniprot_index).ensembl_ids(accessions)
+        return _as_mapping(ensembl_ids, as_series)
+
+    ensembl_ids = {accession: None for accession in accessions}
+    for start in range(0, len(accessions), MAX_JOB_IDS):
+        job_id = submit_id_mapping(
+            accessions[start : start + MAX_JOB_IDS], base_url=base_url, **retry_kwargs
+        )
+        wait_for_id_mapping(job_id, poll_interval, max_wait, base_url, **retry_kwargs)
+        for result in iter_id_mapping_results(
+            job_id, ENSEMBL_XREF_FIELDS, base_url=base_url, **retry_kwargs
+        ):
+            # an accession can map to several entries, the first with a match wins
+            if ensembl_ids.get(result["from"]) is None:
+                ensembl_ids[result["from"]] = find_ensembl_xref(result["to"])
+    return _as_mapping(ensembl_ids, as_series)
+
+
+@functools.lru_cache(maxsize=None)
+def get_uniprot_index(uniprot_index: str):
+    """Open (once per file) a local UniProt accession index
+
+    Args:
+        uniprot_index (str): path written by UniprotIndex.build
+
+    Returns:
+        UniprotIndex: index answering Ensembl lookups locally
+    """
+    from .uniprot_index import UniprotIndex
+
+    return UniprotIndex(uniprot_index)
+
+
+@internal_typechecked
+def _as_mapping(ensembl_ids: dict, as_series: bool) -> typing.Union[dict, pd.Series]:
+    if not as_series:
+        return ensembl_ids
+    return pd.Series(
+        ensembl_ids, index=list(ensembl_ids), dtype=object, name="ensembl_id"
+    )
+
+
+@internal_typechecked
+def _has_valid_status(response: requests.models.Response) -> bool:
+    return response.status_code == VALID_STATUS_CODE
@@ -0,0 +1,182 @@
+"""
+Methods to look up the Ensembl gene IDs of UniProt accessions from a local index
+instead of the UniProt REST API, e.g. on nodes without internet access.
+
+UniprotIndex.build reads one of
+
+1. a UniProtKB TSV export with the OpenTargets and HPA cross-reference columns,
+   e.g. https://rest.uniprot.org/uniprotkb/stream?format=tsv&fields=accession,
+   xref_opentargets,xref_hpa&query=organism_id:9606. The OpenTargets ID is used,
+   else the HPA ID, like utils.util.get_ensembl_from_uniprot.
+2. idmapping_selected.tab(.gz) from
+   https://ftp.uniprot.org/pub/databases/uniprot/current_release/knowledgebase/idmapping/
+   which lists the Ensembl genes of each accession. The first one is used.
+
+The accessions and their Ensembl gene IDs are written once, key-sorted, to a SQLite
+table without rowids, so a lookup is a single B-tree search.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import typing
+import pandas as pd
+from .utils.typecheck import internal_typechecked
+
+# SQLite limits the number of host parameters per statement
+MAX_PARAMETERS = 500
+
+INDEX_VERSION = 1
+
+# cross-reference columns of UniProtKB TSV exports, in order of preference
+XREF_COLUMNS = ("OpenTargets", "HPA")
+
+# columns of idmapping_selected.tab: UniProtKB-AC, NCBI-taxon and Ensembl
+IDMAPPING_COLUMNS = {0: "accession", 12: "taxon", 18: "ensembl"}
+
+ENSEMBL_GENE_PATTERN = re.compile(r"ENSG[0-9]{11}")
+
+READ_CHUNK_SIZE = 1000000
+
+
+@internal_typechecked
+class UniprotIndex:
+    """UniProt accession to Ensembl gene ID index in a SQLite file"""
+
+    def __init__(self, db_path: str):
+        """Open an index written by UniprotIndex.build
+
+        Args:
+            db_path (str): path of the index
+        """
+        self.db_path = os.path.expanduser(db_path)
+        if not os.path.isfile(self.db_path):
+            raise FileNotFoundError(f"{self.db_path} is not a file")
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.metadata = dict(self._connection.execute("SELECT * FROM metadata"))
+
+    @classmethod
+    def build(
+        cls, db_path: str, mapping_path: str, taxon: typing.Optional[int] = 9606
+    ) -> "UniprotIndex":
+        """Build an index from a UniProtKB TSV export or idmapping_selected.tab
+
+        Args:
+            db_path (str): path to write the index to
+            mapping_path (str): TSV export with a header, or idmapping_selected.tab,
+                optionally gzip compressed
+            taxon (int, optional): NCBI taxon kept from idmapping_selected.tab,
+                None for all. Defaults to 9606.
+
+        Returns:
+            UniprotIndex: the opened index
+        """
+        mapping_path = os.path.expanduser(mapping_path)
+        header = pd.read_csv(mapping_path, sep="\t", nrows=0, dtype=str).columns
+        xref_columns = [x for x in XREF_COLUMNS if x in header]
+        if len(xref_columns) > 0:
+            chunks = (
+                _ensembl_from_xrefs(chunk, xref_columns)
+                for chunk in pd.read_csv(
+                    mapping_path,
+                    sep="\t",
+                    usecols=[header[0], *xref_columns],
+                    dtype=str,
+                    chunksize=READ_CHUNK_SIZE,
+                )
+            )
+        else:
+            chunks = (
+                _ensembl_from_idmapping(chunk, taxon)
+                for chunk in pd.read_csv(
+                    mapping_path,
+                    sep="\t",
+                    header=None,
+                    usecols=list(IDMAPPING_COLUMNS),
+                    dtype=str,
+                    chunksize=READ_CHUNK_SIZE,
+                )
+            )
+
+        db_path = os.path.expanduser(db_path)
+        temp_path = db_path + ".tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        with sqlite3.connect(temp_path) as connection:
+            connection.executescript("""
+                CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE mapping (
+                    accession TEXT PRIMARY KEY, ensembl_id TEXT
+                ) WITHOUT ROWID;
+                """)
+            connection.executemany(
+                "INSERT INTO metadata VALUES (?, ?)",
+                [
+                    ("version", str(INDEX_VERSION)),
+                    ("source", os.path.basename(mapping_path)),
+                ],
+            )
+            for chunk in chunks:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO mapping VALUES (?, ?)",
+                    chunk.itertuples(index=False, name=None),
+                )
+        connection.close()
+        os.replace(temp_path, db_path)
+        return cls(db_path)
+
+    def ensembl_ids(self, accessions: typing.Iterable[str]) -> dict:
+        """Look up the Ensembl gene IDs of many accessions
+
+        Args:
+            accessions (Iterable[str]): UniProt accessions such as P78508
+
+        Returns:
+            dict: Ensembl gene ID by accession, None for accessions not in the index
+        """
+        accessions = list(dict.fromkeys(x.strip() for x in accessions))
+        found = {}
+        with self._lock:
+            for start in range(0, len(accessions), MAX_PARAMETERS):
+                chunk = accessions[start : start + MAX_PARAMETERS]
+                found.update(
+                    self._connection.execute(
+                        "SELECT accession, ensembl_id FROM mapping WHERE accession IN"
+                        f" ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return {accession: found.get(accession) for accession in accessions}
+
+    def close(self):
+        """Close the database connection"""
+        self._connection.close()
+
+
+@internal_typechecked
+def _ensembl_from_xrefs(chunk: pd.DataFrame, xref_columns: list) -> pd.DataFrame:
+    # first Ensembl gene of the first cross-reference column that has one
+    ensembl = pd.Series(None, index=chunk.index, dtype=object)
+    for column in xref_columns:
+        ensembl = ensembl.fillna(
+            chunk[column].str.extract(f"({ENSEMBL_GENE_PATTERN.pattern})")[0]
+        )
+    return pd.DataFrame(
+        {"accession": chunk.iloc[:, 0].str.strip(), "ensembl_id": ensembl}
+    ).dropna()
+
+
+@internal_typechecked
+def _ensembl_from_idmapping(
+    chunk: pd.DataFrame, taxon: typing.Optional[int]
+) -> pd.DataFrame:
+    chunk = chunk.rename(columns=IDMAPPING_COLUMNS)
+    if taxon is not None:
+        chunk = chunk[chunk["taxon"] == str(taxon)]
+    ensembl = chunk["ensembl"].str.extract(f"({ENSEMBL_GENE_PATTERN.pattern})")[0]
+    return pd.DataFrame(
+        {"accession": chunk["accession"].str.strip(), "ensembl_id": ensembl}
+    ).dropna()
@@ -0,0 +1,93 @@
+"""Persistent key-value cache for resolved identifiers and other small lookups
+
+Values are stored as JSON in a SQLite file next to the HTTP response caches, so
+repeated analyses can skip requests that resolve the same keys again.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from typing import Iterable, Optional
+from requests_cache.backends.sqlite import get_cache_path
+from .typecheck import internal_typechecked
+
+# SQLite limits the number of host parameters per statement
+MAX_PARAMETERS = 500
+
+
+@internal_typechecked
+class PersistentCache:
+    """Key-value cache in a SQLite file in the user cache directory"""
+
+    def __init__(self, name: str, expire_after: Optional[timedelta] = None):
+        """Open or create a cache
+
+        Args:
+            name (str): file name in the user cache directory, or an absolute path
+            expire_after (timedelta, optional): time after which entries expire.
+                Defaults to None, i.e. never.
+        """
+        self.path = str(get_cache_path(name, use_cache_dir=True))
+        self.expire_after = expire_after
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache"
+                " (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+            )
+        connection.close()
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        """Look up many keys
+
+        Args:
+            keys (Iterable[str]): keys to look up
+
+        Returns:
+            dict: values of the keys found and not expired
+        """
+        keys = list(dict.fromkeys(keys))
+        oldest = (
+            0.0
+            if self.expire_after is None
+            else time.time() - self.expire_after.total_seconds()
+        )
+        found = {}
+        with self._lock, self._connect() as connection:
+            for start in range(0, len(keys), MAX_PARAMETERS):
+                chunk = keys[start : start + MAX_PARAMETERS]
+                found.update(
+                    (key, json.loads(value))
+                    for key, value in connection.execute(
+                        "SELECT key, value FROM cache WHERE created >= ? AND key IN"
+                        f" ({', '.join('?' * len(chunk))})",
+                        [oldest, *chunk],
+                    )
+                )
+        connection.close()
+        return found
+
+    def set_many(self, items: dict):
+        """Store many values
+
+        Args:
+            items (dict): JSON serializable values by key
+        """
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in items.items()],
+            )
+        connection.close()
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM cache")
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
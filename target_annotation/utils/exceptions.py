@@ -19,6 +19,12 @@ class InvalidQueryParameter(Exception):
     pass
 
 
+class InvalidGraphQLQuery(Exception):
+    """Raise when a GraphQL query fails validation before it is sent"""
+
+    pass
+
+
 class InvalidStatusCode(Exception):
     """Raise when the status code does not equal 200"""
 
@@ -53,3 +59,9 @@ class InvalidOutcomes(Exception):
     """Raise when an invalid outcome/outcomes is/are passed to manual simulations"""
 
     pass
+
+
+class IDMappingJobFailed(Exception):
+    """Raise when a UniProt ID mapping job fails or does not finish in time"""
+
+    pass
@@ -0,0 +1,243 @@
+"""Registry of pre-validated GraphQL queries with automatic persisted query support
+
+Queries are validated, minified and hashed once when they are registered. Requests
+are first sent as an automatic persisted query (APQ), i.e. only the sha256 hash of
+the query and the variables. If the server does not know the hash yet, the full
+query is sent once so the server can store it. Any other error to a hash-only
+request is also retried once with the full query. Servers that do not support APQ,
+either by saying so or by only answering the full query, are remembered and receive
+the full query from then on.
+"""
+
+import hashlib
+import re
+import typing
+import requests
+from . import exceptions
+from .typecheck import internal_typechecked
+
+OPERATION_PATTERN = re.compile(r"(query|mutation)\s+(\w+)\s*(?:\(([^)]*)\))?\s*\{")
+
+VARIABLE_DEFINITION_PATTERN = re.compile(r"\$(\w+)\s*:")
+
+VARIABLE_USAGE_PATTERN = re.compile(r"\$(\w+)")
+
+PUNCTUATION_WHITESPACE_PATTERN = re.compile(r"\s*([{}()\[\]:,!=])\s*")
+
+PERSISTED_QUERY_NOT_FOUND = ("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+
+PERSISTED_QUERY_NOT_SUPPORTED = (
+    "PersistedQueryNotSupported",
+    "PERSISTED_QUERY_NOT_SUPPORTED",
+)
+
+
+@internal_typechecked
+class CompiledQuery:
+    """A GraphQL query that has been validated, minified and hashed once"""
+
+    def __init__(self, query: str):
+        """Validate and compile a GraphQL query
+
+        Args:
+            query (str): GraphQL query with a named operation such as
+                "query target($ensemblId: String!){ ... }"
+
+        Raises:
+            InvalidGraphQLQuery: if the query is not a single named operation with
+                balanced brackets whose declared variables match the used ones
+        """
+        text = " ".join(query.split())
+        text = PUNCTUATION_WHITESPACE_PATTERN.sub(r"\1", text)
+
+        matched = OPERATION_PATTERN.match(text)
+        if matched is None:
+            raise exceptions.InvalidGraphQLQuery(
+                f"query must start with a named operation:\n{query}"
+            )
+        for opening, closing in ("{}", "()", "[]"):
+            depth = 0
+            for character in text:
+                depth += (character == opening) - (character == closing)
+                if depth < 0:
+                    break
+            if depth != 0:
+                raise exceptions.InvalidGraphQLQuery(
+                    f"unbalanced '{opening}{closing}' in query:\n{query}"
+                )
+
+        declared = set(VARIABLE_DEFINITION_PATTERN.findall(matched.group(3) or ""))
+        used = set(VARIABLE_USAGE_PATTERN.findall(text[matched.end() :]))
+        if declared != used:
+            raise exceptions.InvalidGraphQLQuery(
+                f"declared variables {sorted(declared)} do not match used variables"
+                f" {sorted(used)} in query:\n{query}"
+            )
+
+        self.text = text
+        self.operation_name = matched.group(2)
+        self.variables = frozenset(declared)
+        self.sha256 = hashlib.sha256(text.encode("UTF-8")).hexdigest()
+
+    def payload(
+        self, variables: dict, include_query: bool = True, include_hash: bool = False
+    ) -> dict:
+        """Build the JSON body of a request
+
+        Args:
+            variables (dict): variables to substitute into query
+            include_query (bool, optional): add the query text. Defaults to True.
+            include_hash (bool, optional): add the automatic persisted query hash.
+                Defaults to False.
+
+        Returns:
+            dict: JSON body for a GraphQL POST request
+        """
+        body = {"operationName": self.operation_name, "variables": variables}
+        if include_query:
+            body["query"] = self.text
+        if include_hash:
+            body["extensions"] = {
+                "persistedQuery": {"version": 1, "sha256Hash": self.sha256}
+            }
+        return body
+
+
+@internal_typechecked
+class QueryRegistry:
+    """Compile each GraphQL query once and post it as a persisted query"""
+
+    def __init__(self, persisted_queries: bool = True):
+        """Initialize Class
+
+        Args:
+            persisted_queries (bool, optional): send hash-only automatic persisted
+                queries before falling back to the full query. Defaults to True.
+        """
+        self.persisted_queries = persisted_queries
+        self._queries = {}
+        self._unsupported_urls = set()
+
+    def register(self, query: str) -> CompiledQuery:
+        """Validate and compile a query, or return it if it is already registered
+
+        Args:
+            query (str): GraphQL query
+
+        Returns:
+            CompiledQuery: compiled query
+        """
+        compiled = self._queries.get(query)
+        if compiled is None:
+            compiled = self._queries[query] = CompiledQuery(query)
+        return compiled
+
+    def __contains__(self, query: str) -> bool:
+        return query in self._queries
+
+    def post(
+        self,
+        session: requests.Session,
+        url: str,
+        query: str,
+        variables: dict,
+        timeout: typing.Optional[float] = None,
+    ) -> requests.models.Response:
+        """Post a registered query, sending only its hash when the server allows it
+
+        Args:
+            session (requests.Session): session used to send the request
+            url (str): GraphQL endpoint
+            query (str): GraphQL query, registered on first use. Queries failing
+                validation are sent unchanged.
+            variables (dict): variables to substitute into query
+            timeout (float, optional): timeout for each request. Defaults to None.
+
+        Returns:
+            requests.models.Response: response to the full or persisted query
+        """
+        try:
+            compiled = self.register(query)
+        except exceptions.InvalidGraphQLQuery:
+            # leave ad hoc queries that fail validation for the server to report
+            return session.post(
+                url, json={"query": query, "variables": variables}, timeout=timeout
+            )
+
+        persisted = self.persisted_queries and url not in self._unsupported_urls
+        if persisted:
+            response = session.post(
+                url,
+                json=compiled.payload(
+                    variables, include_query=False, include_hash=True
+                ),
+                timeout=timeout,
+            )
+
+            persisted_error = _find_persisted_query_error(response)
+            if persisted_error is None and not _is_error_response(response):
+                return response
+            if persisted_error in PERSISTED_QUERY_NOT_SUPPORTED:
+                self._unsupported_urls.add(url)
+                persisted = False
+            _forget_cached_response(session, response)
+
+        # any error to a hash-only request is retried once with the full query
+        full_response = session.post(
+            url,
+            json=compiled.payload(variables, include_hash=persisted),
+            timeout=timeout,
+        )
+        if (
+            persisted
+            and persisted_error is None
+            and not _is_error_response(full_response)
+        ):
+            # the server rejects hashes without saying so, i.e. it has no APQ support
+            self._unsupported_urls.add(url)
+        return full_response
+
+
+@internal_typechecked
+def _find_persisted_query_error(
+    response: requests.models.Response,
+) -> typing.Optional[str]:
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+
+    errors = body.get("errors") or []
+    for error in errors:
+        codes = (error.get("message"), (error.get("extensions") or {}).get("code"))
+        for code in codes:
+            if code in PERSISTED_QUERY_NOT_FOUND + PERSISTED_QUERY_NOT_SUPPORTED:
+                return code
+
+    return None
+
+
+@internal_typechecked
+def _is_error_response(response: requests.models.Response) -> bool:
+    if response.status_code != 200:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return isinstance(body, dict) and bool(body.get("errors")) and not body.get("data")
+
+
+@internal_typechecked
+def _forget_cached_response(
+    session: requests.Session, response: requests.models.Response
+):
+    cache = getattr(session, "cache", None)
+    cache_key = getattr(response, "cache_key", None)
+    if cache is not None and cache_key is not None:
+        cache.delete(cache_key)
+
+
+QUERY_REGISTRY = QueryRegistry()
@@ -4,10 +4,10 @@
 import typing
 import functools
 import time
-import typeguard
+from .typecheck import internal_typechecked
 
 
-@typeguard.typechecked
+@internal_typechecked
 class Retryer():
     """
     Use as decorator to retry functions with requests incase they fail
@@ -0,0 +1,51 @@
+"""Shared HTTP sessions with connection pooling and a persistent response cache
+"""
+
+import functools
+from datetime import timedelta
+from typing import Optional, Union
+import requests
+import requests_cache
+import typeguard
+
+DEFAULT_EXPIRE_AFTER = timedelta(days=30)
+
+
+@functools.lru_cache(maxsize=None)
+@typeguard.typechecked
+def get_cached_session(
+    cache_name: str = "requests_cache",
+    expire_after: Optional[Union[timedelta, int]] = DEFAULT_EXPIRE_AFTER,
+    pool_maxsize: int = 10,
+) -> requests_cache.CachedSession:
+    """Return a cached session that is shared by all callers with the same arguments
+
+    Responses are cached in a SQLite database in the user cache directory. They are
+    pickled, so binary content such as network images is stored as is instead of
+    being encoded as text. The session keeps up to pool_maxsize connections per host
+    open between calls.
+
+    Args:
+        cache_name (str, optional): name of the cache database. Defaults to
+            "requests_cache".
+        expire_after (Union[timedelta, int], optional): time, or seconds, after
+            which cached responses expire. None never expires. Defaults to 30 days.
+        pool_maxsize (int, optional): connections kept open per host. Defaults to 10.
+
+    Returns:
+        requests_cache.CachedSession: shared session
+    """
+    session = requests_cache.CachedSession(
+        cache_name,
+        backend="sqlite",
+        serializer="pickle",
+        use_cache_dir=True,
+        allowable_methods=("GET", "HEAD", "POST"),
+        expire_after=-1 if expire_after is None else expire_after,
+    )
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_maxsize, pool_maxsize=pool_maxsize
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,91 @@
+"""Run-time type checking that can be limited to the public API
+
+Public functions and methods are always checked with typeguard. Private helpers are
+decorated with internal_typechecked instead, which skips the typeguard
+instrumentation while fast mode is on. Fast mode is off by default and can be turned
+on with the environment variable TARGET_ANNOTATION_FAST_MODE=1 or with
+set_fast_mode(True).
+"""
+
+import functools
+import inspect
+import os
+import typeguard
+
+FAST_MODE_ENV = "TARGET_ANNOTATION_FAST_MODE"
+
+_fast_mode = os.environ.get(FAST_MODE_ENV, "").strip().lower() in ("1", "true", "yes")
+
+
+def set_fast_mode(enabled: bool = True):
+    """Turn fast mode on or off for the running process
+
+    Args:
+        enabled (bool, optional): skip type checks in private helpers.
+            Defaults to True.
+    """
+    global _fast_mode  # pylint: disable=global-statement
+    _fast_mode = bool(enabled)
+
+
+def is_fast_mode() -> bool:
+    """Whether type checks in private helpers are currently skipped
+
+    Returns:
+        bool: True if fast mode is on
+    """
+    return _fast_mode
+
+
+def internal_typechecked(target):
+    """Typecheck a private function, or the private methods of a class, unless fast
+    mode is on.
+
+    On a class, public methods (including dunder methods such as __init__) are always
+    type checked like with typeguard.typechecked and only private methods follow
+    fast mode.
+
+    Args:
+        target (Callable or type): function or class to decorate
+
+    Returns:
+        Callable or type: decorated function or class
+    """
+    if not inspect.isclass(target):
+        return _check_unless_fast_mode(target)
+
+    for name, attr in list(vars(target).items()):
+        wrapper_class = None
+        if isinstance(attr, (classmethod, staticmethod)):
+            wrapper_class, attr = type(attr), attr.__func__
+        if not inspect.isfunction(attr) or not attr.__qualname__.startswith(
+            target.__qualname__ + "."
+        ):
+            continue
+
+        if _is_public(name):
+            decorated = typeguard.typechecked(attr)
+        else:
+            decorated = _check_unless_fast_mode(attr)
+        setattr(
+            target, name, decorated if wrapper_class is None else wrapper_class(decorated)
+        )
+    return target
+
+
+def _check_unless_fast_mode(func):
+    checked = typeguard.typechecked(func)
+    if checked is func:
+        return func
+
+    @functools.wraps(func)
+    def _dispatch(*args, **kwargs):
+        if _fast_mode:
+            return func(*args, **kwargs)
+        return checked(*args, **kwargs)
+
+    return _dispatch
+
+
+def _is_public(name: str) -> bool:
+    return not name.startswith("_") or (name.startswith("__") and name.endswith("__"))
@@ -9,7 +9,19 @@ from datetime import timedelta
 
 
 @typechecked
-def get_ensembl_from_uniprot(uniprot: str, timeout: Optional[float] = 5):
+def get_ensembl_from_uniprot(
+    uniprot: str, timeout: Optional[float] = 5, uniprot_index: Optional[str] = None
+):
+    if uniprot_index is not None:
+        from ..uniprot import get_uniprot_index
+
+        ens_id = get_uniprot_index(uniprot_index).ensembl_ids([uniprot])[uniprot]
+        if ens_id is None:
+            warnings.warn(
+                f"{uniprot}: No ensembl_id from OpenTargets or HPA", stacklevel=2
+            )
+        return ens_id
+
     session = requests_cache.CachedSession(
         "requests_cache",
         backend="sqlite",
@@ -24,13 +36,29 @@ def get_ensembl_from_uniprot(uniprot: str, timeout: Optional[float] = 5):
     except (requests.ReadTimeout, requests.ConnectTimeout):
         warnings.warn(f"{uniprot}: Request timed out", stacklevel=2)
         return None
+    ens_id = find_ensembl_xref(req)
+    if ens_id is None:
+        warnings.warn(f"{uniprot}: No ensembl_id from OpenTargets or HPA", stacklevel=2)
+    return ens_id
+
+
+@typechecked
+def find_ensembl_xref(entry: dict) -> Optional[str]:
+    """Find the Ensembl gene ID in the cross-references of a UniProtKB entry
+
+    Args:
+        entry (dict): UniProtKB entry in JSON format
+
+    Returns:
+        Optional[str]: ID of the first OpenTargets or HPA cross-reference, None if
+            the entry has neither
+    """
     try:
         ens_id = [
             x
-            for x in req["uniProtKBCrossReferences"]
+            for x in entry["uniProtKBCrossReferences"]
             if (x["database"] == "OpenTargets") or (x["database"] == "HPA")
         ][0]["id"]
     except (KeyError, IndexError):
-        warnings.warn(f"{uniprot}: No ensembl_id from OpenTargets or HPA", stacklevel=2)
         return None
     return ens_id
@@ -0,0 +1,111 @@
+"""Precompiled validators for the identifiers passed to the annotation APIs
+
+The patterns are compiled once at import and the functions are deliberately not
+wrapped in typeguard, since they run once per request. pandas is only imported by
+normalize_ensembl_ids so that the single ID checks stay cheap to import.
+"""
+
+import importlib.util
+import re
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ENSEMBL_ID_PATTERN = re.compile(r"ENSG[0-9]{11}")
+
+DISEASE_ID_PATTERN = re.compile(r"[A-Za-z0-9]+_[A-Za-z0-9]+")
+
+ENSEMBL_VERSION_PATTERN = r"\.[0-9]+$"
+
+# arrow-backed strings make the bulk string operations several times faster
+STRING_DTYPE = (
+    "string[pyarrow]" if importlib.util.find_spec("pyarrow") is not None else "string"
+)
+
+
+def is_valid_ensembl_id(ensembl_id: str) -> bool:
+    """Check for an ENSG prefix followed by 11 digits such as ENSG00000149554
+
+    Args:
+        ensembl_id (str): ensemble ID to check
+
+    Returns:
+        bool: whether ensembl_id is a valid ensemble gene ID
+    """
+    return ENSEMBL_ID_PATTERN.fullmatch(ensembl_id) is not None
+
+
+def is_valid_disease_id(
+    disease_id: str, prefixes: Optional[AbstractSet[str]] = None
+) -> bool:
+    """Check for an ontology prefix, one underscore and an identifier such as
+    EFO_0001378
+
+    Args:
+        disease_id (str): disease ID to check
+        prefixes (AbstractSet[str], optional): known upper-case ontology prefixes,
+            e.g. from ontology_source.get_ontology_prefixes. The prefix is not
+            checked when None. Defaults to None.
+
+    Returns:
+        bool: whether disease_id is a valid disease ID
+    """
+    if DISEASE_ID_PATTERN.fullmatch(disease_id) is None:
+        return False
+    return prefixes is None or disease_id.split("_", 1)[0].upper() in prefixes
+
+
+def normalize_ensembl_ids(
+    ensembl_ids: Iterable[str],
+    symbols: Optional[Mapping[str, Optional[str]]] = None,
+) -> Tuple[List[str], "pd.DataFrame"]:
+    """Normalize, validate and deduplicate many ensemble IDs at once
+
+    IDs are stripped of whitespace, upper-cased and stripped of version suffixes, so
+    " ensg00000149554.12" becomes "ENSG00000149554". All steps are vectorized pandas
+    string operations.
+
+    Args:
+        ensembl_ids (Iterable[str]): ensemble IDs such as ENSG00000149554
+        symbols (Mapping[str, Optional[str]], optional): ensemble IDs by gene symbol,
+            e.g. from open_targets.map_symbols_to_ensembl. Inputs that are keys,
+            after stripping whitespace, are replaced by their ID. Defaults to None.
+
+    Returns:
+        Tuple[List[str], pd.DataFrame]: unique valid normalized IDs in input order, and
+            a report with one row per input and the columns "input", "normalized",
+            "valid", "duplicate" and "symbol", whether the input was a mapped symbol.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    inputs = pd.Series(list(ensembl_ids), dtype=STRING_DTYPE)
+    stripped = inputs.str.strip()
+    mapped = stripped.map(dict(symbols or {})).astype(STRING_DTYPE)
+    normalized = (
+        mapped.fillna(stripped)
+        .str.upper()
+        .str.replace(ENSEMBL_VERSION_PATTERN, "", regex=True)
+    )
+    valid = normalized.str.fullmatch(ENSEMBL_ID_PATTERN.pattern).fillna(False)
+    duplicate = normalized.duplicated() & valid
+
+    report = pd.DataFrame(
+        {
+            "input": inputs,
+            "normalized": normalized,
+            "valid": valid.astype(bool),
+            "duplicate": duplicate.astype(bool),
+            "symbol": mapped.notna().astype(bool),
+        }
+    )
+    unique_ids = normalized[report["valid"] & ~report["duplicate"]].tolist()
+    return unique_ids, report
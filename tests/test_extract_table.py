@@ -1,14 +1,17 @@
 import unittest
+import json
 import sys
 import os
 import pandas as pd
 import shutil
+import tempfile
 from typeguard import TypeCheckError
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from target_annotation import ExtractTable
 
+
 class TestExtractTable(unittest.TestCase):
     def setUp(self) -> None:
         test_data_dir = os.path.dirname(__file__) + "/test_data/test_target_annotation"
@@ -59,3 +62,122 @@ class TestExtractTable(unittest.TestCase):
             shutil.rmtree(self.good_output_path)
 
         return super().tearDown()
+
+
+ANNOTATE_DB = {
+    "ENSG00000149554": {
+        "OpenTargets": {
+            "approvedSymbol": "CHEK1",
+            "biotype": "protein_coding",
+            "functionDescriptions": ["Serine/threonine-protein kinase"],
+            "geneOntology": [{"term": {"id": "GO:0004672", "name": "kinase"}}],
+            "tractability": [
+                {"modality": "SM", "label": "Approved Drug", "value": False},
+                {"modality": "SM", "label": "Structure with Ligand", "value": True},
+            ],
+            "expressions": [
+                {"tissue": {"label": "liver"}, "rna": {"value": 5}},
+                {"tissue": {"label": "testis"}, "rna": {"value": 50}},
+            ],
+            "isEssential": True,
+            "chemicalProbes": [],
+            "knownDrugs": {"rows": [{"prefName": "PREXASERTIB"}]},
+            "geneticConstraint": [
+                {"constraintType": "lof", "oeUpper": 0.49},
+                {"constraintType": "syn", "oeUpper": 1.1},
+            ],
+            "associatedDiseases": {
+                "rows": [
+                    {"score": 0.5, "disease": {"id": "EFO_0001378", "name": "MM"}},
+                    {"score": 0.2, "disease": {"id": "EFO_0000311", "name": "cancer"}},
+                ]
+            },
+            "safetyLiabilities": [{"event": "cardiac arrhythmia"}],
+        },
+        "OpenTargets_disease_evidence": {
+            "id": "EFO_0001378",
+            "evidences": {"count": 1, "rows": [{"literature": ["123"]}]},
+        },
+        "Pharos": {
+            "sym": "CHEK1",
+            "name": "Serine/threonine-protein kinase Chk1",
+            "description": None,
+            "tdl": "Tchem",
+            "pathways": [{"type": "Reactome", "name": "Cell Cycle"}],
+            "dto": [{"name": "Kinase"}],
+            "pantherClasses": [{"name": "protein kinase"}],
+            "tissueSpecificity": [{"name": "Tau", "value": 0.8}],
+            "gwas": [{"snps": [{"value": "rs1"}], "trait": "height"}],
+            "gwasAnalytics": {
+                "associations": [{"trait": "height", "meanRankScore": 9}]
+            },
+            "diseases": [{"name": "cancer", "datasource_count": 3}],
+        },
+    },
+    "ENSG00000012048": {
+        "OpenTargets": {
+            "approvedSymbol": "BRCA1",
+            "functionDescriptions": ["E3 ubiquitin-protein ligase"],
+            "isEssential": False,
+            "associatedDiseases": {"rows": []},
+        },
+        "OpenTargets_disease_evidence": {},
+        "Pharos": {"dto": [{"name": "Ligase"}], "tdl": None},
+    },
+}
+
+
+class TestExtractTableFields(unittest.TestCase):
+    """Unit test class for the single-pass summary extraction"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.annotate_db = self.data_dir + "/target_annotation.json"
+        with open(self.annotate_db, "w", encoding="UTF-8") as file:
+            json.dump(ANNOTATE_DB, file)
+
+    def test_summary_fields(self):
+        pipe = ExtractTable(self.annotate_db, self.data_dir + "/table_result")
+        table, key = pipe.get_table()
+        self.assertEqual(list(table.index), list(ANNOTATE_DB))
+        self.assertEqual(
+            list(table.columns[:4]), ["name", "symbol", "biotype", "description"]
+        )
+        self.assertEqual(list(key["column"][4:]), list(table.columns[4:]))
+
+        chek1, brca1 = table.iloc[0], table.iloc[1]
+        self.assertEqual(chek1["classes"], ["DTO: Kinase", "Panther: protein kinase"])
+        self.assertTrue(pd.isna(brca1["classes"]))
+        self.assertEqual(chek1["tractability"], ["SM: Structure with Ligand"])
+        self.assertEqual(chek1["top_rna_expression"], [("testis", 50), ("liver", 5)])
+        self.assertEqual(chek1["gnomAD_LOEUF"], 0.49)
+        self.assertEqual(chek1["disease_association_score"], 0.5)
+        self.assertTrue(pd.isna(brca1["disease_association_score"]))
+        self.assertEqual(
+            chek1["related_publications"], ["https://pubmed.ncbi.nlm.nih.gov/123"]
+        )
+        self.assertEqual(
+            [chek1["has_chem_probe"], chek1["has_known_drug"]], [False, True]
+        )
+        self.assertEqual(brca1["description"], "E3 ubiquitin-protein ligase")
+        self.assertEqual(
+            brca1["pharos_link"], "https://pharos.nih.gov/targets/ENSG00000012048"
+        )
+
+        expression = pipe.get_expression_table()
+        self.assertEqual(expression.loc["ENSG00000149554", "testis"], 50)
+
+    def test_no_disease(self):
+        annotate_db = {
+            target: dict(annotation, OpenTargets_disease_evidence={"id": None})
+            for target, annotation in ANNOTATE_DB.items()
+        }
+        with open(self.annotate_db, "w", encoding="UTF-8") as file:
+            json.dump(annotate_db, file)
+        pipe = ExtractTable(self.annotate_db, self.data_dir + "/table_result")
+        with self.assertWarns(UserWarning):
+            table, _ = pipe.get_table()
+        self.assertNotIn("disease_association_score", table.columns)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
@@ -0,0 +1,157 @@
+import unittest
+import json
+import requests
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import open_targets
+from target_annotation.utils import graphql, exceptions
+
+
+def make_response(body, status_code=200):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode("UTF-8")  # pylint: disable=W0212
+    return response
+
+
+class FakeSession(requests.Session):
+    """Mock session returning canned responses and recording the posted bodies"""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.bodies = []
+
+    def post(self, url, json=None, **kwargs):  # pylint: disable=W0221
+        self.bodies.append(json)
+        return self.responses.pop(0)
+
+
+class TestGraphQL(unittest.TestCase):
+    """Unit test class for graphql submodule"""
+
+    def setUp(self):
+        self.url = "https://example.org/graphql"
+        self.query = """
+        query target($ensemblId: String!){
+            target(ensemblId: $ensemblId){
+                id
+                approvedSymbol
+            }
+        }
+        """
+        self.variables = {"ensemblId": "ENSG00000149554"}
+        self.data = {"data": {"target": {"id": "ENSG00000149554"}}}
+
+    def test_compiled_query(self):
+        compiled = graphql.CompiledQuery(self.query)
+        self.assertEqual(
+            compiled.text,
+            "query target($ensemblId:String!){target(ensemblId:$ensemblId)"
+            "{id approvedSymbol}}",
+        )
+        self.assertEqual(compiled.operation_name, "target")
+        self.assertEqual(compiled.variables, frozenset(["ensemblId"]))
+        self.assertEqual(len(compiled.sha256), 64)
+
+        for bad_query in [
+            "",
+            "{ target { id } }",
+            self.query.replace("approvedSymbol", "approvedSymbol }"),
+            self.query.replace("(ensemblId: $ensemblId)", ""),
+            self.query.replace("$ensemblId)", "$ensemblId, size: $size)"),
+        ]:
+            with self.assertRaises(exceptions.InvalidGraphQLQuery):
+                graphql.CompiledQuery(bad_query)
+
+    def test_registry(self):
+        registry = graphql.QueryRegistry()
+        compiled = registry.register(self.query)
+        self.assertIs(registry.register(self.query), compiled)
+        self.assertIn(self.query, registry)
+        self.assertIn(open_targets.TARGET_ANNOTATION, graphql.QUERY_REGISTRY)
+
+    def test_persisted_query(self):
+        registry = graphql.QueryRegistry()
+        compiled = registry.register(self.query)
+
+        session = FakeSession([make_response(self.data)])
+        response = registry.post(session, self.url, self.query, self.variables)
+        self.assertEqual(response.json(), self.data)
+        self.assertNotIn("query", session.bodies[0])
+        self.assertEqual(
+            session.bodies[0]["extensions"]["persistedQuery"]["sha256Hash"],
+            compiled.sha256,
+        )
+
+        not_found = {"errors": [{"message": "PersistedQueryNotFound"}]}
+        session = FakeSession([make_response(not_found), make_response(self.data)])
+        response = registry.post(session, self.url, self.query, self.variables)
+        self.assertEqual(response.json(), self.data)
+        self.assertEqual(session.bodies[1]["query"], compiled.text)
+        self.assertIn("extensions", session.bodies[1])
+
+    def test_persisted_query_not_supported(self):
+        registry = graphql.QueryRegistry()
+        not_supported = {
+            "errors": [
+                {
+                    "message": "Persisted queries are not supported",
+                    "extensions": {"code": "PERSISTED_QUERY_NOT_SUPPORTED"},
+                }
+            ]
+        }
+        session = FakeSession(
+            [
+                make_response(not_supported, 400),
+                make_response(self.data),
+                make_response(self.data),
+            ]
+        )
+        for _ in range(2):
+            response = registry.post(session, self.url, self.query, self.variables)
+            self.assertEqual(response.json(), self.data)
+        self.assertEqual(len(session.bodies), 3)
+        self.assertNotIn("extensions", session.bodies[2])
+
+        session = FakeSession([make_response(self.data)])
+        registry.post(session, self.url, "", self.variables)
+        self.assertEqual(session.bodies, [{"query": "", "variables": self.variables}])
+
+    def test_persisted_query_bad_request(self):
+        registry = graphql.QueryRegistry()
+        compiled = registry.register(self.query)
+
+        # a server without APQ rejects the hash-only body with a plain 400
+        no_query = {"errors": [{"message": "Must provide query string."}]}
+        session = FakeSession(
+            [
+                make_response(no_query, 400),
+                make_response(self.data),
+                make_response(self.data),
+            ]
+        )
+        for _ in range(2):
+            response = registry.post(session, self.url, self.query, self.variables)
+            self.assertEqual(response.json(), self.data)
+        self.assertEqual(session.bodies[1]["query"], compiled.text)
+        self.assertIn("extensions", session.bodies[1])
+        self.assertNotIn("extensions", session.bodies[2])
+
+        # errors in the query itself are returned after one retry
+        registry = graphql.QueryRegistry()
+        bad_request = {"errors": [{"message": "Variable $ensemblId is invalid"}]}
+        session = FakeSession(
+            [make_response(bad_request, 400), make_response(bad_request, 400)]
+        )
+        response = registry.post(session, self.url, self.query, self.variables)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), bad_request)
+        self.assertEqual(len(session.bodies), 2)
+
+        session = FakeSession([make_response(self.data)])
+        registry.post(session, self.url, self.query, self.variables)
+        self.assertNotIn("query", session.bodies[0])
@@ -0,0 +1,64 @@
+import unittest
+import subprocess
+import sys
+import os
+
+PACKAGE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY_MODULES = ["pandas", "requests", "requests_cache", "typeguard", "IPython"]
+
+# cumulative import time of the package in microseconds; the heavy dependencies
+# alone take well over a second
+MAX_IMPORT_TIME_US = 250_000
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=PACKAGE_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class TestImports(unittest.TestCase):
+    """Unit test class for the lazy package imports"""
+
+    def test_no_heavy_imports(self):
+        """Test that importing the package does not load heavy dependencies"""
+        result = run_python(
+            "-c",
+            "import sys, target_annotation;"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_lazy_attributes(self):
+        """Test that public names resolve on first access"""
+        result = run_python(
+            "-c",
+            "import sys, target_annotation;"
+            "from target_annotation import request_ot_target_annotation;"
+            "print(request_ot_target_annotation.__module__, 'requests' in sys.modules,"
+            " 'request_pharos_target_annotation' in dir(target_annotation))",
+        )
+        self.assertEqual(
+            result.stdout.split(), ["target_annotation.open_targets", "True", "True"]
+        )
+
+        import target_annotation  # pylint: disable=C0415
+
+        with self.assertRaises(AttributeError):
+            target_annotation.foo  # pylint: disable=W0104
+
+    def test_import_time(self):
+        """Test that importing the package stays cheap"""
+        result = run_python("-X", "importtime", "-c", "import target_annotation")
+        cumulative = [
+            int(line.split("|")[1])
+            for line in result.stderr.splitlines()
+            if line.split("|")[-1].strip() == "target_annotation"
+        ]
+        self.assertEqual(len(cumulative), 1)
+        self.assertLess(cumulative[0], MAX_IMPORT_TIME_US)
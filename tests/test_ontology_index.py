@@ -0,0 +1,202 @@
+import unittest
+import json
+import shutil
+import sys
+import os
+import tempfile
+import threading
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import (
+    TargetAnnotation,
+    ontology_source,
+    open_targets,
+    target_annotation,
+)
+from target_annotation.ontology_index import OntologyIndex
+
+OBO_FIXTURE = """format-version: 1.2
+ontology: mondo
+
+[Term]
+id: MONDO:0000001
+name: disease
+
+[Term]
+id: MONDO:0005071
+name: nervous system disorder
+is_a: MONDO:0000001 ! disease
+
+[Term]
+id: MONDO:0004975
+name: Alzheimer disease
+is_a: MONDO:0005071 {source="MONDO:equivalentTo"} ! nervous system disorder
+
+[Term]
+id: MONDO:0007088
+name: Alzheimer disease type 1
+is_a: MONDO:0004975 ! Alzheimer disease
+is_a: MONDO:0005071 ! nervous system disorder
+
+[Term]
+id: MONDO:0009999
+name: obsolete disease
+is_obsolete: true
+is_a: MONDO:0004975
+
+[Typedef]
+id: part_of
+name: part of
+"""
+
+OLS_CLASSES = [
+    {"shortForm": "EFO_0000408", "label": ["disease"], "directParent": []},
+    {
+        "shortForm": "EFO_0000616",
+        "label": "neoplasm",
+        "directParent": ["http://www.ebi.ac.uk/efo/EFO_0000408"],
+    },
+    {
+        "shortForm": "EFO_0001378",
+        "label": "multiple myeloma",
+        "directParent": ["http://www.ebi.ac.uk/efo/EFO_0000616"],
+    },
+]
+
+
+class FakeOlsClassesHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the OLS v2 classes endpoint with a single page"""
+
+    def do_GET(self):  # pylint: disable=C0103
+        content = json.dumps(
+            {"page": 0, "totalPages": 1, "elements": OLS_CLASSES}
+        ).encode("UTF-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOntologyIndex(unittest.TestCase):
+    """Unit test class for the local ontology closure index"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.obo_path = self.data_dir + "/mondo.obo"
+        with open(self.obo_path, "w", encoding="UTF-8") as file:
+            file.write(OBO_FIXTURE)
+        self.db_path = self.data_dir + "/mondo.sqlite"
+        self.index = OntologyIndex.build_from_obo(self.db_path, self.obo_path)
+
+    def test_closure(self):
+        """Test ancestor and descendant lookups"""
+        with self.assertRaises(FileNotFoundError):
+            OntologyIndex(self.data_dir + "/foo.sqlite")
+
+        self.assertEqual(
+            self.index.descendants("MONDO_0005071"), ["MONDO_0004975", "MONDO_0007088"]
+        )
+        self.assertEqual(
+            self.index.ancestors("MONDO:0007088", include_self=True),
+            ["MONDO_0000001", "MONDO_0004975", "MONDO_0005071", "MONDO_0007088"],
+        )
+        self.assertEqual(self.index.descendants("MONDO_0007088"), [])
+        self.assertFalse(self.index.has_term("MONDO_0009999"))
+        self.assertEqual(self.index.descendants("MONDO_0009999", True), [])
+        self.assertEqual(
+            self.index.expand(["MONDO_0004975", "EFO_0001378"]),
+            ["MONDO_0004975", "EFO_0001378", "MONDO_0007088"],
+        )
+        self.assertEqual(
+            self.index.labels(["MONDO_0004975", "foo"]),
+            {"MONDO_0004975": "Alzheimer disease"},
+        )
+        self.assertEqual(self.index.metadata["source"], "mondo.obo")
+
+    def test_build_from_ols(self):
+        """Test building an index from OLS classes"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOlsClassesHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        classes_url = ontology_source.EBI_CLASSES_URL
+        ontology_source.EBI_CLASSES_URL = f"http://127.0.0.1:{server.server_port}"
+        try:
+            index = OntologyIndex.build_from_ols(self.data_dir + "/efo.sqlite", "efo")
+        finally:
+            ontology_source.EBI_CLASSES_URL = classes_url
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(
+            index.descendants("EFO_0000408"), ["EFO_0000616", "EFO_0001378"]
+        )
+        self.assertEqual(index.labels(["EFO_0000408"]), {"EFO_0000408": "disease"})
+        index.close()
+
+    def test_target_annotation_disease_codes(self):
+        """Test disease expansion in TargetAnnotation"""
+        pipe = TargetAnnotation(
+            "ENSG00000149554",
+            "MONDO_0004975",
+            self.data_dir + "/results",
+            ontology_index=self.db_path,
+        )
+        self.assertEqual(pipe.disease_codes, ["MONDO_0004975", "MONDO_0007088"])
+
+        def fake_request(query, variables, **kwargs):
+            return {
+                "disease": {
+                    "id": variables["efoId"],
+                    "name": variables["efoId"],
+                    "evidences": {
+                        "count": 1,
+                        "cursor": None,
+                        "rows": [{"target": {"id": "ENSG00000149554"}}],
+                    },
+                }
+            }
+
+        with (
+            mock.patch.object(
+                open_targets, "request_open_targets", side_effect=fake_request
+            ) as request,
+            mock.patch.object(
+                ontology_source, "get_ontology_prefixes", return_value=None
+            ),
+        ):
+            pipe.targets = ["ENSG00000149554", "ENSG00000012048"]
+            # pylint: disable-next=protected-access
+            results = pipe._TargetAnnotation__get_disease_open_targets()
+        # one count probe and one request per disease for all targets
+        self.assertEqual(request.call_count, 4)
+        self.assertEqual(results["ENSG00000149554"]["evidences"]["count"], 2)
+        self.assertEqual(results["ENSG00000012048"]["evidences"]["rows"], [])
+
+        merged = target_annotation._merge_disease_evidences(  # pylint: disable=W0212
+            "MONDO_0004975",
+            [
+                {
+                    "id": "MONDO_0004975",
+                    "name": "Alzheimer disease",
+                    "evidences": {"count": 1, "cursor": None, "rows": [{"id": "a"}]},
+                },
+                {
+                    "id": "MONDO_0007088",
+                    "name": "Alzheimer disease type 1",
+                    "evidences": {"count": 2, "cursor": "x", "rows": [{"id": "b"}]},
+                },
+            ],
+        )
+        self.assertEqual(merged["name"], "Alzheimer disease")
+        self.assertEqual(merged["evidences"]["count"], 3)
+        self.assertEqual(merged["evidences"]["rows"], [{"id": "a"}, {"id": "b"}])
+        self.assertEqual(merged["evidences"]["cursors"], {"MONDO_0007088": "x"})
+
+    def tearDown(self):
+        self.index.close()
+        ontology_source.get_ontology_index.cache_clear()
+        shutil.rmtree(self.data_dir)
@@ -1,12 +1,21 @@
 import unittest
+import contextlib
+import json
 import requests
+import shutil
 import os
 import sys
+import tempfile
+import threading
+import warnings
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from target_annotation import ontology_source
-from target_annotation.utils import exceptions
+from target_annotation.utils import exceptions, validators
 
 
 class GoodStatus(requests.models.Response):
@@ -25,6 +34,50 @@ class BadStatus(requests.models.Response):
         self.status_code = 400
 
 
+class FakeOlsHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the OLS ontologies endpoint with HAL paging"""
+
+    ontologies = []
+    requests_seen = []
+    page_info = True
+    status = 200
+
+    def do_GET(self):  # pylint: disable=C0103
+        self.requests_seen.append(self.path)
+        if self.status != 200:
+            self.send_error(self.status)
+            return
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        page = int(params.get("page", ["0"])[0])
+        size = int(params.get("size", ["20"])[0])
+        rows = self.ontologies[page * size : (page + 1) * size]
+        total_pages = -(-len(self.ontologies) // size)
+        host = f"http://{self.headers['Host']}{url.path}"
+        links = {"self": {"href": f"{host}?page={page}&size={size}"}}
+        if page + 1 < total_pages:
+            links["next"] = {"href": f"{host}?page={page + 1}&size={size}"}
+        content = {
+            "_embedded": {"ontologies": [{"ontologyId": x} for x in rows]},
+            "_links": links,
+        }
+        if self.page_info:
+            content["page"] = {
+                "size": size,
+                "totalElements": len(self.ontologies),
+                "totalPages": total_pages,
+                "number": page,
+            }
+        content = json.dumps(content).encode("UTF-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
 class TestOntologySource(unittest.TestCase):
     """Unit test class for ontology source module"""
 
@@ -47,6 +100,105 @@ class TestOntologySource(unittest.TestCase):
         )
 
         with self.assertRaises(exceptions.InvalidStatusCode):
-            ontology_source._find_all_ontology_sources_in_response(  # pylint: disable=W0212
+            ontology_source._read_ontology_page(  # pylint: disable=W0212
                 self.bad_response
             )
+
+
+class TestOntologySourceOffline(unittest.TestCase):
+    """Unit test class for ontology sources against a local stand-in server"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOlsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        FakeOlsHandler.ontologies = ["efo", "mondo", "ordo", "ncit"]
+        FakeOlsHandler.requests_seen = []
+        FakeOlsHandler.page_info = True
+        FakeOlsHandler.status = 200
+
+        self.cache_dir = tempfile.mkdtemp()
+        self.ontology_url = ontology_source.EBI_ONTOLOGY_URL
+        self.cache_name = ontology_source.ONTOLOGY_CACHE_NAME
+        ontology_source.EBI_ONTOLOGY_URL = (
+            f"http://127.0.0.1:{self.server.server_port}/ols4/api/ontologies"
+        )
+        ontology_source.ONTOLOGY_CACHE_NAME = self.cache_dir + "/ontologies.sqlite"
+        ontology_source._load_ontology_prefixes.cache_clear()  # pylint: disable=W0212
+
+    def test_ontology_prefixes(self):
+        """Test the cached prefix index used to validate disease IDs"""
+        prefixes = ontology_source.get_ontology_prefixes()
+        self.assertEqual(prefixes, {"EFO", "MONDO", "ORDO", "NCIT", "ORPHANET", "OTAR"})
+        for disease_id in ["EFO_0001378", "Orphanet_399", "OTAR_0000006"]:
+            self.assertTrue(validators.is_valid_disease_id(disease_id, prefixes))
+        self.assertFalse(validators.is_valid_disease_id("FOO_0001378", prefixes))
+
+        # the ontology list is read from the persistent cache
+        ontology_source._load_ontology_prefixes.cache_clear()  # pylint: disable=W0212
+        self.assertEqual(ontology_source.get_ontology_prefixes(), prefixes)
+        self.assertEqual(len(FakeOlsHandler.requests_seen), 1)
+        ontology_source.request_ebi_ontology_sources(use_cache=False)
+        self.assertEqual(len(FakeOlsHandler.requests_seen), 2)
+
+    def test_ontology_pages(self):
+        """Test that all pages are fetched, with and without page totals"""
+        FakeOlsHandler.ontologies = [f"ontology{i}" for i in range(25)]
+        ontologies = ontology_source.iter_ebi_ontologies(page_size=10)
+        self.assertEqual(next(ontologies), {"ontologyId": "ontology0"})
+        self.assertEqual(len(FakeOlsHandler.requests_seen), 1)
+        self.assertEqual(
+            [x["ontologyId"] for x in ontologies], FakeOlsHandler.ontologies[1:]
+        )
+        self.assertEqual(len(FakeOlsHandler.requests_seen), 3)
+
+        # HAL next links only
+        FakeOlsHandler.page_info = False
+        self.assertEqual(
+            [x["ontologyId"] for x in ontology_source.iter_ebi_ontologies(page_size=7)],
+            FakeOlsHandler.ontologies,
+        )
+        self.assertEqual(len(FakeOlsHandler.requests_seen), 7)
+
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            next(ontology_source.iter_ebi_ontologies(page_size=0))
+
+        FakeOlsHandler.status = 400
+        with self.assertRaises(exceptions.InvalidStatusCode):
+            with contextlib.redirect_stdout(None):
+                next(ontology_source.iter_ebi_ontologies(max_tries=0))
+
+    def test_unavailable_ontology_list(self):
+        """Test that disease IDs are only checked by format without OLS"""
+        self.server.shutdown()
+        self.server.server_close()
+        with self.assertWarns(UserWarning):
+            self.assertIsNone(ontology_source.get_ontology_prefixes())
+        self.assertTrue(validators.is_valid_disease_id("FOO_0001378", None))
+
+        # OLS is not asked again during the backoff, even once it is back
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOlsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        ontology_source.EBI_ONTOLOGY_URL = (
+            f"http://127.0.0.1:{self.server.server_port}/ols4/api/ontologies"
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertIsNone(ontology_source.get_ontology_prefixes())
+        self.assertEqual(len(FakeOlsHandler.requests_seen), 0)
+
+        # the failure is not cached beyond the backoff
+        retry_after = ontology_source.PREFIX_RETRY_AFTER
+        ontology_source.PREFIX_RETRY_AFTER = timedelta(0)
+        try:
+            self.assertIn("ORPHANET", ontology_source.get_ontology_prefixes())
+        finally:
+            ontology_source.PREFIX_RETRY_AFTER = retry_after
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        ontology_source.EBI_ONTOLOGY_URL = self.ontology_url
+        ontology_source.ONTOLOGY_CACHE_NAME = self.cache_name
+        ontology_source._load_ontology_prefixes.cache_clear()  # pylint: disable=W0212
+        ontology_source._prefix_failed_at = None  # pylint: disable=W0212
+        shutil.rmtree(self.cache_dir)
@@ -4,11 +4,13 @@ import json
 import requests
 import sys
 import os
+import tempfile
+from unittest import mock
 from typeguard import TypeCheckError
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from target_annotation import open_targets
+from target_annotation import open_targets, ontology_source
 from target_annotation.utils import exceptions
 
 
@@ -110,6 +112,15 @@ class TestOpenTargets(unittest.TestCase):
         self.good_response = GoodStatus()
         self.bad_response = BadStatus()
 
+        # disease ID prefixes without a request to OLS
+        patcher = mock.patch.object(
+            ontology_source,
+            "get_ontology_prefixes",
+            return_value=frozenset(["EFO", "MONDO", "NCIT", "CVDO"]),
+        )
+        self.get_ontology_prefixes = patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_request_ot_target_annotation(self):
         """Test target_disease_evidences request from open targets"""
 
@@ -196,7 +207,9 @@ class TestOpenTargets(unittest.TestCase):
 
         for ens_id in self.all_bad_ens_ids:
             with self.assertRaises(exceptions.InvalidEnsembleId):
-                open_targets.request_ot_target_disease_evidences(self.disease_id, ens_id)
+                open_targets.request_ot_target_disease_evidences(
+                    self.disease_id, ens_id
+                )
 
         results = open_targets.request_ot_target_disease_evidences(
             self.disease_id,
@@ -217,3 +230,274 @@ class TestOpenTargets(unittest.TestCase):
         with self.assertRaises(TypeCheckError):
             with contextlib.redirect_stdout(None):
                 open_targets.request_open_targets(query="", variables=[])
+
+    def test_iter_ot_target_disease_evidences(self):
+        """Test cursor pagination of target_disease_evidences from open targets"""
+        rows = self.all_target_evidences[2]["evidences"]["rows"]
+
+        def fake_pages(query, variables, **kwargs):
+            page = {None: (rows[:1], "page_2"), "page_2": (rows[1:], None)}
+            page_rows, cursor = page[variables["cursor"]]
+            return {
+                "disease": {
+                    "id": self.disease_id,
+                    "evidences": {"count": 2, "cursor": cursor, "rows": page_rows},
+                }
+            }
+
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            open_targets.iter_ot_target_disease_evidences(
+                self.disease_id, self.ensemble_id, page_size=0
+            )
+
+        with mock.patch.object(
+            open_targets, "request_open_targets", side_effect=fake_pages
+        ) as request:
+            results = list(
+                open_targets.iter_ot_target_disease_evidences(
+                    self.disease_id, self.ensemble_id, page_size=1
+                )
+            )
+        self.assertEqual(results, rows)
+        self.assertEqual(request.call_count, 2)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            checkpoint = temp_dir + "/checkpoint.json"
+            with mock.patch.object(
+                open_targets, "request_open_targets", side_effect=fake_pages
+            ):
+                stream = open_targets.iter_ot_target_disease_evidences(
+                    self.disease_id,
+                    self.ensemble_id,
+                    page_size=1,
+                    checkpoint_path=checkpoint,
+                )
+                self.assertEqual(next(stream), rows[0])
+                self.assertEqual(next(stream), rows[1])
+                self.assertTrue(os.path.exists(checkpoint))
+
+                resumed = open_targets.iter_ot_target_disease_evidences(
+                    self.disease_id,
+                    self.ensemble_id,
+                    page_size=1,
+                    checkpoint_path=checkpoint,
+                )
+                self.assertEqual(list(resumed), rows[1:])
+                self.assertFalse(os.path.exists(checkpoint))
+
+    def test_evidence_profiles(self):
+        """Test evidence profiles only request the fields they need"""
+        queries = open_targets.TARGET_DISEASE_EVIDENCE_QUERIES
+        self.assertEqual(queries["full"], open_targets.TARGET_DISEASE_EVIDENCE_QUERY)
+        self.assertNotIn("literature", queries["ids-only"])
+        self.assertIn("literature", queries["literature"])
+        self.assertNotIn("textMiningSentences", queries["literature"])
+        self.assertIn("textMiningSentences", queries["full"])
+        self.assertLess(len(queries["literature"]), len(queries["full"]))
+
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            open_targets.request_ot_target_disease_evidences(
+                self.disease_id, self.ensemble_id, profile="foo"
+            )
+
+        with mock.patch.object(
+            open_targets, "request_open_targets", return_value={"disease": {}}
+        ) as request:
+            open_targets.request_ot_target_disease_evidences(
+                self.disease_id, self.ensemble_id, profile="literature"
+            )
+        self.assertEqual(request.call_args.args[0], queries["literature"])
+
+    def test_disease_id_prefixes(self):
+        """Test that disease ID prefixes are checked before any API request"""
+        with mock.patch.object(open_targets, "request_open_targets") as request:
+            with self.assertRaises(exceptions.InvalidDiseaseID):
+                open_targets.request_ot_associated_targets("FOO_0001378")
+        request.assert_not_called()
+
+        # local parquet lookups do not fetch the OLS prefix list
+        self.get_ontology_prefixes.reset_mock()
+        with mock.patch.object(open_targets, "get_parquet_backend") as backend:
+            backend.return_value.associated_targets.return_value = {"id": "FOO_1"}
+            open_targets.request_ot_associated_targets("FOO_1", parquet_dir="foo")
+        self.get_ontology_prefixes.assert_not_called()
+
+    def test_request_ot_target_disease_evidences_by_datasource(self):
+        """Test per datasource evidence requests are merged into one result"""
+        rows = self.all_target_evidences[2]["evidences"]["rows"]
+        datasource_rows = {"europepmc": rows[:1], "chembl": rows[1:]}
+
+        def fake_request(query, variables, **kwargs):
+            (datasource_id,) = variables["datasourceIds"]
+            return {
+                "disease": {
+                    "id": self.disease_id,
+                    "name": "multiple myeloma",
+                    "evidences": {
+                        "count": 10,
+                        "cursor": None,
+                        "rows": datasource_rows[datasource_id],
+                    },
+                }
+            }
+
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            open_targets.request_ot_target_disease_evidences_by_datasource(
+                self.disease_id, self.ensemble_id, []
+            )
+
+        with mock.patch.object(
+            open_targets, "request_open_targets", side_effect=fake_request
+        ) as request:
+            results = open_targets.request_ot_target_disease_evidences_by_datasource(
+                self.disease_id, self.ensemble_id, ["europepmc", "chembl"]
+            )
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(results["name"], "multiple myeloma")
+        self.assertEqual(results["evidences"]["count"], 20)
+        self.assertEqual(results["evidences"]["rows"], rows)
+
+        with mock.patch.object(
+            open_targets, "request_open_targets", side_effect=fake_request
+        ):
+            results = open_targets.request_ot_target_disease_evidences_by_datasource(
+                self.disease_id, self.ensemble_id, ["chembl"], all_pages=True
+            )
+        self.assertEqual(results["evidences"]["count"], 1)
+        self.assertEqual(results["evidences"]["rows"], rows[1:])
+
+    def test_request_ot_target_disease_evidences_batch(self):
+        """Test evidence requests for one disease and a batch of targets"""
+        targets = self.all_valid_ens_ids[:3]
+        without_evidences = [targets[1], self.all_valid_ens_ids[3]]
+        diseases = ["EFO_0001663", self.disease_id, "MONDO_0004992"]
+
+        def fake_request(query, variables, **kwargs):
+            if variables["efoId"] == "MONDO_0004992":
+                return {"disease": None}
+            # two evidences per target for self.disease_id, one for the others
+            repeat = 2 if variables["efoId"] == self.disease_id else 1
+            rows = [
+                {"target": {"id": ensembl_id}, "score": 0.5}
+                for ensembl_id in variables["ensemblIds"]
+                if ensembl_id not in without_evidences
+                for _ in range(repeat)
+            ]
+            truncated = len(rows) > variables["size"]
+            return {
+                "disease": {
+                    "id": variables["efoId"],
+                    "name": "disease",
+                    "evidences": {
+                        "count": len(rows),
+                        "cursor": "next" if truncated else None,
+                        "rows": rows[: variables["size"]],
+                    },
+                }
+            }
+
+        with mock.patch.object(
+            open_targets, "request_open_targets", side_effect=fake_request
+        ) as request:
+            results = open_targets.request_ot_target_disease_evidences_batch(
+                diseases, targets, size=3, profile="literature", max_workers=1
+            )
+        # one probe per disease, then one request for the batch of EFO_0001663 and
+        # one per target for self.disease_id, whose four evidences exceed size
+        self.assertEqual(request.call_count, 7)
+        probes = [x for x in request.call_args_list if x.args[1]["size"] == 1]
+        self.assertEqual(len(probes), 3)
+        for probe in probes:
+            self.assertEqual(
+                probe.args[0], open_targets.TARGET_DISEASE_EVIDENCE_QUERIES["ids-only"]
+            )
+        self.assertEqual(list(results), diseases[:2])
+        evidences = results["EFO_0001663"][targets[0]]["evidences"]
+        self.assertEqual(evidences["count"], 1)
+        self.assertEqual(
+            evidences["rows"], [{"target": {"id": targets[0]}, "score": 0.5}]
+        )
+        self.assertEqual(results["EFO_0001663"][targets[1]]["evidences"]["rows"], [])
+        self.assertEqual(results[self.disease_id][targets[2]]["evidences"]["count"], 2)
+
+        # a batch without evidences is only probed
+        with mock.patch.object(
+            open_targets, "request_open_targets", side_effect=fake_request
+        ) as request:
+            results = open_targets.request_ot_target_disease_evidences_batch(
+                diseases[:1], without_evidences
+            )
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(
+            [x["evidences"]["count"] for x in results["EFO_0001663"].values()], [0, 0]
+        )
+
+        with self.assertRaises(exceptions.InvalidEnsembleId):
+            open_targets.request_ot_target_disease_evidences_batch(
+                diseases, targets + ["foo"]
+            )
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            open_targets.request_ot_target_disease_evidences_batch(
+                diseases, targets, batch_size=0
+            )
+
+    def test_map_symbols_to_ensembl(self):
+        """Test batched symbol searches with a persistent cache"""
+        targets = {
+            "CHEK1": {"id": self.ensemble_id, "synonyms": ["CHK1"]},
+            "ERBB2": {"id": "ENSG00000141736", "synonyms": ["HER2"]},
+        }
+
+        def fake_search(query, variables, **kwargs):
+            self.assertIn("searchTargets", query)
+            return {
+                alias: {
+                    "hits": [
+                        {
+                            "id": target["id"],
+                            "entity": "target",
+                            "object": {
+                                "approvedSymbol": symbol,
+                                "symbolSynonyms": [
+                                    {"label": x} for x in target["synonyms"]
+                                ],
+                                "obsoleteSymbols": [],
+                            },
+                        }
+                        for symbol, target in targets.items()
+                        if value in [symbol, *target["synonyms"]]
+                    ]
+                }
+                for alias, value in variables.items()
+            }
+
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            open_targets.map_symbols_to_ensembl(["CHEK1"], batch_size=0)
+
+        cache_name = open_targets.SYMBOL_CACHE_NAME
+        with tempfile.TemporaryDirectory() as temp_dir:
+            open_targets.SYMBOL_CACHE_NAME = temp_dir + "/ot_gene_symbols.sqlite"
+            try:
+                with mock.patch.object(
+                    open_targets, "request_open_targets", side_effect=fake_search
+                ) as request:
+                    results = open_targets.map_symbols_to_ensembl(
+                        ["chek1", "HER2", "foo", " CHEK1"], batch_size=2
+                    )
+                    self.assertEqual(request.call_count, 2)
+                    self.assertEqual(
+                        results,
+                        {
+                            "chek1": self.ensemble_id,
+                            "HER2": "ENSG00000141736",
+                            "foo": None,
+                            " CHEK1": self.ensemble_id,
+                        },
+                    )
+
+                    # answered from the persistent cache, including missing symbols
+                    results = open_targets.map_symbols_to_ensembl(["FOO", "Chek1"])
+                    self.assertEqual(request.call_count, 2)
+                    self.assertEqual(results, {"FOO": None, "Chek1": self.ensemble_id})
+            finally:
+                open_targets.SYMBOL_CACHE_NAME = cache_name
@@ -0,0 +1,230 @@
+import unittest
+import json
+import shutil
+import sys
+import os
+import tempfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import open_targets
+from target_annotation.open_targets_parquet import OpenTargetsParquet
+from target_annotation.utils import exceptions
+
+
+def open_json(file_path):
+    with open(file_path, "r", encoding="UTF-8") as file:
+        contents = json.load(file)
+    return contents
+
+
+def write_parquet(path, rows, partition_cols=None):
+    table = pa.Table.from_pylist(rows)
+    if partition_cols:
+        pq.write_to_dataset(table, path, partition_cols=partition_cols)
+    else:
+        os.makedirs(path)
+        pq.write_table(table, path + "/part-0.parquet")
+
+
+class TestOpenTargetsParquet(unittest.TestCase):
+    """Unit test class for the local open targets parquet backend"""
+
+    def setUp(self):
+        self.disease_id = "EFO_0001378"  # Multiple Myeloma
+        self.ensemble_id = "ENSG00000149554"  # CHEK1
+        self.other_ensemble_id = "ENSG00000012048"  # BRCA1
+        self.missing_ensemble_id = "ENSG01234567910"
+
+        test_data_dir = os.path.dirname(__file__) + "/test_data"
+        self.api_evidences = open_json(
+            f"{test_data_dir}/{self.disease_id}_target_evidence_size_2.json"
+        )
+
+        self.data_dir = tempfile.mkdtemp()
+        write_parquet(
+            self.data_dir + "/targets",
+            [
+                {
+                    "id": self.ensemble_id,
+                    "approvedSymbol": "CHEK1",
+                    "biotype": "protein_coding",
+                    "proteinIds": [{"id": "O14757", "source": "uniprot_swissprot"}],
+                    "go": [{"id": "GO:0005634", "source": "GOC", "evidence": "IDA"}],
+                    "tractability": [
+                        {"modality": "SM", "id": "Approved Drug", "value": False}
+                    ],
+                    "constraint": [{"constraintType": "lof", "oeUpper": 0.3}],
+                    "chemicalProbes": [{"id": "PF-477736", "drugId": None}],
+                },
+                {"id": self.other_ensemble_id, "approvedSymbol": "BRCA1"},
+            ],
+        )
+        write_parquet(
+            self.data_dir + "/diseases",
+            [
+                {"id": self.disease_id, "name": "multiple myeloma"},
+                {"id": "EFO_0000311", "name": "cancer"},
+            ],
+        )
+        write_parquet(
+            self.data_dir + "/associationByOverallIndirect",
+            [
+                {
+                    "diseaseId": self.disease_id,
+                    "targetId": self.ensemble_id,
+                    "score": 0.2,
+                },
+                {
+                    "diseaseId": "EFO_0000311",
+                    "targetId": self.ensemble_id,
+                    "score": 0.6,
+                },
+                {
+                    "diseaseId": self.disease_id,
+                    "targetId": self.other_ensemble_id,
+                    "score": 0.4,
+                },
+            ],
+        )
+        evidence_rows = [
+            {
+                "sourceId": row["datasourceId"],
+                "diseaseId": row["disease"]["id"],
+                "targetId": row["target"]["id"],
+                "datasourceId": row["datasourceId"],
+                "datatypeId": row["datatypeId"],
+                "score": row["score"],
+                "literature": row["literature"],
+                "publicationYear": row["publicationYear"],
+            }
+            for row in self.api_evidences["evidences"]["rows"]
+        ]
+        evidence_rows.append(
+            dict(evidence_rows[0], sourceId="chembl", datasourceId="chembl", score=1.0)
+        )
+        write_parquet(self.data_dir + "/evidence", evidence_rows, ["sourceId"])
+
+        self.backend = OpenTargetsParquet(self.data_dir)
+
+    def test_target_annotation(self):
+        """Test target annotation from local parquet files"""
+        with self.assertRaises(FileNotFoundError):
+            OpenTargetsParquet(self.data_dir + "/foo")
+
+        results = open_targets.request_ot_target_annotation(
+            self.ensemble_id, parquet_dir=self.data_dir
+        )
+        self.assertEqual(results["approvedSymbol"], "CHEK1")
+        self.assertEqual(results["geneOntology"][0]["term"]["id"], "GO:0005634")
+        self.assertEqual(results["tractability"][0]["label"], "Approved Drug")
+        self.assertEqual(
+            [x["disease"]["name"] for x in results["associatedDiseases"]["rows"]],
+            ["cancer", "multiple myeloma"],
+        )
+        self.assertIsNone(results["expressions"])
+        self.assertEqual(results["knownDrugs"], {"rows": []})
+
+        with self.assertRaises(exceptions.EmptyOpenTargetsResponse):
+            open_targets.request_ot_target_annotation(
+                self.missing_ensemble_id, parquet_dir=self.data_dir
+            )
+
+        results = self.backend.target_annotations(
+            [self.ensemble_id, self.other_ensemble_id, self.missing_ensemble_id]
+        )
+        self.assertEqual(set(results), {self.ensemble_id, self.other_ensemble_id})
+
+    def test_associated_targets(self):
+        """Test associated targets from local parquet files"""
+        results = open_targets.request_ot_associated_targets(
+            self.disease_id, parquet_dir=self.data_dir
+        )
+        self.assertEqual(results["associatedTargets"]["count"], 2)
+        self.assertEqual(
+            [
+                x["target"]["approvedSymbol"]
+                for x in results["associatedTargets"]["rows"]
+            ],
+            ["BRCA1", "CHEK1"],
+        )
+
+        with self.assertRaises(exceptions.EmptyOpenTargetsResponse):
+            open_targets.request_ot_associated_targets(
+                "EFO_9999999", parquet_dir=self.data_dir
+            )
+
+    def test_target_disease_evidences(self):
+        """Test target disease evidences from local parquet files"""
+        results = open_targets.request_ot_target_disease_evidences(
+            self.disease_id,
+            self.ensemble_id,
+            size=1,
+            profile="literature",
+            parquet_dir=self.data_dir,
+        )
+        api_row = self.api_evidences["evidences"]["rows"][0]
+        self.assertEqual(results["evidences"]["count"], 2)
+        self.assertEqual(len(results["evidences"]["rows"]), 1)
+        self.assertEqual(
+            results["evidences"]["rows"][0],
+            {
+                key: api_row[key]
+                for key in [
+                    "disease",
+                    "target",
+                    "datasourceId",
+                    "datatypeId",
+                    "score",
+                    "literature",
+                    "publicationYear",
+                ]
+            },
+        )
+
+        results = open_targets.request_ot_target_disease_evidences(
+            self.disease_id,
+            self.ensemble_id,
+            datasource_ids=["europepmc", "chembl"],
+            profile="ids-only",
+            parquet_dir=self.data_dir,
+        )
+        self.assertEqual(results["evidences"]["count"], 3)
+        self.assertEqual(results["evidences"]["rows"][0]["datasourceId"], "chembl")
+        self.assertEqual(results["evidences"]["rows"][0]["score"], 1.0)
+        self.assertNotIn("literature", results["evidences"]["rows"][0])
+
+    def test_target_disease_evidences_batch(self):
+        """Test evidences for many diseases and targets from local parquet files"""
+        results = open_targets.request_ot_target_disease_evidences_batch(
+            [self.disease_id, "EFO_0000311", "EFO_9999999"],
+            [self.ensemble_id, self.other_ensemble_id],
+            datasource_ids=["europepmc", "chembl"],
+            profile="ids-only",
+            parquet_dir=self.data_dir,
+        )
+        self.assertEqual(list(results), [self.disease_id, "EFO_0000311"])
+        self.assertEqual(
+            results[self.disease_id][self.ensemble_id],
+            self.backend.target_disease_evidences(
+                self.disease_id,
+                self.ensemble_id,
+                ["europepmc", "chembl"],
+                10000,
+                "ids-only",
+            ),
+        )
+        self.assertEqual(
+            results[self.disease_id][self.ensemble_id]["evidences"]["count"], 3
+        )
+        self.assertEqual(
+            results[self.disease_id][self.other_ensemble_id]["evidences"]["count"], 0
+        )
+        self.assertEqual(
+            results["EFO_0000311"][self.ensemble_id]["evidences"]["count"], 0
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
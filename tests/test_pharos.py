@@ -3,6 +3,7 @@ import contextlib
 import json
 import requests
 import sys
+from unittest import mock
 import os
 from typeguard import TypeCheckError
 
@@ -77,6 +78,66 @@ class TestOpenTargets(unittest.TestCase):
         results = pharos.request_pharos_target_annotation(self.ensemble_id)
         self.assertIsInstance(results, dict)
 
+    def test_target_annotation_profiles(self):
+        """Test the Pharos field selection offline"""
+        summary = pharos.TARGET_ANNOTATION_QUERIES["summary"]
+        self.assertIn("pantherClasses", summary)
+        for field in ["ppis", "gtex", "tinx"]:
+            self.assertNotIn(field, summary)
+        self.assertIn("gtex", pharos.TARGET_ANNOTATION)
+        self.assertIn(summary, pharos.graphql.QUERY_REGISTRY)
+
+        # field order follows PHAROS_FIELDS
+        self.assertEqual(
+            pharos.build_target_annotation_query(("ppis", "sym")),
+            pharos.build_target_annotation_query(("sym", "ppis")),
+        )
+
+        for fields in [(), ("foo",)]:
+            with self.assertRaises(exceptions.InvalidQueryParameter):
+                pharos.build_target_annotation_query(fields)
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            pharos.request_pharos_target_annotation(self.ensemble_id, profile="foo")
+
+        with mock.patch.object(pharos, "request_pharos", return_value={"target": {}}):
+            pharos.request_pharos_target_annotation(
+                self.ensemble_id, fields=["sym", "tdl"]
+            )
+            query = pharos.request_pharos.call_args.args[0]
+        self.assertIn("tdl", query)
+        self.assertNotIn("diseases", query)
+
+    def test_collection_limits(self):
+        """Test top-N limits on nested Pharos collections"""
+        self.assertIn("diseases(top: 100) {", pharos.TARGET_ANNOTATION)
+        self.assertIn("pathways(top: 50) {", pharos.TARGET_ANNOTATION)
+        self.assertIn("gtex {", pharos.TARGET_ANNOTATION)
+        self.assertNotIn("ppis", pharos.TARGET_ANNOTATION)
+        self.assertNotIn("tinx", pharos.TARGET_ANNOTATION)
+        self.assertEqual(
+            pharos.build_target_annotation_query(pharos.PHAROS_PROFILES["summary"]),
+            pharos.TARGET_ANNOTATION_QUERIES["summary"],
+        )
+
+        query = pharos.build_target_annotation_query(
+            ("ppis", "diseases", "tinx"), {"ppis": 5, "diseases": None, "tinx": None}
+        )
+        self.assertIn("ppis(top: 5) {", query)
+        self.assertIn("diseases {", query)
+        self.assertIn("tinx{", query)
+
+        for limits in [{"sym": 5}, {"ppis": -1}, {"gtex": 5}, {"ppis": 0}]:
+            with self.assertRaises(exceptions.InvalidQueryParameter):
+                pharos.build_target_annotation_query(("ppis",), limits)
+
+        with mock.patch.object(pharos, "request_pharos", return_value={"target": {}}):
+            pharos.request_pharos_target_annotation(
+                self.ensemble_id, profile="summary", limits={"pathways": 3}
+            )
+            query = pharos.request_pharos.call_args.args[0]
+        self.assertIn("pathways(top: 3)", query)
+        self.assertNotIn("ppis", query)
+
     def test_request_pharos(self):
         """Test generic request made to open targets"""
         with self.assertRaises(exceptions.InvalidStatusCode):
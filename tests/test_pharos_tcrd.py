@@ -0,0 +1,179 @@
+import unittest
+import shutil
+import sqlite3
+import sys
+import os
+import tempfile
+import warnings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import pharos
+from target_annotation.pharos_tcrd import PharosTCRD
+from target_annotation.utils import exceptions
+
+TCRD_FIXTURE = """
+CREATE TABLE target (id INTEGER PRIMARY KEY, name TEXT, tdl TEXT, fam TEXT);
+CREATE TABLE protein (id INTEGER PRIMARY KEY, sym TEXT, description TEXT,
+                      uniprot TEXT, stringid TEXT);
+CREATE TABLE t2tc (target_id INTEGER, protein_id INTEGER);
+CREATE TABLE xref (id INTEGER PRIMARY KEY, xtype TEXT, protein_id INTEGER,
+                   value TEXT);
+CREATE TABLE panther_class (id INTEGER PRIMARY KEY, pcid TEXT, name TEXT);
+CREATE TABLE p2pc (panther_class_id INTEGER, protein_id INTEGER);
+CREATE TABLE gwas (id INTEGER PRIMARY KEY, protein_id INTEGER, disease_trait TEXT,
+                   snps TEXT, context TEXT, p_value REAL);
+CREATE TABLE pathway (id INTEGER PRIMARY KEY, protein_id INTEGER, pwtype TEXT,
+                      id_in_source TEXT, name TEXT);
+CREATE TABLE disease (id INTEGER PRIMARY KEY, dtype TEXT, protein_id INTEGER,
+                      name TEXT, did TEXT, evidence TEXT, score REAL, source TEXT,
+                      mondoid TEXT);
+CREATE TABLE ppi (id INTEGER PRIMARY KEY, ppitype TEXT, protein1_id INTEGER,
+                  protein2_id INTEGER, p_int REAL, p_ni REAL, p_wrong REAL,
+                  score INTEGER, evidence TEXT, interaction_type TEXT);
+CREATE TABLE tinx_novelty (protein_id INTEGER, score REAL);
+
+INSERT INTO target VALUES (1, 'Serine/threonine-protein kinase Chk1', 'Tchem',
+                           'Kinase');
+INSERT INTO target VALUES (2, 'Breast cancer type 1 susceptibility protein',
+                           'Tchem', NULL);
+INSERT INTO protein VALUES (1, 'CHEK1', 'Checkpoint kinase', 'O14757',
+                            'ENSP00000391090');
+INSERT INTO protein VALUES (2, 'BRCA1', 'E3 ubiquitin-protein ligase', 'P38398',
+                            'ENSG00000012048');
+INSERT INTO t2tc VALUES (1, 1), (2, 2);
+INSERT INTO xref VALUES (1, 'Ensembl', 1, 'ENSG00000149554');
+INSERT INTO panther_class VALUES (1, 'PC00137', 'kinase');
+INSERT INTO p2pc VALUES (1, 1);
+INSERT INTO gwas VALUES (1, 1, 'height', 'rs1; rs2', 'intron_variant', 1e-8);
+INSERT INTO pathway VALUES (1, 1, 'Reactome', 'R-HSA-1', 'Cell Cycle');
+INSERT INTO pathway VALUES (2, 2, 'Reactome', 'R-HSA-1', 'Cell Cycle');
+INSERT INTO pathway VALUES (3, 1, 'KEGG', 'hsa04110', 'Cell cycle');
+INSERT INTO disease VALUES (1, 'DisGeNET', 1, 'cancer', 'C0006826', NULL, 0.3,
+                            NULL, 'MONDO:0004992');
+INSERT INTO disease VALUES (2, 'JensenLab', 1, 'cancer', 'DOID:162', NULL, 2.1,
+                            NULL, NULL);
+INSERT INTO disease VALUES (3, 'DisGeNET', 1, 'leukemia', 'C0023418', NULL, 0.1,
+                            NULL, NULL);
+INSERT INTO ppi VALUES (1, 'STRINGDB', 1, 2, NULL, NULL, NULL, 900, NULL, NULL);
+INSERT INTO tinx_novelty VALUES (1, 0.0012);
+"""
+
+
+class TestPharosTCRD(unittest.TestCase):
+    """Unit test class for the local Pharos TCRD backend"""
+
+    def setUp(self):
+        self.ensemble_id = "ENSG00000149554"  # CHEK1
+        self.other_ensemble_id = "ENSG00000012048"  # BRCA1, via protein.stringid
+        self.missing_ensemble_id = "ENSG01234567910"
+
+        self.data_dir = tempfile.mkdtemp()
+        self.db_path = self.data_dir + "/tcrd.sqlite"
+        with sqlite3.connect(self.db_path) as connection:
+            connection.executescript(TCRD_FIXTURE)
+        connection.close()
+
+        self.backend = PharosTCRD(self.db_path, create_indexes=True)
+
+    def test_target_annotation(self):
+        """Test target annotation from a local TCRD database"""
+        with self.assertRaises(FileNotFoundError):
+            PharosTCRD(self.data_dir + "/foo.sqlite")
+
+        results = pharos.request_pharos_target_annotation(
+            self.ensemble_id, limits={"ppis": 10, "tinx": None}, tcrd_db=self.db_path
+        )
+        self.assertEqual(list(results), list(pharos.PHAROS_FIELDS))
+        self.assertEqual(results["sym"], "CHEK1")
+        self.assertEqual(results["tdl"], "Tchem")
+        self.assertEqual(results["novelty"], 0.0012)
+        self.assertEqual(
+            results["pantherClasses"], [{"name": "kinase", "pcid": "PC00137"}]
+        )
+        self.assertEqual(
+            [x["value"] for x in results["gwas"][0]["snps"]],
+            ["intron_variant", "intron_variant"],
+        )
+        self.assertEqual(
+            results["pathways"][1]["targetCounts"], [{"name": "Tchem", "value": 2}]
+        )
+        self.assertEqual(
+            [(x["name"], x["datasource_count"]) for x in results["diseases"]],
+            [("cancer", 2), ("leukemia", 1)],
+        )
+        self.assertEqual(results["diseases"][0]["mondoID"], "MONDO:0004992")
+        self.assertEqual(results["ppis"][0]["target"], {"preferredSymbol": "BRCA1"})
+        self.assertEqual(
+            results["ppis"][0]["props"], [{"name": "score", "value": "900"}]
+        )
+
+        # tables missing from the database
+        self.assertIsNone(results["dto"])
+        self.assertIsNone(results["gwasAnalytics"])
+        self.assertIsNone(results["tinx"])
+
+        with self.assertRaises(exceptions.EmptyPharosResponse):
+            pharos.request_pharos_target_annotation(
+                self.missing_ensemble_id, tcrd_db=self.db_path
+            )
+
+    def test_fields_and_limits(self):
+        """Test field selection and collection limits in the local backend"""
+        results = pharos.request_pharos_target_annotation(
+            self.ensemble_id,
+            fields=["sym", "diseases", "pathways"],
+            limits={"diseases": 1, "pathways": None},
+            tcrd_db=self.db_path,
+        )
+        self.assertEqual(list(results), ["sym", "pathways", "diseases"])
+        self.assertEqual(len(results["diseases"]), 1)
+        self.assertEqual(len(results["pathways"]), 2)
+
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            pharos.request_pharos_target_annotation(
+                self.ensemble_id, fields=["foo"], tcrd_db=self.db_path
+            )
+
+        results = self.backend.target_annotations(
+            [self.ensemble_id, self.other_ensemble_id, self.missing_ensemble_id],
+            pharos.PHAROS_PROFILES["summary"],
+        )
+        self.assertEqual(set(results), {self.ensemble_id, self.other_ensemble_id})
+        self.assertEqual(results[self.other_ensemble_id]["diseases"], [])
+        self.assertNotIn("ppis", results[self.ensemble_id])
+
+    def test_create_indexes(self):
+        """Test that indexes are only added on request"""
+        db_path = self.data_dir + "/plain.sqlite"
+        with sqlite3.connect(db_path) as connection:
+            connection.executescript(TCRD_FIXTURE)
+        connection.close()
+
+        def count_indexes():
+            with sqlite3.connect(db_path) as connection:
+                return connection.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'"
+                ).fetchone()[0]
+
+        with self.assertWarns(UserWarning):
+            backend = pharos.get_tcrd_backend(db_path)
+        self.assertEqual(count_indexes(), 0)
+        self.assertIn("idx_pathway_name", backend.missing_indexes())
+
+        backend.create_indexes()
+        self.assertEqual(count_indexes(), 10)
+        backend.create_indexes()
+        self.assertEqual(count_indexes(), 10)
+        self.assertEqual(backend.missing_indexes(), [])
+
+        pharos.get_tcrd_backend.cache_clear()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            pharos.get_tcrd_backend(db_path)
+        backend.close()
+
+    def tearDown(self):
+        self.backend.close()
+        pharos.get_tcrd_backend.cache_clear()
+        shutil.rmtree(self.data_dir)
@@ -1,14 +1,22 @@
 import unittest
+import contextlib
 import json
 import requests
+import shutil
 import sys
 import os
+import tempfile
+import threading
+from datetime import timedelta
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pandas as pd
 from typeguard import TypeCheckError
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from analysis_functions import stringdb
+from target_annotation import stringdb
+from target_annotation.utils import exceptions, session
 
 
 class GoodStatus(requests.models.Response):
@@ -27,6 +35,41 @@ class BadStatus(requests.models.Response):
         self.status_code = 400
 
 
+class FakeStringHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the STRING API answering POST requests from a dict"""
+
+    responses = {}
+    requests_seen = []
+
+    def do_POST(self):  # pylint: disable=C0103
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("UTF-8")
+        self.requests_seen.append((self.path, body))
+        content = self.responses[self.path]
+        status_code = 200
+        if callable(content):
+            content = content(parse_qs(body))
+        if isinstance(content, int):
+            status_code, content = content, {"error": "server error"}
+        if not isinstance(content, bytes):
+            content = json.dumps(content).encode("UTF-8")
+        self.send_response(status_code)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def get_string_ids(params):
+    """Resolve every identifier except "foo" to a fake stringdb id"""
+    return [
+        {"queryIndex": i, "queryItem": x, "stringId": "9606." + x.upper()}
+        for i, x in enumerate(params["identifiers"][0].split("\r"))
+        if x != "foo"
+    ]
+
+
 def open_json(file_path):
     with open(file_path, "r", encoding="UTF-8") as file:
         contents = json.load(file)
@@ -72,3 +115,177 @@ class TestStringDB(unittest.TestCase):
 
         results = stringdb.get_network_plot(self.gene)
         self.assertIsInstance(results, bytes)
+
+
+class TestStringDBOffline(unittest.TestCase):
+    """Unit test class for the STRING client against a local stand-in server"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStringHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        FakeStringHandler.requests_seen = []
+
+        self.cache_dir = tempfile.mkdtemp()
+        self.string_api_url = stringdb.string_api_url
+        self.cache_name = stringdb.STRING_CACHE_NAME
+        self.id_cache_name = stringdb.STRING_ID_CACHE_NAME
+        stringdb.string_api_url = f"http://127.0.0.1:{self.server.server_port}/api"
+        stringdb.STRING_CACHE_NAME = self.cache_dir + "/stringdb_cache"
+        stringdb.STRING_ID_CACHE_NAME = self.cache_dir + "/stringdb_ids.sqlite"
+
+    def count_requests(self, path):
+        return sum(x == path for x, _ in FakeStringHandler.requests_seen)
+
+    def test_cached_network_plot(self):
+        """Test that network images are served from the cache"""
+        image = bytes(range(256)) * 4
+        FakeStringHandler.responses = {
+            "/api/highres_image/network": image,
+            "/api/json/get_string_ids": get_string_ids,
+        }
+
+        for _ in range(2):
+            self.assertEqual(stringdb.get_network_plot(["TP53", "CHEK1"]), image)
+        self.assertEqual(self.count_requests("/api/highres_image/network"), 1)
+
+        stringdb.get_network_plot(["TP53"])
+        self.assertEqual(self.count_requests("/api/highres_image/network"), 2)
+
+    def test_cache_expiry(self):
+        """Test the configurable time to live of cached responses"""
+        FakeStringHandler.responses = {
+            "/api/json/network": [{"preferredName_A": "TP53"}],
+            "/api/json/get_string_ids": get_string_ids,
+        }
+        expire_after = stringdb.STRING_CACHE_EXPIRE_AFTER
+        stringdb.STRING_CACHE_EXPIRE_AFTER = timedelta(seconds=0)
+        try:
+            for _ in range(2):
+                stringdb.get_network(["TP53"])
+        finally:
+            stringdb.STRING_CACHE_EXPIRE_AFTER = expire_after
+        self.assertEqual(self.count_requests("/api/json/network"), 2)
+        # identifier mappings expire with the responses
+        self.assertEqual(self.count_requests("/api/json/get_string_ids"), 2)
+
+    def test_map_string_ids(self):
+        """Test bulk identifier mapping with a persistent cache"""
+        FakeStringHandler.responses = {"/api/json/get_string_ids": get_string_ids}
+
+        results = stringdb.map_string_ids(["TP53", "foo", "chek1"], chunk_size=2)
+        self.assertEqual(
+            results, {"TP53": "9606.TP53", "foo": None, "chek1": "9606.CHEK1"}
+        )
+        self.assertEqual(self.count_requests("/api/json/get_string_ids"), 2)
+
+        # only new identifiers are requested, unresolved ones are cached too
+        results = stringdb.map_string_ids(["foo", "TP53", "BRCA1"])
+        self.assertEqual(list(results), ["foo", "TP53", "BRCA1"])
+        self.assertEqual(results["BRCA1"], "9606.BRCA1")
+        self.assertEqual(self.count_requests("/api/json/get_string_ids"), 3)
+        self.assertEqual(FakeStringHandler.requests_seen[-1][1].count("BRCA1"), 1)
+        self.assertNotIn("TP53", FakeStringHandler.requests_seen[-1][1])
+
+        stringdb.map_string_ids(["TP53"], use_cache=False)
+        self.assertEqual(self.count_requests("/api/json/get_string_ids"), 4)
+
+    def test_batch_interactions(self):
+        """Test chunked interaction partner requests for many genes"""
+        partners = {"TP53": ["MDM2", "EP300"], "CHEK1": ["CDC25A"], "BRCA1": []}
+
+        def interaction_partners(params):
+            return [
+                {
+                    "stringId_A": identifier,
+                    "preferredName_A": identifier.split(".")[-1],
+                    "preferredName_B": partner,
+                    "score": 0.9,
+                }
+                for identifier in params["identifiers"][0].split("\r")
+                for partner in partners[identifier.split(".")[-1]]
+            ]
+
+        FakeStringHandler.responses = {
+            "/api/json/interaction_partners": interaction_partners,
+            "/api/json/get_string_ids": get_string_ids,
+        }
+        results = stringdb.get_interactions_batch(
+            ["TP53", "chek1", "BRCA1", "TP53"], chunk_size=2, max_workers=2
+        )
+        self.assertEqual(self.count_requests("/api/json/interaction_partners"), 2)
+        self.assertEqual(results.columns[0], "query_gene")
+        self.assertEqual(results["query_gene"].tolist(), ["TP53", "TP53", "chek1"])
+        self.assertEqual(
+            results["preferredName_B"].tolist(), ["MDM2", "EP300", "CDC25A"]
+        )
+
+        with self.assertRaises(exceptions.InvalidQueryParameter):
+            stringdb.get_interactions_batch(["TP53"], chunk_size=0)
+
+    def test_batch_retries(self):
+        """Test that every chunk gets its own retries"""
+        failed = set()
+
+        def interaction_partners(params):
+            # the first request of every chunk fails
+            identifiers = params["identifiers"][0]
+            if identifiers not in failed:
+                failed.add(identifiers)
+                return 500
+            return []
+
+        FakeStringHandler.responses = {
+            "/api/json/interaction_partners": interaction_partners
+        }
+        with contextlib.redirect_stdout(None):
+            results = stringdb.get_interactions_batch(
+                ["TP53", "CHEK1", "BRCA1"],
+                chunk_size=1,
+                map_ids=False,
+                max_tries=2,
+                seconds_to_wait=0,
+            )
+        self.assertTrue(results.empty)
+        self.assertEqual(self.count_requests("/api/json/interaction_partners"), 6)
+
+    def test_expand_network_retries(self):
+        """Test that parallel chunks of a network expansion retry independently"""
+        failed = set()
+
+        def interaction_partners(params):
+            identifier = params["identifiers"][0]
+            if identifier not in failed:
+                failed.add(identifier)
+                return 500
+            return [
+                {
+                    "stringId_A": identifier,
+                    "stringId_B": "9606.MDM2",
+                    "preferredName_A": identifier.split(".")[-1],
+                }
+            ]
+
+        FakeStringHandler.responses = {
+            "/api/json/interaction_partners": interaction_partners
+        }
+        seeds = ["9606.TP53", "9606.CHEK1", "9606.BRCA1", "9606.EP300"]
+        with contextlib.redirect_stdout(None):
+            results = stringdb.expand_network(
+                seeds,
+                hops=1,
+                chunk_size=1,
+                map_ids=False,
+                max_tries=2,
+                seconds_to_wait=0,
+            )
+        self.assertEqual(sorted(results["stringId_A"]), sorted(seeds))
+        self.assertEqual(self.count_requests("/api/json/interaction_partners"), 8)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        stringdb.string_api_url = self.string_api_url
+        stringdb.STRING_CACHE_NAME = self.cache_name
+        stringdb.STRING_ID_CACHE_NAME = self.id_cache_name
+        session.get_cached_session.cache_clear()
+        shutil.rmtree(self.cache_dir)
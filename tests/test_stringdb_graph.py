@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation.stringdb_graph import StringGraph
+
+
+def network(pairs):
+    return pd.DataFrame(
+        {
+            "stringId_A": ["9606." + a for a, _, _ in pairs],
+            "stringId_B": ["9606." + b for _, b, _ in pairs],
+            "preferredName_A": [a for a, _, _ in pairs],
+            "preferredName_B": [b for _, b, _ in pairs],
+            "ncbiTaxonId": 9606,
+            "score": [score for _, _, score in pairs],
+        }
+    )
+
+
+class TestStringGraph(unittest.TestCase):
+    """Unit test class for the compact STRING graph"""
+
+    def test_from_frame(self):
+        """Test the CSR layout of a network"""
+        graph = StringGraph.from_frame(
+            network(
+                [
+                    ("TP53", "MDM2", 0.999),
+                    ("TP53", "EP300", 0.95),
+                    ("MDM2", "TP53", 0.5),
+                ]
+            )
+        )
+        self.assertEqual(graph.preferred_names.tolist(), ["TP53", "MDM2", "EP300"])
+        self.assertEqual(graph.indptr.tolist(), [0, 2, 3, 4])
+        self.assertEqual(graph.indices.tolist(), [1, 2, 0, 0])
+        self.assertEqual(graph.indices.dtype, np.int32)
+        self.assertEqual(graph.scores.dtype, np.float32)
+        self.assertEqual(graph.n_edges, 2)
+        self.assertEqual(graph.degrees().tolist(), [2, 1, 1])
+        self.assertAlmostEqual(float(graph.scores[0]), 0.999, places=6)
+
+        self.assertEqual(
+            graph.neighbors("TP53")["preferredName"].tolist(), ["MDM2", "EP300"]
+        )
+        self.assertEqual(graph.node_index(["9606.EP300", "MDM2", "foo"]), [2, 1, None])
+        with self.assertRaises(KeyError):
+            graph.neighbors("foo")
+
+        self.assertEqual(StringGraph.from_frame(pd.DataFrame()).n_nodes, 0)
+
+    def test_merge(self):
+        """Test incremental merging of networks"""
+        graph = StringGraph.from_frame(network([("TP53", "MDM2", 0.9)]))
+        merged = graph.merge(
+            network([("MDM2", "TP53", 0.95), ("CHEK1", "CDC25A", 0.99)]),
+            StringGraph.from_frame(network([("CHEK1", "TP53", 0.7)])),
+        )
+        self.assertEqual(
+            merged.preferred_names.tolist(), ["TP53", "MDM2", "CHEK1", "CDC25A"]
+        )
+        self.assertEqual(merged.n_edges, 3)
+        frame = merged.to_frame()
+        self.assertEqual(
+            list(zip(frame["preferredName_A"], frame["preferredName_B"])),
+            [("TP53", "MDM2"), ("TP53", "CHEK1"), ("CHEK1", "CDC25A")],
+        )
+        self.assertEqual(frame["score"].astype(float).round(3).tolist(), [0.95, 0.7, 0.99])
+
+        # merging does not change the original graph
+        self.assertEqual(graph.n_nodes, 2)
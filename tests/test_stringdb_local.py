@@ -0,0 +1,211 @@
+import unittest
+import gzip
+import shutil
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import stringdb, stringdb_plot
+from target_annotation.stringdb_local import StringEdgeStore
+
+API_COLUMNS = [
+    "stringId_A",
+    "stringId_B",
+    "preferredName_A",
+    "preferredName_B",
+    "ncbiTaxonId",
+    "score",
+    "nscore",
+    "fscore",
+    "pscore",
+    "ascore",
+    "escore",
+    "dscore",
+    "tscore",
+]
+
+PROTEINS = {
+    "9606.ENSP00000269305": "TP53",
+    "9606.ENSP00000258149": "MDM2",
+    "9606.ENSP00000263253": "EP300",
+    "9606.ENSP00000438357": "CHEK1",
+    "9606.ENSP00000303706": "CDC25A",
+}
+
+# protein1 protein2 combined_score, listed in one direction only
+LINKS = [
+    ("TP53", "MDM2", 999),
+    ("TP53", "EP300", 950),
+    ("TP53", "CHEK1", 700),
+    ("CHEK1", "CDC25A", 990),
+    ("MDM2", "EP300", 300),
+]
+
+
+def string_id(name):
+    return next(key for key, value in PROTEINS.items() if value == name)
+
+
+class TestStringEdgeStore(unittest.TestCase):
+    """Unit test class for the local STRING edge store"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.links_path = self.data_dir + "/9606.protein.links.detailed.txt.gz"
+        self.physical_path = self.data_dir + "/9606.protein.physical.links.txt"
+        self.info_path = self.data_dir + "/9606.protein.info.txt"
+
+        channels = " ".join(
+            ["neighborhood", "fusion", "cooccurence", "coexpression"]
+            + ["experimental", "database", "textmining"]
+        )
+        with gzip.open(self.links_path, "wt") as file:
+            file.write(f"protein1 protein2 {channels} combined_score\n")
+            for name_a, name_b, score in LINKS:
+                file.write(
+                    f"{string_id(name_a)} {string_id(name_b)} 0 0 0 0 {score} 0 0"
+                    f" {score}\n"
+                )
+        with open(self.physical_path, "w", encoding="UTF-8") as file:
+            file.write("protein1 protein2 combined_score\n")
+            for name_a, name_b, score in LINKS[:2]:
+                file.write(f"{string_id(name_a)} {string_id(name_b)} {score}\n")
+        with open(self.info_path, "w", encoding="UTF-8") as file:
+            file.write("#string_protein_id\tpreferred_name\tprotein_size\n")
+            for key, value in PROTEINS.items():
+                file.write(f"{key}\t{value}\t100\n")
+
+        self.store_dir = self.data_dir + "/store"
+        self.store = StringEdgeStore.build(
+            self.store_dir, self.links_path, self.physical_path, self.info_path
+        )
+
+    def test_interaction_partners(self):
+        """Test interaction partners from the local edge store"""
+        with self.assertRaises(FileNotFoundError):
+            StringEdgeStore(self.data_dir)
+
+        results = stringdb.get_interactions(
+            "tp53", net_type="functional", string_store=self.store_dir
+        )
+        self.assertEqual(results.columns.tolist(), API_COLUMNS)
+        self.assertEqual(
+            results["preferredName_B"].tolist(), ["MDM2", "EP300", "CHEK1"]
+        )
+        self.assertEqual(results["score"].tolist(), [0.999, 0.95, 0.7])
+        self.assertEqual(results["escore"].tolist(), [0.999, 0.95, 0.7])
+        self.assertEqual(results["ncbiTaxonId"].tolist(), [9606] * 3)
+
+        results = self.store.interaction_partners(
+            ["ENSP00000269305", "CHEK1", "foo"], "functional", 800, limit=1
+        )
+        self.assertEqual(
+            list(zip(results["preferredName_A"], results["preferredName_B"])),
+            [("TP53", "MDM2"), ("CHEK1", "CDC25A")],
+        )
+
+        # links are symmetric and physical links have no sub-scores
+        results = stringdb.get_interactions("EP300", string_store=self.store_dir)
+        self.assertEqual(results["preferredName_B"].tolist(), ["TP53"])
+        self.assertEqual(results["nscore"].tolist(), [0.0])
+
+        results = stringdb.get_interactions_batch(
+            ["TP53", "MDM2"], string_store=self.store_dir
+        )
+        self.assertEqual(results["query_gene"].tolist(), ["TP53", "TP53", "MDM2"])
+
+        with self.assertRaises(ValueError):
+            self.store.interaction_partners(["TP53"], "foo")
+
+    def test_network(self):
+        """Test networks from the local edge store"""
+        results = stringdb.get_network(
+            ["TP53", "MDM2", "EP300"],
+            net_type="functional",
+            required_score=400,
+            limit=0,
+            string_store=self.store_dir,
+        )
+        self.assertEqual(results.columns.tolist(), API_COLUMNS)
+        self.assertEqual(
+            list(zip(results["preferredName_A"], results["preferredName_B"])),
+            [("TP53", "MDM2"), ("TP53", "EP300")],
+        )
+
+        graph = stringdb.get_network(
+            ["TP53", "MDM2", "EP300"],
+            net_type="functional",
+            limit=0,
+            string_store=self.store_dir,
+            as_graph=True,
+        )
+        self.assertEqual(graph.n_edges, 2)
+        self.assertEqual(graph.degrees().tolist(), [2, 1, 1])
+
+        results = self.store.network(["CHEK1"], "functional", 400, add_nodes=1)
+        self.assertEqual(
+            list(zip(results["preferredName_A"], results["preferredName_B"])),
+            [("CHEK1", "CDC25A")],
+        )
+
+    def test_network_plot(self):
+        """Test local rendering of network plots from the local edge store"""
+        layout_cache_name = stringdb_plot.LAYOUT_CACHE_NAME
+        stringdb_plot.LAYOUT_CACHE_NAME = self.data_dir + "/layouts.sqlite"
+        try:
+            image = stringdb.get_network_plot(
+                "TP53",
+                net_type="functional",
+                limit=2,
+                renderer="local",
+                string_store=self.store_dir,
+            )
+        finally:
+            stringdb_plot.LAYOUT_CACHE_NAME = layout_cache_name
+        self.assertTrue(image.startswith(b"<svg"))
+        self.assertEqual(image.count(b"<circle"), 3)
+        self.assertEqual(image.count(stringdb_plot.QUERY_NODE_COLOR.encode()), 1)
+
+        with self.assertRaises(stringdb.exceptions.InvalidQueryParameter):
+            stringdb.get_network_plot("TP53", renderer="foo")
+
+    def test_expand_network(self):
+        """Test multi-hop network expansion from the local edge store"""
+        edge_cache = {}
+        results = stringdb.expand_network(
+            ["CHEK1"],
+            hops=2,
+            net_type="functional",
+            string_store=self.store_dir,
+            edge_cache=edge_cache,
+        )
+        self.assertEqual(
+            list(zip(results["preferredName_A"], results["preferredName_B"])),
+            [
+                ("CHEK1", "CDC25A"),
+                ("CHEK1", "TP53"),
+                ("TP53", "MDM2"),
+                ("TP53", "EP300"),
+            ],
+        )
+        self.assertEqual(results["hop"].tolist(), [1, 1, 2, 2])
+        self.assertEqual(len(edge_cache), 3)
+
+        results = stringdb.expand_network(
+            ["CHEK1"],
+            hops=3,
+            net_type="functional",
+            max_nodes=2,
+            string_store=self.store_dir,
+            edge_cache=edge_cache,
+        )
+        self.assertEqual(results["preferredName_B"].tolist(), ["CDC25A"])
+
+        with self.assertRaises(stringdb.exceptions.InvalidQueryParameter):
+            stringdb.expand_network(["CHEK1"], hops=0, string_store=self.store_dir)
+
+    def tearDown(self):
+        stringdb.get_string_backend.cache_clear()
+        shutil.rmtree(self.data_dir)
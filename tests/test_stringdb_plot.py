@@ -0,0 +1,89 @@
+import unittest
+import importlib.util
+import shutil
+import sqlite3
+import sys
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import stringdb_plot
+from target_annotation.stringdb_graph import StringGraph
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+NETWORK = pd.DataFrame(
+    {
+        "stringId_A": ["9606.TP53", "9606.TP53", "9606.CHEK1"],
+        "stringId_B": ["9606.MDM2", "9606.CHEK1", "9606.CDC25A"],
+        "preferredName_A": ["TP53", "TP53", "CHEK1"],
+        "preferredName_B": ["MDM2", "CHEK1", "CDC25A"],
+        "score": [0.999, 0.7, 0.99],
+    }
+)
+
+
+class TestStringDBPlot(unittest.TestCase):
+    """Unit test class for local STRING network rendering"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.layout_cache_name = stringdb_plot.LAYOUT_CACHE_NAME
+        stringdb_plot.LAYOUT_CACHE_NAME = self.cache_dir + "/layouts.sqlite"
+
+    def test_render_network(self):
+        """Test SVG rendering of a network"""
+        image = stringdb_plot.render_network(NETWORK, query_genes=["tp53"])
+        root = ET.fromstring(image)
+        circles = root.findall(f".//{SVG}circle")
+        self.assertEqual(len(circles), 4)
+        self.assertEqual(len(root.findall(f".//{SVG}line")), 3)
+        self.assertEqual(
+            [x.get("fill") for x in circles],
+            [stringdb_plot.QUERY_NODE_COLOR] + [stringdb_plot.ADDED_NODE_COLOR] * 3,
+        )
+        self.assertEqual(
+            [x.text for x in root.findall(f".//{SVG}text")],
+            ["TP53", "CHEK1", "MDM2", "CDC25A"],
+        )
+
+        with self.assertRaises(ValueError):
+            stringdb_plot.render_network(NETWORK, image_format="gif")
+
+    def test_layout_cache(self):
+        """Test that layouts are cached per network"""
+        graph = StringGraph.from_frame(NETWORK)
+        positions = stringdb_plot.network_layout(graph)
+        self.assertEqual(positions.shape, (4, 2))
+        self.assertTrue(((positions >= 0) & (positions <= 1)).all())
+
+        # a second call reads the layout from the cache
+        with sqlite3.connect(stringdb_plot.LAYOUT_CACHE_NAME) as connection:
+            (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+            connection.execute(
+                "UPDATE cache SET value = ?", ["[[0, 0], [0, 0], [0, 0], [0, 0]]"]
+            )
+        connection.close()
+        self.assertEqual(count, 1)
+        self.assertEqual(stringdb_plot.network_layout(graph).tolist(), [[0.0, 0.0]] * 4)
+        self.assertEqual(
+            stringdb_plot.network_layout(graph, use_cache=False).tolist(),
+            positions.tolist(),
+        )
+
+    @unittest.skipIf(
+        importlib.util.find_spec("matplotlib") is None, "matplotlib is not installed"
+    )
+    def test_render_png(self):
+        """Test PNG rendering of a network"""
+        image = stringdb_plot.render_network(NETWORK, image_format="png")
+        self.assertTrue(image.startswith(b"\x89PNG"))
+        # rendering leaves pyplot and the global backend alone
+        self.assertNotIn("matplotlib.pyplot", sys.modules)
+
+    def tearDown(self):
+        stringdb_plot.LAYOUT_CACHE_NAME = self.layout_cache_name
+        shutil.rmtree(self.cache_dir)
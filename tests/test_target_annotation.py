@@ -1,10 +1,11 @@
 import unittest
 import os
 import sys
+from unittest import mock
 from typeguard import TypeCheckError
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from target_annotation import TargetAnnotation
+from target_annotation import TargetAnnotation, open_targets
 from target_annotation.utils.exceptions import InvalidDiseaseID
 
 
@@ -41,6 +42,58 @@ class TestTargetAnnotation(unittest.TestCase):
                 targets=self.bad_target,
             )
 
+    def test_normalized_targets(self):
+        pipe = TargetAnnotation(
+            targets=[self.good_target, self.good_target.lower() + ".5"],
+            disease_code=self.good_disease_code,
+            results_path=self.good_results_path,
+        )
+        self.assertEqual(pipe.targets, [self.good_target])
+        self.assertEqual(pipe.target_report["duplicate"].tolist(), [False, True])
+
+    def test_resolve_symbols(self):
+        with mock.patch.object(
+            open_targets,
+            "map_symbols_to_ensembl",
+            return_value={"MASTL": self.good_target, "foo": None},
+        ) as map_symbols:
+            pipe = TargetAnnotation(
+                targets=["MASTL", self.good_target],
+                disease_code=self.good_disease_code,
+                results_path=self.good_results_path,
+                resolve_symbols=True,
+            )
+            self.assertEqual(map_symbols.call_args.args[0], ["MASTL"])
+            self.assertEqual(pipe.targets, [self.good_target])
+            self.assertEqual(pipe.target_report["symbol"].tolist(), [True, False])
+
+            with self.assertRaises(ValueError):
+                _ = TargetAnnotation(
+                    targets=["foo"],
+                    disease_code=self.good_disease_code,
+                    results_path=self.good_results_path,
+                    resolve_symbols=True,
+                )
+
+    def test_invalid_evidence_profile(self):
+        with self.assertRaises(ValueError):
+            _ = TargetAnnotation(
+                targets=self.good_target,
+                disease_code=self.good_disease_code,
+                results_path=self.good_results_path,
+                evidence_profile="foo",
+            )
+
+    def test_summary_only(self):
+        pipe = TargetAnnotation(
+            targets=self.good_target,
+            disease_code=self.good_disease_code,
+            results_path=self.good_results_path,
+            summary_only=True,
+        )
+        self.assertEqual(pipe.pharos_profile, "summary")
+        self.assertEqual(pipe.evidence_profile, "literature")
+
     def test_nomatch_ensg_code(self):
         pipe = TargetAnnotation(
             targets=self.bad_target_ensg,
@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+from typeguard import TypeCheckError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import open_targets
+from target_annotation.utils import typecheck
+
+
+@typecheck.internal_typechecked
+def _private_function(value: int) -> int:
+    return value
+
+
+@typecheck.internal_typechecked
+class Example:
+    """Class with one public and one private method"""
+
+    def public(self, value: int) -> int:
+        return self._private(value)
+
+    def _private(self, value: int) -> int:
+        return value
+
+    @staticmethod
+    def _private_static(value: int) -> int:
+        return value
+
+
+class TestTypecheck(unittest.TestCase):
+    """Unit test class for typecheck submodule"""
+
+    def setUp(self):
+        self.fast_mode = typecheck.is_fast_mode()
+        typecheck.set_fast_mode(False)
+
+    def test_checked_by_default(self):
+        for func in [
+            _private_function,
+            Example()._private,  # pylint: disable=W0212
+            Example._private_static,  # pylint: disable=W0212
+            open_targets._has_valid_size_param,  # pylint: disable=W0212
+        ]:
+            with self.assertRaises(TypeCheckError):
+                func("1")
+        with self.assertRaises(TypeCheckError):
+            Example().public("1")
+
+    def test_fast_mode(self):
+        typecheck.set_fast_mode(True)
+        self.assertTrue(typecheck.is_fast_mode())
+
+        self.assertEqual(_private_function("1"), "1")
+        self.assertEqual(Example._private_static("1"), "1")  # pylint: disable=W0212
+        with self.assertRaises(TypeError):
+            open_targets._has_valid_size_param("1")  # pylint: disable=W0212
+
+        # public boundary is still checked
+        with self.assertRaises(TypeCheckError):
+            Example().public("1")
+        with self.assertRaises(TypeCheckError):
+            open_targets.request_ot_target_annotation(1)
+
+    def tearDown(self):
+        typecheck.set_fast_mode(self.fast_mode)
@@ -0,0 +1,156 @@
+import unittest
+import contextlib
+import json
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import uniprot
+from target_annotation.utils import exceptions
+
+ENTRIES = {
+    "P78508": [{"database": "OpenTargets", "id": "ENSG00000177807"}],
+    "P04637": [
+        {"database": "HPA", "id": "ENSG00000141510"},
+        {"database": "OpenTargets", "id": "ENSG00000141510"},
+    ],
+    "Q9BYB0": [],
+}
+
+
+class FakeUniprotHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the UniProt ID mapping service"""
+
+    jobs = {}
+    polls_until_finished = 2
+    # when set, the first request for every status or results URL fails
+    flaky = False
+    failed = set()
+
+    def do_POST(self):  # pylint: disable=C0103
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("UTF-8")
+        ids = parse_qs(body)["ids"][0].split(",")
+        job_id = f"job{len(self.jobs)}"
+        self.jobs[job_id] = {"ids": ids, "polls": 0}
+        self.send_json({"jobId": job_id})
+
+    def do_GET(self):  # pylint: disable=C0103
+        if self.flaky and self.path not in self.failed:
+            self.failed.add(self.path)
+            self.send_error(503)
+            return
+        url = urlparse(self.path)
+        job_id = url.path.rsplit("/", 1)[-1]
+        job = self.jobs[job_id]
+        if url.path.startswith("/idmapping/status/"):
+            job["polls"] += 1
+            if job["polls"] < self.polls_until_finished:
+                self.send_json({"jobStatus": "RUNNING"})
+                return
+            self.send_response(303)
+            self.send_header("Location", f"/idmapping/uniprotkb/results/{job_id}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        params = parse_qs(url.query)
+        size, cursor = int(params["size"][0]), int(params.get("cursor", ["0"])[0])
+        found = [x for x in job["ids"] if x in ENTRIES]
+        results = [
+            {"from": x, "to": {"primaryAccession": x, "uniProtKBCrossReferences": y}}
+            for x in found[cursor : cursor + size]
+            for y in [ENTRIES[x]]
+        ]
+        headers = {}
+        if cursor + size < len(found):
+            next_url = (
+                f"http://{self.headers['Host']}{url.path}"
+                f"?format=json&size={size}&cursor={cursor + size}"
+            )
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        self.send_json({"results": results}, headers)
+
+    def send_json(self, content, headers=None):
+        content = json.dumps(content).encode("UTF-8")
+        self.send_response(200)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestUniprot(unittest.TestCase):
+    """Unit test class for the UniProt ID mapping client"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeUniprotHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        FakeUniprotHandler.jobs = {}
+        FakeUniprotHandler.flaky = False
+        FakeUniprotHandler.failed = set()
+
+    def test_map_uniprot_to_ensembl(self):
+        """Test bulk mapping of accessions with one job"""
+        results = uniprot.map_uniprot_to_ensembl(
+            ["P78508", "P04637", "Q9BYB0", "foo", "P78508"],
+            poll_interval=0.01,
+            base_url=self.base_url,
+        )
+        self.assertEqual(
+            results,
+            {
+                "P78508": "ENSG00000177807",
+                "P04637": "ENSG00000141510",
+                "Q9BYB0": None,
+                "foo": None,
+            },
+        )
+        self.assertEqual(len(FakeUniprotHandler.jobs), 1)
+        self.assertEqual(FakeUniprotHandler.jobs["job0"]["polls"], 2)
+
+    def test_paged_results(self):
+        """Test that results are streamed across pages"""
+        job_id = uniprot.submit_id_mapping(list(ENTRIES), base_url=self.base_url)
+        uniprot.wait_for_id_mapping(job_id, 0.01, base_url=self.base_url)
+        results = uniprot.iter_id_mapping_results(
+            job_id, page_size=2, base_url=self.base_url
+        )
+        self.assertEqual([x["from"] for x in results], list(ENTRIES))
+
+    def test_retries(self):
+        """Test that every poll and results page gets its own retries"""
+        FakeUniprotHandler.flaky = True
+        job_id = uniprot.submit_id_mapping(list(ENTRIES), base_url=self.base_url)
+        retry_kwargs = {"max_tries": 2, "seconds_to_wait": 0}
+        with contextlib.redirect_stdout(None):
+            uniprot.wait_for_id_mapping(
+                job_id, 0.01, base_url=self.base_url, **retry_kwargs
+            )
+            results = uniprot.iter_id_mapping_results(
+                job_id, page_size=1, base_url=self.base_url, **retry_kwargs
+            )
+            self.assertEqual([x["from"] for x in results], list(ENTRIES))
+        self.assertEqual(len(FakeUniprotHandler.failed), 4)
+
+    def test_job_timeout(self):
+        """Test that waiting for a job is bounded"""
+        FakeUniprotHandler.polls_until_finished = 10**6
+        try:
+            job_id = uniprot.submit_id_mapping(["P78508"], base_url=self.base_url)
+            with self.assertRaises(exceptions.IDMappingJobFailed):
+                uniprot.wait_for_id_mapping(job_id, 0.01, 0.05, self.base_url)
+        finally:
+            FakeUniprotHandler.polls_until_finished = 2
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
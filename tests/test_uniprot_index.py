@@ -0,0 +1,102 @@
+import unittest
+import gzip
+import shutil
+import sys
+import os
+import tempfile
+import warnings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation import uniprot
+from target_annotation.uniprot_index import UniprotIndex
+from target_annotation.utils.util import get_ensembl_from_uniprot
+
+TSV_FIXTURE = """Entry\tOpenTargets\tHPA
+P78508\tENSG00000177807;\tENSG00000177807;
+P04637\tENSG00000141510;\tENSG00000141510;
+Q8N158\t\tENSG00000164687;
+Q9BYB0\t\t
+"""
+
+
+def idmapping_row(accession, taxon, ensembl):
+    row = [""] * 22
+    row[0], row[12], row[18] = accession, taxon, ensembl
+    return "\t".join(row) + "\n"
+
+
+IDMAPPING_FIXTURE = (
+    idmapping_row("P78508", "9606", "ENSG00000177807; ENSG00000177808")
+    + idmapping_row("P04637", "9606", "ENSG00000141510")
+    + idmapping_row("P02340", "10090", "ENSMUSG00000059552")
+    + idmapping_row("Q9BYB0", "9606", "")
+)
+
+
+class TestUniprotIndex(unittest.TestCase):
+    """Unit test class for the local UniProt accession index"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.tsv_path = self.data_dir + "/uniprot.tsv"
+        with open(self.tsv_path, "w", encoding="UTF-8") as file:
+            file.write(TSV_FIXTURE)
+        self.db_path = self.data_dir + "/uniprot.sqlite"
+        self.index = UniprotIndex.build(self.db_path, self.tsv_path)
+
+    def test_tsv_export(self):
+        """Test lookups from a TSV export with cross-reference columns"""
+        with self.assertRaises(FileNotFoundError):
+            UniprotIndex(self.data_dir + "/foo.sqlite")
+
+        self.assertEqual(
+            self.index.ensembl_ids(["P78508", "Q8N158", "Q9BYB0", "foo"]),
+            {
+                "P78508": "ENSG00000177807",
+                "Q8N158": "ENSG00000164687",
+                "Q9BYB0": None,
+                "foo": None,
+            },
+        )
+        self.assertEqual(self.index.metadata["source"], "uniprot.tsv")
+
+    def test_idmapping(self):
+        """Test lookups from a gzip compressed idmapping_selected.tab"""
+        mapping_path = self.data_dir + "/idmapping_selected.tab.gz"
+        with gzip.open(mapping_path, "wt", encoding="UTF-8") as file:
+            file.write(IDMAPPING_FIXTURE)
+        index = UniprotIndex.build(self.data_dir + "/idmapping.sqlite", mapping_path)
+        self.assertEqual(
+            index.ensembl_ids(["P78508", "P04637", "P02340", "Q9BYB0"]),
+            {
+                "P78508": "ENSG00000177807",
+                "P04637": "ENSG00000141510",
+                "P02340": None,
+                "Q9BYB0": None,
+            },
+        )
+        index.close()
+
+    def test_local_lookups(self):
+        """Test map_uniprot_to_ensembl and get_ensembl_from_uniprot with an index"""
+        results = uniprot.map_uniprot_to_ensembl(
+            ["P04637", "foo"], uniprot_index=self.db_path, as_series=True
+        )
+        self.assertEqual(results.to_dict(), {"P04637": "ENSG00000141510", "foo": None})
+
+        self.assertEqual(
+            get_ensembl_from_uniprot("P78508", uniprot_index=self.db_path),
+            "ENSG00000177807",
+        )
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertIsNone(
+                get_ensembl_from_uniprot("Q9BYB0", uniprot_index=self.db_path)
+            )
+        self.assertEqual(len(caught), 1)
+
+    def tearDown(self):
+        self.index.close()
+        uniprot.get_uniprot_index.cache_clear()
+        shutil.rmtree(self.data_dir)
@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from target_annotation.utils import validators
+
+
+class TestValidators(unittest.TestCase):
+    """Unit test class for validators submodule"""
+
+    def setUp(self):
+        self.ensemble_id = "ENSG00000149554"  # CHEK1
+        self.disease_id = "EFO_0001378"  # Multiple Myeloma
+
+    def test_is_valid_ensembl_id(self):
+        self.assertTrue(validators.is_valid_ensembl_id(self.ensemble_id))
+        for ens_id in [
+            self.ensemble_id.replace("ENS", ""),
+            self.ensemble_id.replace("ENS", "ENS#"),
+            "#@$" + self.ensemble_id,
+            self.ensemble_id[:-1],
+            self.ensemble_id + "0",
+            self.ensemble_id + "\n",
+        ]:
+            self.assertFalse(validators.is_valid_ensembl_id(ens_id))
+
+    def test_is_valid_disease_id(self):
+        for disease_id in [self.disease_id, "MONDO_0004992", "NCIT_C165465"]:
+            self.assertTrue(validators.is_valid_disease_id(disease_id))
+        for disease_id in [
+            "\n",
+            "",
+            self.disease_id + "\n",
+            self.disease_id + "$#@",
+            "#@$" + self.disease_id,
+            "1234567",
+            self.disease_id.replace("_", ""),
+            self.disease_id.replace("_", "__"),
+            self.disease_id + "_",
+        ]:
+            self.assertFalse(validators.is_valid_disease_id(disease_id))
+        self.assertTrue(validators.is_valid_disease_id("Orphanet_399", {"ORPHANET"}))
+        self.assertFalse(validators.is_valid_disease_id(self.disease_id, {"MONDO"}))
+
+    def test_normalize_ensembl_ids(self):
+        ids, report = validators.normalize_ensembl_ids(
+            [
+                self.ensemble_id,
+                " ensg00000149554.12",
+                "ENSG00000012048.3",
+                "foo",
+            ]
+        )
+        self.assertEqual(ids, [self.ensemble_id, "ENSG00000012048"])
+        self.assertEqual(report["valid"].tolist(), [True, True, True, False])
+        self.assertEqual(report["duplicate"].tolist(), [False, True, False, False])
+        self.assertEqual(report["normalized"].iloc[1], self.ensemble_id)
+
+        ids, report = validators.normalize_ensembl_ids([])
+        self.assertEqual(ids, [])
+        self.assertEqual(len(report), 0)